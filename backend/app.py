@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS 
 from werkzeug.utils import secure_filename
 import os
@@ -8,23 +8,48 @@ import json
 import cv2 # OpenCV for webcam/video processing
 import uuid 
 import time 
+import threading
 from datetime import timedelta 
 
 # --- CORRECTED RELATIVE IMPORTS ---
 # (Assuming app.py is inside the 'backend' folder)
 from .config import (
-    UPLOAD_FOLDER, REPORTS_FOLDER, MATCHES_FOLDER, DB_PATH, initialize_filesystem
+    UPLOAD_FOLDER, REPORTS_FOLDER, MATCHES_FOLDER, DB_PATH, initialize_filesystem,
+    PRELOAD_MODELS, WARMUP_ON_PRELOAD, VIDEO_SEGMENTS, BATCH_FOLDER, BATCH_INPUT_ROOT, RESULTS_MAX_PAGE_SIZE,
+    REPORT_THUMBNAIL_FOLDER
 )
-from .modules.video_processor import VideoProcessor
-from .modules.report_generator import ReportGenerator
+from .modules import model_registry, metrics
+from .modules.job_manager import QUEUED, RUNNING, JobManager, JobQueueFull
+from .modules.session_store import SessionStore
+from .modules.live_stream import LiveStreamHub
+from .modules.segmented_processor import SegmentedVideoProcessor
+from .modules.batch_ingest import BatchRunner, create_batch, get_batch, set_batch_job
+from .modules.report_builder import get_report_builder
+from .modules.results_query import fetch_results, per_second_timeline
+from .modules.face_archive import FaceArchive, list_archives
 from .database.init_db import init_db
 # ----------------------------------
 
-# --- GLOBAL EMBEDDING STORAGE ---
-LIVE_EMBEDDING_CACHE = {} 
+# --- SERVER STATE (created by init_app) ---
+# Nothing with side effects happens at import: spawned segment workers re-import this module
+# through the server's main script, and must not touch the jobs table or the live sources.
+# Live-session reference embeddings: TTL + LRU bounded, backend chosen by LIVE_SESSION_BACKEND
+LIVE_EMBEDDING_CACHE = None
+# One capture+inference producer per live source, shared by every viewer
+LIVE_STREAMS = None
+# Bounded worker pool for video jobs (state persisted in the `jobs` table)
+job_manager = None
+_init_lock = threading.Lock()
+
+
+def _live_stream_metrics():
+    """Scrape-time gauges: viewers and rolling per-stage FPS/latency of every live producer."""
+    for source, stream in LIVE_STREAMS.stats().items():
+        yield metrics.LIVE_VIEWERS, {"source": source}, stream["viewers"]
+        for stage, summary in stream["stages"].items():
+            yield metrics.LIVE_STAGE_FPS, {"source": source, "stage": stage}, summary["fps"]
+            yield metrics.LIVE_STAGE_LATENCY, {"source": source, "stage": stage}, summary["mean_ms"]
 
-# Call the file system initializer
-initialize_filesystem()
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -32,28 +57,77 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Allow access from the React development server
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:5173"}}) 
 
-# Initialize DB on startup
-init_db()
+
+def init_app():
+    """
+    One-time server setup: folders, DB schema, live session store and hub, job manager.
+    Called by the entry points before serving; safe to call more than once.
+    """
+    global LIVE_EMBEDDING_CACHE, LIVE_STREAMS, job_manager
+    with _init_lock:
+        if job_manager is not None:
+            return app
+        initialize_filesystem()
+        init_db()
+        LIVE_EMBEDDING_CACHE = SessionStore()
+        LIVE_STREAMS = LiveStreamHub(model_registry.get_processor)
+        metrics.REGISTRY.add_collector(_live_stream_metrics,
+                                       (metrics.LIVE_VIEWERS, metrics.LIVE_STAGE_FPS, metrics.LIVE_STAGE_LATENCY))
+        # Last: it marks the setup as done
+        job_manager = JobManager()
+    return app
+
+
+@app.before_request
+def _ensure_initialized():
+    # WSGI servers that import `app` directly get the setup on their first request
+    if job_manager is None:
+        init_app()
+
 
 # --- Cleanup Function (No changes) ---
-def clear_previous_session_data():
-    """Deletes all entries from DB and and clears static file directories."""
+def clear_previous_session_data(keep_video: str = None):
+    """
+    Deletes the previous single-upload session: its DB entries, uploads, crops and reports.
+    Batch results (see batch_ingest) are kept, along with the crops (and their cached report
+    thumbnails) and reports they reference.
+    A re-upload of `keep_video` that has a checkpoint keeps its partial results so it can resume.
+    """
     print("🧹 Starting session cleanup...")
+    kept_images = set()
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM detections")
+        kept_videos = "SELECT video_filename FROM batch_videos UNION SELECT video_filename FROM checkpoints WHERE video_filename = ?"
+        cursor.execute(f"DELETE FROM detections WHERE video_filename NOT IN ({kept_videos})", (keep_video,))
+        cursor.execute(f"DELETE FROM checkpoints WHERE video_filename NOT IN ({kept_videos})", (keep_video,))
+        cursor.execute("DELETE FROM reports WHERE kind IS NOT 'batch'")
         conn.commit()
+        kept_images = {row[0] for row in cursor.execute("SELECT match_image_path FROM detections")}
         conn.close()
         print("     -> Database entries cleared.")
     except Exception as e:
         print(f"     -> ERROR clearing DB: {e}")
 
-    for folder_path in [UPLOAD_FOLDER, MATCHES_FOLDER, REPORTS_FOLDER]:
+    # Thumbnails are named after their crop (see ReportGenerator._thumbnail)
+    kept_thumbs = {os.path.splitext(image)[0] + '.jpg' for image in kept_images}
+    keep = {
+        UPLOAD_FOLDER: lambda name: False,
+        MATCHES_FOLDER: lambda name: name in kept_images or os.path.join(MATCHES_FOLDER, name) == REPORT_THUMBNAIL_FOLDER,
+        REPORT_THUMBNAIL_FOLDER: lambda name: name in kept_thumbs,
+        REPORTS_FOLDER: lambda name: name.startswith('report_batch_'),
+    }
+    for folder_path, is_kept in keep.items():
         try:
-            if os.path.exists(folder_path):
-                shutil.rmtree(folder_path)
             os.makedirs(folder_path, exist_ok=True)
+            for name in os.listdir(folder_path):
+                if is_kept(name):
+                    continue
+                path = os.path.join(folder_path, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
             print(f"     -> Cleared folder: {os.path.basename(folder_path)}")
         except Exception as e:
             print(f"     -> ERROR clearing folder {os.path.basename(folder_path)}: {e}")
@@ -61,57 +135,29 @@ def clear_previous_session_data():
 
 
 # --- LIVE FEED: MJPEG Generator (UPDATED) ---
-def generate_mjpeg_stream(processor, reference_embedding):
-    """Draws bounding boxes and streams processed frames as MJPEG."""
-    
-    cap = cv2.VideoCapture(0) 
-    
-    if not cap.isOpened():
-        print("🔴 ERROR: Could not open webcam.")
-        return 
-
+def generate_mjpeg_stream(subscriber):
+    """
+    Streams one viewer's frames as MJPEG. Capture, inference and encoding run on the shared
+    producer's threads (see LiveStreamPipeline); a viewer that falls behind skips frames.
+    """
     print("▶️ Starting MJPEG webcam stream with detection...")
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret: break
-        
-        frame_copy = frame.copy()
-        
-        # --- CRITICAL FIX ---
-        # Use the unified pipeline from the processor
-        # This one call handles detection, alignment, and embedding
-        all_face_data_in_frame = processor.pipeline.process_frame(frame_copy)
-        
-        for face_data in all_face_data_in_frame:
-            # Get the embedding from the pipeline's output
-            target_embedding = face_data['embedding']
-            similarity, is_match = processor.matcher.match(target_embedding, reference_embedding)
-
-            (x1, y1, x2, y2) = face_data['box']
-            
-            if is_match:
-                color = (0, 255, 0) # Green BGR for Match
-                text = f"MATCH: {similarity:.2f}"
-            else:
-                color = (0, 0, 255) # Red BGR for No Match
-                text = f"SIM: {similarity:.2f}"
-
-            # Draw the box and text
-            cv2.rectangle(frame_copy, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame_copy, text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-        # --- END OF FIX ---
-        
-        # Encode the frame into JPEG format
-        ret, buffer = cv2.imencode('.jpg', frame_copy)
-        if not ret: continue
-
-        # Yield the JPEG frame
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-
-    cap.release()
-    print("⏸️ MJPEG stream stopped.")
+    try:
+        frames = subscriber.jpeg_frames()
+        while True:
+            # Waiting for the producer vs. handing the frame to the server (the next
+            # iteration only starts once the client socket took the previous part)
+            with metrics.timed('live_wait'):
+                jpeg = next(frames, None)
+            if jpeg is None:
+                break
+            with metrics.timed('live_send'):
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+            metrics.LIVE_FRAMES_SERVED.inc()
+    finally:
+        # Runs when the client disconnects too; the last viewer out stops the producer
+        subscriber.close()
+        print("⏸️ MJPEG stream stopped.")
 
 
 # --- LIVE FEED: Step 1 (POST) - Upload Reference (UPDATED) ---
@@ -124,7 +170,7 @@ def upload_live_reference():
         
     ref_files = request.files.getlist('reference_images')
     
-    processor = VideoProcessor() 
+    processor = model_registry.get_processor()
     
     # --- CRITICAL FIX ---
     # Access the pipeline *through* the processor instance
@@ -135,10 +181,9 @@ def upload_live_reference():
         return jsonify({"message": "Could not generate reference embedding."}), 500
 
     # Store embedding and generate session ID
-    session_id = str(uuid.uuid4())
-    LIVE_EMBEDDING_CACHE[session_id] = reference_embedding
+    session_id = LIVE_EMBEDDING_CACHE.create(reference_embedding)
     
-    print(f"🟢 LIVE Session Ready: {session_id}. Cache Size: {len(LIVE_EMBEDDING_CACHE)}")
+    print(f"🟢 LIVE Session Ready: {session_id}. Cache Size: {LIVE_EMBEDDING_CACHE.stats()['size']}")
     
     return jsonify({"message": "Reference uploaded successfully.", "session_id": session_id}), 200
 
@@ -147,105 +192,479 @@ def upload_live_reference():
 @app.route('/api/live/stream/<session_id>') 
 def stream_live_feed(session_id):
     """Starts MJPEG stream by retrieving embedding from cache."""
-    if session_id not in LIVE_EMBEDDING_CACHE:
-        return jsonify({"message": "Session not found or expired."}), 404
-        
     embedding = LIVE_EMBEDDING_CACHE.get(session_id)
+    if embedding is None:
+        return jsonify({"message": "Session not found or expired."}), 404
     
-    # Create a new processor for this stream
-    processor = VideoProcessor() 
+    # Join (or start) the shared producer for the camera
+    subscriber = LIVE_STREAMS.subscribe(session_id, embedding)
+    if subscriber is None:
+        return jsonify({"message": "Could not open the live source."}), 503
 
     # START MJPEG STREAM
     return Response(
-        generate_mjpeg_stream(processor, embedding), 
+        generate_mjpeg_stream(subscriber), 
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 
-# --- BATCH PROCESSING (No changes, this was already correct) ---
+# --- LIVE FEED: Session lifecycle ---
+@app.route('/api/live/session/<session_id>', methods=['DELETE'])
+def close_live_session(session_id):
+    """Explicitly ends a live session and frees its embedding."""
+    if not LIVE_EMBEDDING_CACHE.close(session_id):
+        return jsonify({"message": "Session not found or expired."}), 404
+    # Disconnect any viewers still watching this session
+    LIVE_STREAMS.close_channel(session_id)
+    print(f"⏹️ LIVE Session closed: {session_id}")
+    return jsonify({"message": "Session closed."}), 200
+
+
+@app.route('/api/live/sessions/stats', methods=['GET'])
+def live_session_stats():
+    """Size, hit/miss, eviction and expiry counters of the live session store."""
+    return jsonify(LIVE_EMBEDDING_CACHE.stats())
+
+
+@app.route('/api/live/streams/stats', methods=['GET'])
+def live_stream_stats():
+    """Viewers, channels and per-stage latency of every running live producer."""
+    return jsonify(LIVE_STREAMS.stats())
+
+
+# --- METRICS ---
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage timing histograms, pipeline counters and live-stream gauges in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- BATCH PROCESSING: Asynchronous jobs ---
+def _publish_events(job, events):
+    """Publishes a processing generator's events to the job; returns its `completed` event or raises."""
+    final_result = None
+    for event in events:
+        job.publish(event)
+        final_result = event
+
+    if final_result is None:
+        raise RuntimeError("Processing failed to start.")
+    if final_result['status'] != 'completed':
+        raise RuntimeError(final_result.get('message', "Processing failed."))
+    return final_result
+
+
+def run_video_job(job, video_path, references, video_filename):
+    """Job body: streams generator events into the job log, then registers the (lazily built) reports."""
+    processor = model_registry.get_processor()
+    if VIDEO_SEGMENTS > 1:
+        # Long videos fan out over worker processes; short ones fall through to `processor`
+        processor = SegmentedVideoProcessor(processor)
+
+    final_result = _publish_events(job, processor.process_video_generator(video_path, references))
+
+    # Reports are built on first download (or by the background builder), not here
+    report_urls = get_report_builder().register_video(video_filename)
+
+    return {
+        "video_name": video_filename,
+        "report_urls": report_urls,
+        "frames_processed": final_result['frames_processed'],
+        "matches_found": final_result['matches_found']
+    }
+
+
+def _reference_labels(count: int):
+    """The request's optional `reference_labels` (one per reference image) and an error message."""
+    labels = request.form.getlist('reference_labels')
+    if labels and len(labels) != count:
+        return None, "reference_labels must have one entry per reference image."
+    return labels, None
+
+
+def _group_references(ref_paths: list, labels: list):
+    """{label: [paths]} for a multi-person search, or the plain list of paths without labels."""
+    if not labels:
+        return ref_paths
+    references = {}
+    for label, ref_path in zip(labels, ref_paths):
+        references.setdefault(label, []).append(ref_path)
+    return references
+
+
+def _request_references(ref_files):
+    """
+    Saves the uploaded reference images and returns (references, error): a list of paths,
+    {label: [paths]} when `reference_labels` are given, or the enrolled gallery index.
+    """
+    ref_paths = []
+    for i, ref_file in enumerate(ref_files):
+        ref_filename = secure_filename(f"ref_{i}_{ref_file.filename}")
+        ref_path = os.path.join(app.config['UPLOAD_FOLDER'], ref_filename)
+        ref_file.save(ref_path)
+        ref_paths.append(ref_path)
+
+    # Optional multi-person search: one `reference_labels` value per reference image
+    ref_labels, error = _reference_labels(len(ref_paths))
+    if error:
+        return None, error
+    references = _group_references(ref_paths, ref_labels)
+
+    # Search the whole enrolled gallery instead of (only) the uploaded references
+    if request.form.get('search_enrolled') == '1':
+        references = model_registry.get_gallery_index()
+        if references is None:
+            return None, "No identities have been enrolled yet."
+    return references, None
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_files():
-    """Handles batch video upload and processing."""
-    
-    clear_previous_session_data()
+    """Saves the uploaded video + references and queues a processing job."""
     
-    if 'video' not in request.files or 'reference_images' not in request.files:
+    if 'video' not in request.files or ('reference_images' not in request.files and request.form.get('search_enrolled') != '1'):
         return jsonify({"message": "Missing video or reference images."}), 400
-        
+
     video_file = request.files['video']
     ref_files = request.files.getlist('reference_images')
+    video_filename = secure_filename(video_file.filename)
+
+    # Wiping the folders would pull files out from under queued/running jobs
+    if job_manager.active_count() == 0:
+        clear_previous_session_data(keep_video=video_filename)
     
     # Save Files
-    video_filename = secure_filename(video_file.filename)
     video_path = os.path.join(app.config['UPLOAD_FOLDER'], video_filename)
     video_file.save(video_path)
     
+    references, error = _request_references(ref_files)
+    if error:
+        return jsonify({"message": error}), 400
+
+    try:
+        job = job_manager.submit(
+            'video', run_video_job, video_path, references, video_filename,
+            video_filename=video_filename
+        )
+    except JobQueueFull as e:
+        return jsonify({"message": f"Server busy: {e} Try again later."}), 503
+
+    return jsonify({
+        "message": "Processing queued.",
+        "job_id": job.id,
+        "video_name": video_filename,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Returns the persisted state (queued/running/done/failed) of a job."""
+    record = job_manager.get_record(job_id)
+    if record is None:
+        return jsonify({"message": "Job not found."}), 404
+    return jsonify(record)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Streams a job's progress/match events as Server-Sent Events."""
+    job = job_manager.get_job(job_id)
+    if job is None:
+        record = job_manager.get_record(job_id)
+        if record is None:
+            return jsonify({"message": "Job not found."}), 404
+        # Finished long ago (or by another process): replay only the terminal state
+        final_event = {"status": record['status'], "job_id": job_id,
+                       "result": record['result'], "message": record['error']}
+        body = f"event: {record['status']}\ndata: {json.dumps(final_event)}\n\n"
+        return Response(body, mimetype='text/event-stream')
+
+    # Reconnecting EventSource clients send the id of the last event they saw
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('after', '-1'))
+    try:
+        after = int(last_event_id)
+    except ValueError:
+        after = -1
+
+    def event_stream():
+        for index, event in job.iter_events(after=after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {index}\nevent: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- OTHER ROUTES (No changes) ---
+
+# --- BATCH INGEST: many videos, one reference set ---
+def run_batch_job(job, batch_id):
+    """Job body: processes the unfinished videos of a batch, publishing their events."""
+    processor = model_registry.get_processor()
+    if VIDEO_SEGMENTS > 1:
+        processor = SegmentedVideoProcessor(processor)
+    return BatchRunner(batch_id, processor, publish=job.publish).run()
+
+
+def _batch_input_paths(raw_paths):
+    """Server-side video paths/directories, accepted only inside BATCH_INPUT_ROOT."""
+    if not BATCH_INPUT_ROOT:
+        return None
+    root = os.path.realpath(BATCH_INPUT_ROOT)
+    paths = []
+    for raw in raw_paths:
+        path = os.path.realpath(os.path.join(root, raw))
+        if os.path.commonpath([root, path]) != root:
+            return None
+        paths.append(path)
+    return paths
+
+
+# Makes "is the batch's job still alive?" and the submit that follows one step
+_batch_submit_lock = threading.Lock()
+
+
+def _batch_job_active(batch: dict) -> bool:
+    """True while the batch's own job is queued or running, in this or another server process."""
+    if not batch.get('job_id'):
+        return False
+    job = job_manager.get_job(batch['job_id'])
+    if job is not None:
+        return not job.finished
+    record = job_manager.get_record(batch['job_id'])
+    return record is not None and record['status'] in (QUEUED, RUNNING)
+
+
+def _submit_batch(batch_id):
+    job = job_manager.submit('batch', run_batch_job, batch_id)
+    set_batch_job(batch_id, job.id)
+    return {
+        "batch_id": batch_id,
+        "job_id": job.id,
+        "status_url": f"/api/batches/{batch_id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }
+
+
+@app.route('/api/batches', methods=['POST'])
+def create_batch_job():
+    """
+    Registers and queues a batch: reference images (optionally `reference_labels`) plus either
+    uploaded `videos` or `video_paths` (files/directories under BATCH_INPUT_ROOT).
+    Earlier results are kept.
+    """
+    ref_files = request.files.getlist('reference_images')
+    video_files = request.files.getlist('videos')
+    raw_paths = request.form.getlist('video_paths')
+    if not ref_files or not (video_files or raw_paths):
+        return jsonify({"message": "Missing reference images or videos."}), 400
+
+    ref_labels, error = _reference_labels(len(ref_files))
+    if error:
+        return jsonify({"message": error}), 400
+
+    inputs = []
+    if raw_paths:
+        inputs = _batch_input_paths(raw_paths)
+        if inputs is None:
+            return jsonify({"message": "video_paths must lie inside the configured BATCH_INPUT_ROOT."}), 400
+
+    # Uploaded files live in their own folder, untouched by the single-upload cleanup
+    batch_dir = os.path.join(BATCH_FOLDER, uuid.uuid4().hex)
+    os.makedirs(batch_dir, exist_ok=True)
+
     ref_paths = []
     for i, ref_file in enumerate(ref_files):
-        ref_filename = secure_filename(f"ref_{i}_{ref_file.filename}")
-        ref_path = os.path.join(app.config['UPLOAD_FOLDER'], ref_filename)
+        ref_path = os.path.join(batch_dir, secure_filename(f"ref_{i}_{ref_file.filename}"))
         ref_file.save(ref_path)
         ref_paths.append(ref_path)
+    references = _group_references(ref_paths, ref_labels)
 
-    # Start Deep Learning Processing
-    processor = VideoProcessor()
-    
-    # Call generator function and collect results
-    # This works because video_processor.py was already updated
-    generator_results = list(processor.process_video_generator(video_path, ref_paths))
-    
-    # Check the final message from the generator
-    if not generator_results:
-        return jsonify({"message": "Processing failed to start."}), 500
-        
-    final_result = generator_results[-1] 
-    
-    # Generate Reports on completion
-    if final_result['status'] == 'completed':
-        generator = ReportGenerator()
-        
-        csv_report_path = generator.generate_csv(video_filename)
-        pdf_report_path = generator.generate_pdf(video_filename)
-        
-        return jsonify({
-            "message": "Processing complete.", 
-            "video_name": video_filename, 
-            "report_urls": {
-                "csv": os.path.basename(csv_report_path) if csv_report_path else None,
-                "pdf": os.path.basename(pdf_report_path) if pdf_report_path else None
-            },
-            # Pass the full generator list for sequential frontend rendering
-            "details": generator_results 
-        }), 200
+    if video_files:
+        videos_dir = os.path.join(batch_dir, 'videos')
+        os.makedirs(videos_dir, exist_ok=True)
+        for video_file in video_files:
+            video_file.save(os.path.join(videos_dir, secure_filename(video_file.filename)))
+        inputs.append(videos_dir)
+
+    try:
+        batch_id = create_batch(inputs, references, name=request.form.get('name'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        response = _submit_batch(batch_id)
+    except JobQueueFull as e:
+        return jsonify({"message": f"Server busy: {e} Resume the batch later.", "batch_id": batch_id}), 503
+    return jsonify({"message": "Batch queued.", **response}), 202
+
+
+@app.route('/api/batches/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """Batch state, per-video states and (once finished) the consolidated report names."""
+    batch = get_batch(batch_id)
+    if batch is None:
+        return jsonify({"message": "Batch not found."}), 404
+    return jsonify(batch)
+
+
+@app.route('/api/batches/<batch_id>/resume', methods=['POST'])
+def resume_batch(batch_id):
+    """Re-queues a batch; only videos that did not finish are processed again."""
+    with _batch_submit_lock:
+        batch = get_batch(batch_id)
+        if batch is None:
+            return jsonify({"message": "Batch not found."}), 404
+        if _batch_job_active(batch):
+            return jsonify({"message": "Batch is already queued or running.", "job_id": batch['job_id']}), 409
+        try:
+            response = _submit_batch(batch_id)
+        except JobQueueFull as e:
+            return jsonify({"message": f"Server busy: {e} Try again later."}), 503
+    return jsonify({"message": "Batch resumed.", **response}), 202
+
+
+# --- FACE ARCHIVES: index a video once, search it many times ---
+def run_index_job(job, video_path, video_filename):
+    """Job body: stores every detected face of the video in its face archive."""
+    processor = model_registry.get_processor()
+    final_result = _publish_events(job, processor.index_video_generator(video_path, video_filename))
+    return {"video_name": video_filename, "frames_processed": final_result['frames_processed'],
+            "faces_indexed": final_result['faces_indexed']}
+
+
+def run_archive_search_job(job, video_filename, references):
+    """Job body: searches an indexed video's archive; same result shape as a video job."""
+    processor = model_registry.get_processor()
+    final_result = _publish_events(job, processor.search_archive_generator(video_filename, references))
+    return {
+        "video_name": video_filename,
+        "report_urls": get_report_builder().register_video(video_filename),
+        "frames_processed": final_result['frames_processed'],
+        "matches_found": final_result['matches_found']
+    }
+
+
+@app.route('/api/archives', methods=['POST'])
+def index_video():
+    """Queues an indexing job for an uploaded `video` (or a `video_path` under BATCH_INPUT_ROOT)."""
+    if 'video' in request.files:
+        video_file = request.files['video']
+        video_filename = secure_filename(video_file.filename)
+        # Kept outside the per-session upload folder: matched crops are re-extracted from it later
+        video_folder = os.path.join(BATCH_FOLDER, 'indexed')
+        os.makedirs(video_folder, exist_ok=True)
+        video_path = os.path.join(video_folder, video_filename)
+        video_file.save(video_path)
+    elif request.form.get('video_path'):
+        paths = _batch_input_paths([request.form['video_path']])
+        if not paths or not os.path.isfile(paths[0]):
+            return jsonify({"message": "video_path must be a file inside BATCH_INPUT_ROOT."}), 400
+        video_path = paths[0]
+        video_filename = secure_filename(os.path.basename(video_path))
     else:
-        # If the generator returned an error status
-        return jsonify({"message": "Processing failed.", "details": final_result}), 500
+        return jsonify({"message": "Missing video."}), 400
+
+    try:
+        job = job_manager.submit('index', run_index_job, video_path, video_filename, video_filename=video_filename)
+    except JobQueueFull as e:
+        return jsonify({"message": f"Server busy: {e} Try again later."}), 503
+    return jsonify({"message": "Indexing queued.", "job_id": job.id, "video_name": video_filename,
+                    "status_url": f"/api/jobs/{job.id}", "events_url": f"/api/jobs/{job.id}/events"}), 202
+
+
+@app.route('/api/archives', methods=['GET'])
+def list_indexed_videos():
+    """Metadata (faces, frames, model version, ...) of every indexed video."""
+    return jsonify(list_archives())
+
+
+@app.route('/api/archives/<video_name>/search', methods=['POST'])
+def search_indexed_video(video_name):
+    """Queues a search of an indexed video; takes the same reference fields as /api/upload."""
+    if 'reference_images' not in request.files and request.form.get('search_enrolled') != '1':
+        return jsonify({"message": "Missing reference images."}), 400
+    if FaceArchive.open(video_name) is None:
+        return jsonify({"message": f"{video_name} has not been indexed."}), 404
+
+    if job_manager.active_count() == 0:
+        clear_previous_session_data()
+    references, error = _request_references(request.files.getlist('reference_images'))
+    if error:
+        return jsonify({"message": error}), 400
+
+    try:
+        job = job_manager.submit('archive_search', run_archive_search_job, video_name, references,
+                                 video_filename=video_name)
+    except JobQueueFull as e:
+        return jsonify({"message": f"Server busy: {e} Try again later."}), 503
+    return jsonify({"message": "Search queued.", "job_id": job.id, "video_name": video_name,
+                    "status_url": f"/api/jobs/{job.id}", "events_url": f"/api/jobs/{job.id}/events"}), 202
 
-# --- OTHER ROUTES (No changes) ---
 
 @app.route('/api/results/<video_name>', methods=['GET'])
 def get_results(video_name):
-    """Fetches detection logs for a video from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT frame_number, timestamp, similarity, match_image_path FROM detections WHERE video_filename = ? ORDER BY frame_number",
-        (video_name,)
-    )
-    results = [
-        {
-            "frame": row[0],
-            "timestamp": row[1],
-            "similarity": f"{row[2]:.4f}",
-            "image_url": f"/api/static/matches/{row[3]}"
-        } for row in cursor.fetchall()
-    ]
-    conn.close()
-    return jsonify(results)
+    """
+    Fetches detection logs for a video from the database.
+
+    ?after_frame=&after_id=&limit= returns one keyset page plus the cursor of the next one
+    (`next` is null on the last page); without them every row is returned as a plain list.
+    ?mode=per_second returns per-second buckets for timeline views instead of rows.
+    """
+    if request.args.get('mode') == 'per_second':
+        return jsonify(per_second_timeline(video_name))
+
+    try:
+        after_frame, after_id, limit = (int(request.args[name]) if request.args.get(name) else None
+                                        for name in ('after_frame', 'after_id', 'limit'))
+    except ValueError:
+        return jsonify({"message": "after_frame, after_id and limit must be integers."}), 400
+
+    if after_frame is None and limit is None:
+        results, _ = fetch_results(video_name)
+        return jsonify(results)
+
+    limit = min(max(1, limit or RESULTS_MAX_PAGE_SIZE), RESULTS_MAX_PAGE_SIZE)
+    results, next_cursor = fetch_results(video_name, after_frame, after_id, limit)
+    return jsonify({"results": results, "next": next_cursor})
+
+@app.route('/api/gallery/enroll', methods=['POST'])
+def enroll_gallery_identity():
+    """Enrolls one identity (name + reference images) into the persistent search gallery."""
+    identity = request.form.get('identity', '').strip()
+    if not identity or 'reference_images' not in request.files:
+        return jsonify({"message": "Missing identity or reference images."}), 400
+
+    pipeline = model_registry.get_pipeline()
+    embedding = pipeline.get_reference_embedding(request.files.getlist('reference_images'))
+    if embedding is None:
+        return jsonify({"message": "Could not generate reference embedding."}), 500
+
+    gallery_size = model_registry.enroll_identity(identity, embedding)
+    return jsonify({"message": "Identity enrolled.", "identity": identity, "gallery_size": gallery_size}), 200
+
+@app.route('/api/models/status', methods=['GET'])
+def models_status():
+    """Reports whether the shared models are loaded and how much memory they use."""
+    return jsonify(model_registry.status())
+
+@app.route('/api/reports/<filename>/status', methods=['GET'])
+def report_status(filename):
+    """Whether a report is ready, being built, stale (new detections since) or not built yet."""
+    status = get_report_builder().status(filename)
+    if status['state'] == 'unknown':
+        return jsonify(status), 404
+    return jsonify(status)
 
 @app.route('/api/static/<folder>/<filename>')
 def serve_static(folder, filename):
-    """Serves matched images and reports."""
+    """Serves matched images and reports (reports are built or refreshed on first download)."""
     directory_to_serve = None
     if folder == 'matches':
         directory_to_serve = MATCHES_FOLDER
@@ -253,10 +672,30 @@ def serve_static(folder, filename):
         directory_to_serve = REPORTS_FOLDER
     else:
         return jsonify({"message": "Not Found"}), 404
-        
+
+    if folder == 'reports':
+        builder = get_report_builder()
+        if builder.status(filename)['state'] != 'unknown':
+            if builder.build(filename) is None:
+                return jsonify({"message": "No detections to report."}), 404
+            # ETag = the detections state the file was built from; clients revalidate every time
+            # (If-None-Match / If-Modified-Since -> 304) and only a rebuilt report is re-sent
+            etag = builder.status(filename)['etag']
+            return send_from_directory(directory_to_serve, filename, as_attachment=True, etag=etag, max_age=0)
+
     return send_from_directory(directory_to_serve, filename, as_attachment=(folder == 'reports'))
 
+def preload_if_configured(debug: bool):
+    """Opt-in eager model load + warm-up. Skipped in the debug reloader's parent process."""
+    if not PRELOAD_MODELS:
+        return
+    if debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    model_registry.preload_models(warmup=WARMUP_ON_PRELOAD)
+
 if __name__ == '__main__':
     # Run the app from *inside* the 'backend' folder
     print("🚀 Starting Flask API on http://127.0.0.1:5000")
+    init_app()
+    preload_if_configured(debug=True)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Benchmark: CPU throughput of batched multi-frame inference.
+
+Times FaceRecognitionPipeline.process_frames over the same sampled frames
+at several batch sizes (default 1/8/32) and reports frames/sec and faces/sec.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_batch_inference --video path/to/clip.mp4
+"""
+import argparse
+import glob
+import os
+import time
+
+import torch
+
+from ..config import FRAME_SKIP, UPLOAD_FOLDER
+from ..modules.face_recognition_pipeline import FaceRecognitionPipeline
+from .bench_process_frame import load_clip
+
+
+def run(pipeline, frames, batch_size):
+    faces = 0
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        for faces_in_frame in pipeline.process_frames(frames[i:i + batch_size]):
+            faces += len(faces_in_frame)
+    elapsed = time.perf_counter() - start
+
+    fps = len(frames) / elapsed if elapsed > 0 else 0.0
+    face_rate = faces / elapsed if elapsed > 0 else 0.0
+    print(f"batch={batch_size:<4} frames={len(frames):<5} faces={faces:<6} time={elapsed:8.2f}s  "
+          f"fps={fps:7.2f}  faces/s={face_rate:7.2f}")
+    return fps
+
+
+def main():
+    default_videos = sorted(glob.glob(os.path.join(UPLOAD_FOLDER, '*.mp4')))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default=default_videos[0] if default_videos else None)
+    parser.add_argument('--frames', type=int, default=128, help="Number of sampled frames to time.")
+    parser.add_argument('--stride', type=int, default=FRAME_SKIP, help="Take every Nth frame of the clip.")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    if not args.video or not os.path.exists(args.video):
+        parser.error("No benchmark clip found; pass --video.")
+
+    frames = load_clip(args.video, args.frames, args.stride)
+    if not frames:
+        parser.error(f"Could not decode frames from {args.video}")
+
+    pipeline = FaceRecognitionPipeline()
+    if pipeline.device.type != 'cpu':
+        print(f"⚠️ Running on {pipeline.device}; set CUDA_VISIBLE_DEVICES='' for a CPU-only comparison.")
+    print(f"📼 Clip: {args.video} ({len(frames)} frames, torch threads={torch.get_num_threads()})")
+
+    # Warm-up so lazy allocations don't land in the first measurement
+    pipeline.process_frames(frames[:2])
+
+    results = {bs: run(pipeline, frames, bs) for bs in args.batch_sizes}
+
+    baseline = results.get(1)
+    if baseline:
+        for bs, fps in results.items():
+            print(f"⚡ batch={bs}: {fps / baseline:.2f}x vs batch=1")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: detections rows/sec, per-row connect/commit vs. DetectionWriter.
+
+Both variants write into a throw-away SQLite file with the real `detections` schema,
+so the project database is never touched.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_detection_writer --rows 5000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from ..modules.detection_writer import DetectionWriter
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS detections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_filename TEXT NOT NULL,
+        frame_number INTEGER NOT NULL,
+        timestamp TEXT NOT NULL,
+        similarity REAL NOT NULL,
+        match_image_path TEXT NOT NULL,
+        identity TEXT,
+        end_frame_number INTEGER,
+        end_timestamp TEXT,
+        timestamp_ms INTEGER,
+        end_timestamp_ms INTEGER,
+        processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_detections_video_frame ON detections (video_filename, frame_number);
+'''
+
+
+def make_rows(count):
+    return [("bench.mp4", i * 10, f"0:00:{i % 60:02d}", 0.8, f"bench_F{i * 10}.jpg", "target",
+             i * 10 + 40, f"0:00:{(i + 1) % 60:02d}", i % 60 * 1000, (i + 1) % 60 * 1000) for i in range(count)]
+
+
+def per_row_connect(db_path, rows):
+    """The pre-optimization path: one connection, insert and commit per match."""
+    for row in rows:
+        conn = sqlite3.connect(db_path)
+        conn.execute(DetectionWriter.INSERT_SQL, row)
+        conn.commit()
+        conn.close()
+
+
+def buffered_writer(db_path, rows):
+    with DetectionWriter(db_path=db_path) as writer:
+        for row in rows:
+            writer.add(*row[:8])
+            if writer.should_flush():
+                writer.flush()
+
+
+def run(label, fn, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        conn = sqlite3.connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        start = time.perf_counter()
+        fn(db_path, rows)
+        elapsed = time.perf_counter() - start
+
+        conn = sqlite3.connect(db_path)
+        written = conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        conn.close()
+
+    rate = len(rows) / elapsed if elapsed > 0 else 0.0
+    print(f"{label:<16} rows={written:<7} time={elapsed:8.3f}s  rows/s={rate:10.1f}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    before = run("per-row connect", per_row_connect, rows)
+    after = run("DetectionWriter", buffered_writer, rows)
+    if before > 0:
+        print(f"⚡ Speedup: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: FaceNet embedder backends, accuracy and faces/sec on CPU.
+
+Builds a fixed set of aligned faces from --images (default backend/test.jpg): MTCNN finds
+the face once, then --faces crops are extracted with seeded box jitter, horizontal flips and
+brightness/contrast changes, so every run embeds exactly the same tensors. Each backend in
+--backends (see modules/embedder_backends.py; 'onnx-int8' = ONNX with int8 quantization)
+then embeds the set:
+  accuracy  1 - cosine similarity to the eager backend's embeddings, per face (mean/p99/max);
+            the check fails when max exceeds --max-deviation (--max-deviation-int8 for int8)
+  speed     faces/sec in batches of --batch-size, best of --repeats passes after a warm-up
+Results print as a table (and JSON with --output); the exit status is 1 if a check failed.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_embedder --backends eager torchscript onnx onnx-int8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test.jpg')
+
+
+def face_set(pipeline, images, count, seed):
+    """(count, 3, 160, 160) aligned faces, deterministic for a given seed."""
+    import torch
+
+    rng = np.random.default_rng(seed)
+    sources = []
+    for path in images:
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"Could not read {path}")
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        boxes, _ = pipeline.mtcnn.detect(rgb)
+        if boxes is not None:
+            sources.extend((rgb, box) for box in boxes)
+    if not sources:
+        raise RuntimeError("No face found in the benchmark images.")
+
+    faces = []
+    for i in range(count):
+        rgb, box = sources[i % len(sources)]
+        # Jittered alignment, like detections of the same face across video frames
+        jittered = (box + rng.uniform(-0.06, 0.06, 4) * (box[2] - box[0])).astype(np.float32)
+        face = pipeline.mtcnn.extract(rgb, jittered[None], None)[0]
+        if rng.random() < 0.5:
+            face = torch.flip(face, dims=[2])
+        face = (face * rng.uniform(0.75, 1.25) + rng.uniform(-25, 25)).clamp(0, 255)
+        faces.append(face)
+    return torch.stack(faces)
+
+
+def embed_all(embedder, faces, batch_size):
+    return np.concatenate([embedder(faces[i:i + batch_size]) for i in range(0, len(faces), batch_size)])
+
+
+def faces_per_second(embedder, faces, batch_size, repeats):
+    embed_all(embedder, faces[:batch_size * 2], batch_size)  # warm-up (and compilation)
+    best = float('inf')
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter()
+        embed_all(embedder, faces, batch_size)
+        best = min(best, time.perf_counter() - started)
+    return len(faces) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['eager', 'torchscript', 'compile', 'onnx', 'onnx-int8'])
+    parser.add_argument('--images', nargs='+', default=[DEFAULT_IMAGE])
+    parser.add_argument('--faces', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=0, help="torch CPU threads (0 = torch default)")
+    parser.add_argument('--max-deviation', type=float, default=1e-3)
+    parser.add_argument('--max-deviation-int8', type=float, default=2e-2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    # CPU nodes are the target; hide any GPU before torch initializes CUDA
+    os.environ['CUDA_VISIBLE_DEVICES'] = ''
+    import torch
+    from ..modules.embedder_backends import EagerEmbedder, cosine_deviation, make_embedder
+    from ..modules.face_recognition_pipeline import FaceRecognitionPipeline
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    pipeline = FaceRecognitionPipeline()
+    faces = face_set(pipeline, args.images, args.faces, args.seed)
+    print(f"🧪 {len(faces)} faces, batch {args.batch_size}, {torch.get_num_threads()} torch threads", file=sys.stderr)
+
+    reference = embed_all(EagerEmbedder(pipeline.embedder, pipeline.device), faces, args.batch_size)
+    results = {}
+    for backend in args.backends:
+        int8 = backend == 'onnx-int8'
+        started = time.perf_counter()
+        try:
+            embedder = make_embedder(pipeline.embedder, pipeline.device, 'onnx' if int8 else backend, int8=int8)
+        except (RuntimeError, ValueError) as e:
+            results[backend] = {"skipped": str(e)}
+            print(f"{backend:<12} skipped: {e}", file=sys.stderr)
+            continue
+        setup_s = time.perf_counter() - started
+
+        rate = faces_per_second(embedder, faces, args.batch_size, args.repeats)
+        deviation = cosine_deviation(reference, embed_all(embedder, faces, args.batch_size))
+        limit = args.max_deviation_int8 if int8 else args.max_deviation
+        results[backend] = {
+            "setup_s": round(setup_s, 2),
+            "faces_per_s": round(rate, 1),
+            "cosine_deviation": deviation,
+            "max_allowed": limit,
+            "ok": deviation["max"] <= limit,
+        }
+
+    eager_rate = results.get('eager', {}).get('faces_per_s')
+    print(f"\n{'backend':<12}{'faces/s':>10}{'speedup':>9}{'dev mean':>11}{'dev p99':>11}{'dev max':>11}  check",
+          file=sys.stderr)
+    for backend, result in results.items():
+        if "skipped" in result:
+            continue
+        speedup = f"{result['faces_per_s'] / eager_rate:.2f}x" if eager_rate else '-'
+        deviation = result['cosine_deviation']
+        print(f"{backend:<12}{result['faces_per_s']:>10.1f}{speedup:>9}{deviation['mean']:>11.2e}"
+              f"{deviation['p99']:>11.2e}{deviation['max']:>11.2e}  {'ok' if result['ok'] else 'FAIL'}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"faces": len(faces), "batch_size": args.batch_size, "results": results}, f, indent=2)
+    if not all(result.get("ok", True) for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
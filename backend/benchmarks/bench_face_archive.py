@@ -0,0 +1,80 @@
+"""
+Benchmark: searching an indexed video's face archive.
+
+Writes a synthetic archive of --faces faces (random unit 512-d embeddings, a few faces per
+sampled frame, --planted faces close to each reference) with FaceArchiveWriter, then times
+per search (mean over --repeats) against a gallery of --identities references:
+  mmap    FaceArchive.load() + search(), embeddings memory-mapped from the float16 column
+  memory  the same search with the archive loaded fully into RAM
+and checks every planted face is found. Compare with re-running the video pipeline, which
+has to decode and embed every sampled frame again for each new reference set.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_face_archive --faces 1000000 --identities 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from ..modules.face_archive import FaceArchive, FaceArchiveWriter
+from ..modules.matcher import GalleryMatcher
+
+FACES_PER_FRAME = 4
+
+
+def unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def build(path, faces, references, planted, rng):
+    frames = faces // FACES_PER_FRAME
+    planted_frames = {int(frame): index % len(references)
+                      for index, frame in enumerate(rng.choice(frames, planted * len(references), replace=False))}
+    writer = FaceArchiveWriter(path)
+    start = time.perf_counter()
+    for frame in range(frames):
+        embeddings = unit(rng.standard_normal((FACES_PER_FRAME, 512)).astype(np.float32))
+        if frame in planted_frames:
+            embeddings[0] = unit(references[planted_frames[frame]] + 0.02 * rng.standard_normal(512))
+        boxes = np.tile(np.array([10, 10, 90, 110], dtype=np.float32), (FACES_PER_FRAME, 1))
+        writer.add_frame(frame * 10, frame * 400, boxes, np.full(FACES_PER_FRAME, 0.99), embeddings)
+    writer.close({"video_filename": "bench.mp4"})
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"write            {writer.faces} faces in {time.perf_counter() - start:.1f}s, {size / 2**20:.0f} MiB")
+    return len(planted_frames)
+
+
+def time_search(path, gallery, mmap, repeats):
+    total = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        hits = FaceArchive.load(path, mmap=mmap).search(gallery)
+        total += time.perf_counter() - start
+    return total / repeats * 1000, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faces', type=int, default=1000000)
+    parser.add_argument('--identities', type=int, default=10)
+    parser.add_argument('--planted', type=int, default=20, help="faces planted per reference identity")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    references = unit(rng.standard_normal((args.identities, 512)).astype(np.float32))
+    gallery = GalleryMatcher([f"person_{i}" for i in range(args.identities)], references)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.mp4')
+        expected = build(path, args.faces, references, args.planted, rng)
+        for label, mmap in (("mmap", True), ("memory", False)):
+            elapsed, hits = time_search(path, gallery, mmap, args.repeats)
+            print(f"search {label:<9} {elapsed:8.1f} ms  hits={len(hits)}/{expected}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: serial vs pipelined live MJPEG stream, headless.
+
+Uses a video file as a stand-in camera (paced at its native FPS) and consumes the
+encoded JPEGs for a fixed wall-clock duration. Reports the delivered stream FPS of
+the old serial loop (read -> infer -> draw -> encode) and of LiveStreamPipeline,
+plus the pipeline's per-stage latency and how stale its boxes are. With
+--viewers N, extra viewers share the same producer (fan-out) and must not
+lower the delivered FPS.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_live_stream --video path/to/clip.mp4 --reference backend/test.jpg
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import cv2
+
+from ..config import LIVE_JPEG_QUALITY, UPLOAD_FOLDER
+from ..modules.live_stream import LiveStreamPipeline
+from ..modules.video_processor import VideoProcessor
+
+DEFAULT_REFERENCE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test.jpg')
+
+
+def run_serial(processor, reference_embedding, video, seconds):
+    """The pre-pipeline loop: every displayed frame waits for its own inference."""
+    cap = cv2.VideoCapture(video)
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, LIVE_JPEG_QUALITY]
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        for face_data in processor.pipeline.process_frame(frame):
+            similarity, _ = processor.matcher.match(face_data['embedding'], reference_embedding)
+            x1, y1, x2, y2 = face_data['box']
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.imencode('.jpg', frame, encode_params)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return frames / elapsed if elapsed > 0 else 0.0
+
+
+def consume(subscriber, seconds, counts, index):
+    start = time.perf_counter()
+    for _ in subscriber.jpeg_frames():
+        counts[index] += 1
+        if time.perf_counter() - start >= seconds:
+            break
+    subscriber.close()
+
+
+def run_pipelined(processor, reference_embedding, video, seconds, viewers=1):
+    pipeline = LiveStreamPipeline(processor, source=video)
+    if not pipeline.start():
+        raise SystemExit(f"Could not open {video}")
+
+    counts = [0] * viewers
+    threads = [threading.Thread(target=consume, args=(pipeline.subscribe('bench', reference_embedding), seconds, counts, i))
+               for i in range(viewers)]
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = time.perf_counter() - start
+        pipeline.stop()
+    return [count / elapsed if elapsed > 0 else 0.0 for count in counts], pipeline.summary()
+
+
+def main():
+    default_videos = sorted(glob.glob(os.path.join(UPLOAD_FOLDER, '*.mp4')))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default=default_videos[0] if default_videos else None)
+    parser.add_argument('--reference', default=DEFAULT_REFERENCE, help="Reference face image.")
+    parser.add_argument('--seconds', type=float, default=20.0, help="Wall-clock duration of each run.")
+    parser.add_argument('--viewers', type=int, default=1, help="Viewers sharing the pipelined producer.")
+    args = parser.parse_args()
+
+    if not args.video or not os.path.exists(args.video):
+        parser.error("No benchmark clip found; pass --video.")
+
+    processor = VideoProcessor()
+    reference_embedding = processor.pipeline.get_reference_embedding([args.reference])
+    if reference_embedding is None:
+        parser.error(f"No face found in {args.reference}")
+
+    cap = cv2.VideoCapture(args.video)
+    source_fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    print(f"📼 Source: {args.video} ({source_fps:.1f} FPS)")
+
+    serial_fps = run_serial(processor, reference_embedding, args.video, args.seconds)
+    print(f"serial     stream fps={serial_fps:7.2f}")
+
+    viewer_fps, summary = run_pipelined(processor, reference_embedding, args.video, args.seconds, args.viewers)
+    pipelined_fps = min(viewer_fps)
+    print(f"pipelined  stream fps={pipelined_fps:7.2f} (slowest of {args.viewers} viewer(s))")
+    print(json.dumps(summary, indent=2))
+
+    if serial_fps:
+        print(f"⚡ Pipelined stream delivers {pipelined_fps / serial_fps:.2f}x the serial FPS")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: report generation time and peak Python memory, legacy vs. streaming ReportGenerator.
+
+"legacy" is the previous path: the whole result set is loaded into a pandas DataFrame,
+written with to_csv, and the PDF walks df.iterrows() embedding every full-size crop.
+"streaming" is ReportGenerator: cursor chunks, incremental CSV, cached thumbnails.
+"cached" is a second request with no new detections (served from the report cache).
+
+Everything lives in a throw-away directory (SQLite file, synthetic 160x160 crops), so the
+project database is never touched. Rows cycle through --crops distinct crop files.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_reports --rows 1000 10000 100000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+from ..modules.report_generator import VIDEO_COLUMNS, ReportGenerator
+from .bench_detection_writer import SCHEMA
+
+REPORTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS reports (
+        name TEXT PRIMARY KEY,
+        kind TEXT,
+        source TEXT,
+        source_version TEXT NOT NULL,
+        generated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+VIDEO = "bench.mp4"
+
+
+def make_fixture(tmp, rows, crops):
+    matches = os.path.join(tmp, 'matches')
+    os.makedirs(matches)
+    rng = np.random.default_rng(0)
+    for i in range(crops):
+        crop = cv2.GaussianBlur(rng.integers(0, 255, (160, 160, 3), dtype=np.uint8), (9, 9), 0)
+        cv2.imwrite(os.path.join(matches, f"crop_{i}.jpg"), crop, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+    db_path = os.path.join(tmp, 'bench.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA + REPORTS_SCHEMA)
+    conn.executemany(
+        "INSERT INTO detections (video_filename, frame_number, timestamp, similarity, match_image_path, identity, "
+        "end_frame_number, end_timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((VIDEO, i * 10, f"0:{i // 600 % 60:02d}:{i // 10 % 60:02d}", 0.7 + (i % 30) / 100, f"crop_{i % crops}.jpg",
+          f"person_{i % 5}", i * 10 + 40, f"0:{i // 600 % 60:02d}:{(i // 10 + 1) % 60:02d}") for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+    return db_path, matches
+
+
+def legacy_csv(db_path, path):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query(f"SELECT {', '.join(VIDEO_COLUMNS)} FROM detections WHERE video_filename = ? "
+                           "ORDER BY frame_number", conn, params=(VIDEO,))
+    conn.close()
+    df.to_csv(path, index=False)
+
+
+def legacy_pdf(db_path, path, matches):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query(f"SELECT {', '.join(VIDEO_COLUMNS)} FROM detections WHERE video_filename = ? "
+                           "ORDER BY frame_number", conn, params=(VIDEO,))
+    conn.close()
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", "", 9)
+    widths = [22, 38, 35, 25]
+    for _, row in df.iterrows():
+        if pdf.get_y() + 25 > 275:
+            pdf.add_page()
+        start_y = pdf.get_y()
+        x = 10
+        for value, width in zip([str(row['frame_number']), str(row['identity']), str(row['timestamp']),
+                                 f"{row['similarity']:.4f}"], widths):
+            pdf.multi_cell(width, 25, value, 1, 'C', 0)
+            x += width
+            pdf.set_y(start_y)
+            pdf.set_x(x)
+        pdf.image(os.path.join(matches, row['match_image_path']), x=x + 2, y=start_y + 2, h=21)
+        pdf.set_y(start_y)
+        pdf.set_x(x)
+        pdf.multi_cell(70, 25, "", 1, 'C', 1)
+    pdf.output(path)
+
+
+def measure(fn, memory=False):
+    """(seconds, peak traced MiB or None). tracemalloc slows Python-heavy code, so it is opt-in."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def report(label, rows, elapsed, peak, path=None):
+    memory = f"peak={peak / 2**20:7.1f} MiB  " if peak is not None else ""
+    size = f"size={os.path.getsize(path) / 2**20:6.1f} MB" if path and os.path.exists(path) else ""
+    print(f"{label:<18} rows={rows:<7} time={elapsed:8.3f}s  {memory}{size}")
+
+
+def run(rows, crops, legacy_pdf_max, memory):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, matches = make_fixture(tmp, rows, crops)
+        reports = os.path.join(tmp, 'reports')
+        os.makedirs(reports)
+        generator = ReportGenerator(db_path=db_path, reports_folder=reports, matches_folder=matches,
+                                    thumbnail_folder=os.path.join(matches, 'thumbs'))
+
+        legacy_path = os.path.join(reports, 'legacy.csv')
+        report("legacy csv", rows, *measure(lambda: legacy_csv(db_path, legacy_path), memory), legacy_path)
+        path = {}
+        report("streaming csv", rows, *measure(lambda: path.update(csv=generator.generate_csv(VIDEO)), memory),
+               path['csv'])
+        report("cached csv", rows, *measure(lambda: generator.generate_csv(VIDEO)), memory)
+
+        if rows <= legacy_pdf_max:
+            legacy_path = os.path.join(reports, 'legacy.pdf')
+            report("legacy pdf", rows, *measure(lambda: legacy_pdf(db_path, legacy_path, matches), memory),
+                   legacy_path)
+        else:
+            print(f"legacy pdf         rows={rows:<7} skipped (--legacy-pdf-max {legacy_pdf_max})")
+        report("streaming pdf", rows, *measure(lambda: path.update(pdf=generator.generate_pdf(VIDEO)), memory),
+               path['pdf'])
+        report("cached pdf", rows, *measure(lambda: generator.generate_pdf(VIDEO)), memory)
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--crops', type=int, default=1000, help="distinct crop files the rows cycle through")
+    parser.add_argument('--legacy-pdf-max', type=int, default=10000,
+                        help="skip the (slow, memory-hungry) legacy PDF above this many rows")
+    parser.add_argument('--memory', action='store_true', help="also report peak traced Python memory")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        run(rows, args.crops, args.legacy_pdf_max, args.memory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: /api/results queries on a large `detections` table, before and after the
+(video_filename, frame_number) index.
+
+Builds a throw-away SQLite file with --rows detections spread over --videos videos
+(interleaved, as concurrent jobs would write them), backfills the integer-millisecond
+columns the way the init_db migration does, then times per query (mean over --samples
+random videos):
+  full      every row of a video (the old /api/results)
+  page      first keyset page (?limit=100)
+  deep page a keyset page from the middle of the video (?after_frame=&after_id=&limit=100)
+  timeline  per-second aggregation (?mode=per_second)
+
+Run from the project root:
+    python -m backend.benchmarks.bench_results_query --rows 1000000 --videos 1000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from ..database.init_db import timestamp_to_ms
+from ..modules.results_query import fetch_results, per_second_timeline
+from .bench_detection_writer import SCHEMA
+
+PAGE = 100
+
+
+def build(db_path, rows, videos):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    conn.execute("DROP INDEX idx_detections_video_frame")
+    per_video = rows // videos
+
+    def generate():
+        for i in range(per_video):
+            frame = i * 10
+            seconds = frame // 25
+            timestamp = f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            for v in range(videos):
+                yield (f"video_{v}.mp4", frame, timestamp, 0.7 + (i % 30) / 100, f"v{v}_F{frame}.jpg",
+                       f"person_{(i + v) % 7}", frame + 20, timestamp)
+
+    start = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO detections (video_filename, frame_number, timestamp, similarity, match_image_path, identity, "
+        "end_frame_number, end_timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", generate()
+    )
+    conn.commit()
+    print(f"insert           {per_video * videos} rows in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    conn.create_function('timestamp_to_ms', 1, timestamp_to_ms, deterministic=True)
+    conn.execute("UPDATE detections SET timestamp_ms = timestamp_to_ms(timestamp), "
+                 "end_timestamp_ms = timestamp_to_ms(end_timestamp)")
+    conn.commit()
+    print(f"ms backfill      {time.perf_counter() - start:.1f}s")
+    conn.close()
+    return per_video
+
+
+def time_queries(db_path, sample, per_video):
+    timings = {"full": 0.0, "page": 0.0, "deep page": 0.0, "timeline": 0.0}
+    for video in sample:
+        start = time.perf_counter()
+        fetch_results(video, db_path=db_path)
+        timings["full"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fetch_results(video, limit=PAGE, db_path=db_path)
+        timings["page"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fetch_results(video, after_frame=per_video // 2 * 10, after_id=0, limit=PAGE, db_path=db_path)
+        timings["deep page"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        per_second_timeline(video, db_path=db_path)
+        timings["timeline"] += time.perf_counter() - start
+    return {name: total / len(sample) * 1000 for name, total in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        per_video = build(db_path, args.rows, args.videos)
+        sample = [f"video_{v}.mp4" for v in random.Random(0).sample(range(args.videos), min(args.samples, args.videos))]
+
+        before = time_queries(db_path, sample, per_video)
+
+        conn = sqlite3.connect(db_path)
+        start = time.perf_counter()
+        conn.execute("CREATE INDEX idx_detections_video_frame ON detections (video_filename, frame_number)")
+        conn.commit()
+        conn.close()
+        print(f"create index     {time.perf_counter() - start:.1f}s")
+
+        after = time_queries(db_path, sample, per_video)
+
+    print(f"\n{'query':<12}{'no index (ms)':>15}{'index (ms)':>12}{'speedup':>10}")
+    for name in before:
+        print(f"{name:<12}{before[name]:>15.2f}{after[name]:>12.2f}{before[name] / after[name]:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmark suite: reproducible, headless throughput of the whole recognition stack on CPU.
+
+Sections (pick with --sections):
+  video     VideoProcessor end to end on a synthetic video (see synthetic_video.py) searched
+            for its own pasted face; per-stage totals come from the job's timing summary
+            (decode, detect, align, embed, track, match, db_write), reported as the frames/sec
+            each stage alone would sustain
+  matcher   GalleryMatcher scoring (faces/sec) for several gallery sizes, and Matcher.match
+  reports   ReportGenerator CSV and PDF builds (rows/sec) on a throw-away database
+  sqlite    DetectionWriter inserts (rows/sec) into a throw-away database
+
+Results are written as JSON (--output, default stdout). Every `*_per_s` value is a
+throughput; --baseline compares them against a stored result file and exits with status 1
+when one dropped by more than --tolerance. --save-baseline stores this run as the baseline.
+Baselines are machine-specific: record one per benchmark host.
+
+The video section logs its matches under a unique bench_*.mp4 name in the project database
+and removes them (rows, crops, checkpoint) afterwards.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_suite --output bench.json --save-baseline backend/benchmarks/baseline.json
+    python -m backend.benchmarks.bench_suite --baseline backend/benchmarks/baseline.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from ..modules.detection_writer import DetectionWriter
+from ..modules.matcher import GalleryMatcher, Matcher
+from ..modules.report_generator import ReportGenerator
+from .bench_detection_writer import SCHEMA, make_rows
+from .bench_reports import VIDEO as REPORT_VIDEO, make_fixture
+from .synthetic_video import DEFAULT_FACE, render_video
+
+SECTIONS = ('video', 'matcher', 'reports', 'sqlite')
+
+
+def _rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else 0.0
+
+
+def best_of(repeats, fn):
+    """Fastest of `repeats` timed calls, in seconds (the least noisy estimate on a shared host)."""
+    best = float('inf')
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_video(args, tmp):
+    # Imported here: loading torch is slow, and the other sections do not need it
+    if args.device == 'cpu':
+        os.environ['CUDA_VISIBLE_DEVICES'] = ''
+    import torch
+    from ..modules import metrics
+    from ..modules.checkpoints import purge_video_results
+    from ..modules.video_processor import VideoProcessor
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    video_path = os.path.join(tmp, 'synthetic.mp4')
+    manifest = render_video(video_path, args.face, args.width, args.height, args.seconds, args.fps,
+                            args.faces_per_frame, args.presence, args.face_height, seed=args.seed)
+
+    started = time.perf_counter()
+    processor = VideoProcessor(batch_size=args.batch_size, tracking=not args.no_tracking)
+    model_load_s = time.perf_counter() - started
+
+    video_filename = f"bench_{uuid.uuid4().hex[:8]}.mp4"
+    sampled_before = metrics.FRAMES_SAMPLED.value()
+    completed = None
+    try:
+        started = time.perf_counter()
+        for event in processor.process_video_generator(video_path, [args.face[0]], video_filename=video_filename):
+            if event['status'] == 'error':
+                raise RuntimeError(event['message'])
+            if event['status'] == 'completed':
+                completed = event
+        wall_s = time.perf_counter() - started
+    finally:
+        purge_video_results(video_filename)
+    if completed is None or 'timings' not in completed:
+        raise RuntimeError("The video job finished without a timing summary (JOB_TIMING_SUMMARY / METRICS_ENABLED off?).")
+
+    frames_sampled = metrics.FRAMES_SAMPLED.value() - sampled_before
+    stages = {
+        stage: {**timing, "frames_per_s": _rate(frames_sampled, timing["total_s"])}
+        for stage, timing in completed['timings']['stages'].items()
+    }
+    return {
+        "video": manifest,
+        "device": str(processor.pipeline.device),
+        "torch_threads": torch.get_num_threads(),
+        "batch_size": processor.batch_size,
+        "tracking": processor.tracking,
+        "model_load_s": round(model_load_s, 3),
+        "wall_s": round(wall_s, 3),
+        "frames_sampled": frames_sampled,
+        "matches_found": completed['matches_found'],
+        "video_frames_per_s": _rate(manifest['frames'], wall_s),
+        "sampled_frames_per_s": _rate(frames_sampled, wall_s),
+        "stages": stages,
+    }
+
+
+def bench_matcher(args, tmp):
+    rng = np.random.default_rng(args.seed)
+
+    def unit(vectors):
+        return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+    faces = unit(rng.standard_normal((args.matcher_faces, 512)).astype(np.float32))
+    batches = [faces[i:i + args.faces_per_frame] for i in range(0, len(faces), max(1, args.faces_per_frame))]
+    results = {}
+    for size in args.gallery_sizes:
+        gallery = GalleryMatcher([f"person_{i}" for i in range(size)], unit(rng.standard_normal((size, 512))))
+        # One call per frame, as VideoProcessor does
+        best_s = best_of(args.repeats, lambda: [gallery.best_face_per_identity(batch) for batch in batches])
+        top_k_s = best_of(args.repeats, lambda: [gallery.top_k(batch, k=1) for batch in batches])
+        results[f"gallery_{size}"] = {
+            "best_face_faces_per_s": _rate(len(faces), best_s),
+            "top_k_faces_per_s": _rate(len(faces), top_k_s),
+        }
+
+    matcher = Matcher()
+    reference = faces[0]
+    match_s = best_of(args.repeats, lambda: [matcher.match(face, reference) for face in faces])
+    results["pairwise"] = {"match_pairs_per_s": _rate(len(faces), match_s)}
+    return results
+
+
+def bench_reports(args, tmp):
+    folder = os.path.join(tmp, 'reports_bench')
+    os.makedirs(folder)
+    db_path, matches = make_fixture(folder, args.report_rows, args.report_crops)
+    runs = itertools.count()
+
+    def cold_build(fmt):
+        # Fresh output and thumbnail folders, so every repeat is a full (uncached) build
+        run = os.path.join(folder, f"run_{next(runs)}")
+        generator = ReportGenerator(db_path=db_path, reports_folder=run, matches_folder=matches,
+                                    thumbnail_folder=os.path.join(run, 'thumbs'))
+        os.makedirs(run)
+        getattr(generator, f"generate_{fmt}")(REPORT_VIDEO)
+
+    results = {"rows": args.report_rows}
+    for fmt in ("csv", "pdf"):
+        results[f"{fmt}_rows_per_s"] = _rate(args.report_rows, best_of(args.repeats, lambda: cold_build(fmt)))
+    return results
+
+
+def bench_sqlite(args, tmp):
+    db_path = os.path.join(tmp, 'sqlite_bench.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    conn.close()
+
+    rows = make_rows(args.sqlite_rows)
+
+    def write():
+        with DetectionWriter(db_path=db_path, fps=25.0) as writer:
+            for row in rows:
+                writer.add(*row[:8])
+                if writer.should_flush():
+                    writer.flush()
+
+    return {"rows": len(rows), "writer_rows_per_s": _rate(len(rows), best_of(args.repeats, write))}
+
+
+def throughputs(results, prefix=''):
+    """Flattens every `*_per_s` value into {"section.key.metric": value}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(throughputs(value, name + '.'))
+        elif key.endswith('_per_s') and isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, tolerance):
+    """Prints current vs. baseline throughput; returns the metrics that regressed beyond `tolerance`."""
+    now = throughputs(current['results'])
+    before = throughputs(baseline['results'])
+    regressions = []
+    print(f"\n{'metric':<48}{'baseline':>12}{'current':>12}{'change':>9}", file=sys.stderr)
+    for name in sorted(now.keys() & before.keys()):
+        if before[name] <= 0:
+            continue
+        change = now[name] / before[name] - 1.0
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<48}{before[name]:>12.1f}{now[name]:>12.1f}{change:>+8.0%}{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="compare against this result file; exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed throughput drop (0.15 = 15%%)")
+    parser.add_argument('--save-baseline', help="also store this run as the baseline file")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3, help="matcher/reports/sqlite: best of N runs")
+    video = parser.add_argument_group('video')
+    video.add_argument('--face', nargs='+', default=[DEFAULT_FACE], help="face crop(s); the first is the reference")
+    video.add_argument('--width', type=int, default=640)
+    video.add_argument('--height', type=int, default=360)
+    video.add_argument('--seconds', type=float, default=20.0)
+    video.add_argument('--fps', type=float, default=25.0)
+    video.add_argument('--faces-per-frame', type=int, default=2)
+    video.add_argument('--presence', type=float, default=0.6)
+    video.add_argument('--face-height', type=int, default=160)
+    video.add_argument('--batch-size', type=int, default=8)
+    video.add_argument('--no-tracking', action='store_true')
+    video.add_argument('--device', choices=('cpu', 'auto'), default='cpu')
+    video.add_argument('--threads', type=int, default=0, help="torch CPU threads (0 = torch default)")
+    other = parser.add_argument_group('matcher / reports / sqlite')
+    other.add_argument('--gallery-sizes', type=int, nargs='+', default=[1, 100, 1000])
+    other.add_argument('--matcher-faces', type=int, default=5000)
+    other.add_argument('--report-rows', type=int, default=5000)
+    other.add_argument('--report-crops', type=int, default=200)
+    other.add_argument('--sqlite-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    benches = {'video': bench_video, 'matcher': bench_matcher, 'reports': bench_reports, 'sqlite': bench_sqlite}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for section in args.sections:
+            print(f"⏱️ {section}...", file=sys.stderr)
+            started = time.perf_counter()
+            try:
+                results[section] = benches[section](args, tmp)
+            except ImportError as e:
+                # e.g. torch missing on a host that only benchmarks the storage paths
+                results[section] = {"skipped": str(e)}
+                print(f"   skipped: {e}", file=sys.stderr)
+                continue
+            print(f"   done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    run = {
+        "meta": {
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    text = json.dumps(run, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(run, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} throughput regression(s) beyond {args.tolerance:.0%}: "
+                  f"{', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+        print("\n✅ No throughput regressions.", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
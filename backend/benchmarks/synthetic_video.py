@@ -0,0 +1,129 @@
+"""
+Synthetic test videos: face crops pasted onto a moving textured background.
+
+Faces enter in segments of --segment-seconds: a --presence fraction of the segments, spread
+evenly over the video, contain --faces-per-frame copies (cycling through the --face images) drift and
+bounce across the frame. The same seed always renders the same video, so benchmark runs on
+different machines process identical input. Returns / prints a manifest with the ground
+truth (frames that contain a face, face instances).
+
+Run from the project root:
+    python -m backend.benchmarks.synthetic_video --output /tmp/synthetic.mp4 --width 1280 --height 720
+"""
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+
+DEFAULT_FACE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test.jpg')
+
+
+def _background(width, height, rng):
+    """Smooth gradient plus a fixed, blurred noise texture; rolled every frame to fake camera motion."""
+    x, y = np.meshgrid(np.linspace(0, 1, width, dtype=np.float32), np.linspace(0, 1, height, dtype=np.float32))
+    base = np.stack([60 + 80 * x, 90 + 60 * y, 120 + 40 * x * y], axis=-1)
+    noise = cv2.GaussianBlur(rng.normal(0, 25, (height, width, 3)).astype(np.float32), (0, 0), 3)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def _load_faces(face_paths, face_height):
+    faces = []
+    for path in face_paths:
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"Could not read face image {path}")
+        scale = face_height / image.shape[0]
+        faces.append(cv2.resize(image, (max(1, int(image.shape[1] * scale)), face_height), interpolation=cv2.INTER_AREA))
+    return faces
+
+
+def render_video(path: str, face_paths=(DEFAULT_FACE,), width: int = 640, height: int = 360, seconds: float = 20.0,
+                 fps: float = 25.0, faces_per_frame: int = 1, presence: float = 0.6, face_height: int = 160,
+                 segment_seconds: float = 2.0, seed: int = 0) -> dict:
+    """Renders the video to `path` (mp4v) and returns its manifest."""
+    rng = np.random.default_rng(seed)
+    faces = _load_faces(face_paths, min(face_height, height - 2))
+    background = _background(width, height, rng)
+    total_frames = int(round(seconds * fps))
+    segment_frames = max(1, int(round(segment_seconds * fps)))
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+
+    face_frames = 0
+    face_instances = 0
+    sprites = []
+    try:
+        for frame_number in range(total_frames):
+            if frame_number % segment_frames == 0:
+                # New segment: a fresh set of faces (or none) with random positions and velocities
+                segment = frame_number // segment_frames
+                sprites = []
+                if int((segment + 1) * presence) > int(segment * presence):
+                    for k in range(faces_per_frame):
+                        face = faces[k % len(faces)]
+                        h, w = face.shape[:2]
+                        position = rng.uniform([0, 0], [max(1, width - w), max(1, height - h)])
+                        velocity = rng.uniform(-3, 3, 2) * (25.0 / fps)
+                        sprites.append([face, position, velocity])
+
+            frame = np.roll(background, (frame_number * 2) % width, axis=1)
+            for sprite in sprites:
+                face, position, velocity = sprite
+                h, w = face.shape[:2]
+                limits = np.array([width - w, height - h], dtype=np.float64)
+                position += velocity
+                # Bounce off the edges
+                for axis in (0, 1):
+                    if position[axis] < 0 or position[axis] > limits[axis]:
+                        velocity[axis] = -velocity[axis]
+                        position[axis] = min(max(position[axis], 0), limits[axis])
+                x, y = int(position[0]), int(position[1])
+                frame[y:y + h, x:x + w] = face[:height - y, :width - x]
+            if sprites:
+                face_frames += 1
+                face_instances += len(sprites)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    return {
+        "path": path,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "frames": total_frames,
+        "faces_per_frame": faces_per_frame,
+        "presence": presence,
+        "face_height": face_height,
+        "seed": seed,
+        "face_frames": face_frames,
+        "face_instances": face_instances,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--face', nargs='+', default=[DEFAULT_FACE], help="face crop image(s) to paste")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--fps', type=float, default=25.0)
+    parser.add_argument('--faces-per-frame', type=int, default=1)
+    parser.add_argument('--presence', type=float, default=0.6, help="fraction of segments that contain faces")
+    parser.add_argument('--face-height', type=int, default=160)
+    parser.add_argument('--segment-seconds', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = render_video(args.output, args.face, args.width, args.height, args.seconds, args.fps,
+                            args.faces_per_frame, args.presence, args.face_height, args.segment_seconds, args.seed)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == '__main__':
+    main()
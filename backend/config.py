@@ -15,13 +15,18 @@ REPORTS_FOLDER = os.path.join(STATIC_DIR, 'reports')
 MODELS_FOLDER = os.path.join(BASE_DIR, 'models')
 DATABASE_DIR = os.path.join(BASE_DIR, 'database')
 DB_PATH = os.path.join(DATABASE_DIR, 'project.db')
+# Uploaded batch inputs (reference images, videos); survives per-upload session cleanup
+BATCH_FOLDER = os.path.join(BASE_DIR, 'batches')
+# Per-video face archives (see modules/face_archive.py), one directory of .npy columns each
+FACE_ARCHIVE_FOLDER = os.path.join(BASE_DIR, 'archives')
 
 # --- INITIALIZATION FUNCTION ---
 def initialize_filesystem():
     """Ensures all necessary static and internal directories exist."""
     print("🛠️ Initializing filesystem...")
     # Create static/internal folders
-    for folder in [UPLOAD_FOLDER, MATCHES_FOLDER, REPORTS_FOLDER, MODELS_FOLDER, DATABASE_DIR]:
+    for folder in [UPLOAD_FOLDER, MATCHES_FOLDER, REPORTS_FOLDER, MODELS_FOLDER, DATABASE_DIR, BATCH_FOLDER,
+                   FACE_ARCHIVE_FOLDER]:
         os.makedirs(folder, exist_ok=True)
     print("🛠️ Filesystem checks complete.")
 
@@ -37,4 +42,202 @@ SIMILARITY_THRESHOLD = 0.70
 
 # (UPDATED) Skip 10 frames to balance processing speed and detection recall.
 # 5 was processing too many frames for this heavy pipeline.
-FRAME_SKIP = 10
\ No newline at end of file
+FRAME_SKIP = 10
+
+# Number of sampled frames sent through MTCNN + FaceNet together.
+# 1 reproduces frame-at-a-time inference; larger batches amortize per-call overhead.
+INFERENCE_BATCH_SIZE = 8
+
+# When the gap to the next sampled frame is larger than this many frames, the sampler
+# seeks with CAP_PROP_POS_FRAMES instead of grab()-ing through the gap. Seeking re-decodes
+# from the previous keyframe, so it only pays off for large skips.
+SEEK_THRESHOLD = 60
+
+# If set, sample one frame every N milliseconds of video time instead of every FRAME_SKIP frames.
+SAMPLE_INTERVAL_MS = None
+
+# Adaptive sampling (see AdaptiveFrameSampler): a cheap downscaled frame-difference score
+# decides where to spend inference. Static footage is sampled every SAMPLING_IDLE_SECONDS;
+# motion and recent matches raise the rate up to SAMPLING_MAX_FPS inferred frames per second
+# of video. Replaces FRAME_SKIP / SAMPLE_INTERVAL_MS when enabled.
+ADAPTIVE_SAMPLING = os.environ.get('ADAPTIVE_SAMPLING', '0') == '1'
+SAMPLING_MAX_FPS = 5.0
+SAMPLING_IDLE_SECONDS = 2.0
+# Motion is probed on every Nth frame, downscaled to MOTION_PROBE_WIDTH pixels wide grayscale.
+MOTION_PROBE_STRIDE = 2
+MOTION_PROBE_WIDTH = 64
+# A probe is "active" when more than MOTION_THRESHOLD of its pixels changed by > MOTION_PIXEL_DELTA.
+MOTION_PIXEL_DELTA = 12
+MOTION_THRESHOLD = 0.01
+# Dense sampling continues this long after the last motion / the last match.
+MOTION_HOLD_SECONDS = 1.0
+MATCH_HOLD_SECONDS = 2.0
+
+# --- SEGMENTED PROCESSING ---
+
+# Split long videos into this many frame ranges and process them in parallel worker
+# processes (each loads the models once). 0 or 1 keeps the single-process path.
+VIDEO_SEGMENTS = int(os.environ.get('VIDEO_SEGMENTS', '0'))
+# Worker processes in the pool (defaults to one per segment).
+SEGMENT_WORKERS = int(os.environ.get('SEGMENT_WORKERS', '0')) or None
+# Torch intra-op threads per worker, so N workers don't oversubscribe the cores.
+SEGMENT_TORCH_THREADS = max(1, (os.cpu_count() or 1) // max(1, VIDEO_SEGMENTS))
+# Videos shorter than this are not worth the fan-out.
+SEGMENT_MIN_FRAMES = 3000
+
+# How often (seconds) a running video persists its resume checkpoint.
+CHECKPOINT_INTERVAL_SECONDS = 10
+
+# --- MODEL LOADING ---
+
+# Load MTCNN + FaceNet at server start (and run one warm-up inference) instead of on the
+# first request. Off by default so that tooling importing the app stays fast.
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '0') == '1'
+WARMUP_ON_PRELOAD = True
+
+# How FaceNet runs (see modules/embedder_backends.py):
+#   'eager'        plain PyTorch (reference)
+#   'torchscript'  traced, frozen TorchScript graph
+#   'compile'      torch.compile (PyTorch 2.x)
+#   'onnx'         exported once to EMBEDDER_ONNX_DIR and run by ONNX Runtime on the CPU
+EMBEDDER_BACKEND = os.environ.get('EMBEDDER_BACKEND', 'eager')
+# 'onnx' only: dynamic int8 quantization of the exported weights. Changes the embeddings
+# slightly, so it is part of the model version (reference cache, archives, resume).
+EMBEDDER_INT8 = os.environ.get('EMBEDDER_INT8', '0') == '1'
+EMBEDDER_ONNX_DIR = os.path.join(MODELS_FOLDER, 'onnx')
+# ONNX Runtime intra-op threads (0 = runtime default: one per physical core).
+EMBEDDER_THREADS = int(os.environ.get('EMBEDDER_THREADS', '0'))
+
+# --- JOB QUEUE ---
+
+# Videos processed at the same time. Each job already uses every core through PyTorch,
+# so running more than one or two in parallel only oversubscribes the CPU.
+MAX_CONCURRENT_JOBS = 1
+
+# Jobs allowed to wait for a worker before /api/upload starts rejecting with 503.
+MAX_QUEUED_JOBS = 16
+
+# Most recent events kept in memory per job for Server-Sent Events replay.
+JOB_EVENT_BUFFER = 500
+
+# Each server process refreshes the lease of the jobs it owns this often. A queued/running job
+# whose lease is older than JOB_LEASE_SECONDS belongs to a process that died and is failed.
+JOB_HEARTBEAT_SECONDS = 10
+JOB_LEASE_SECONDS = 60
+
+# --- DETECTION LOGGING ---
+
+# Detection rows are buffered per job and committed in one transaction when either
+# threshold is reached (and always at the end of the video).
+DETECTION_BATCH_SIZE = 64
+DETECTION_FLUSH_SECONDS = 1.0
+
+# --- MATCH IMAGE WRITING ---
+
+# Match crops are encoded and written by a background pool so inference never waits on disk.
+# 'jpg' or 'webp' (WebP is ~30% smaller at similar quality for 160x160 face crops).
+MATCH_IMAGE_FORMAT = 'jpg'
+MATCH_IMAGE_QUALITY = 90
+IMAGE_WRITER_THREADS = 2
+# Crops waiting to be written; submit() blocks (backpressure) when the queue is full.
+IMAGE_WRITER_QUEUE_SIZE = 64
+
+# --- FACE ARCHIVES ---
+
+# Archived embeddings scored per matrix product when searching an indexed video.
+FACE_ARCHIVE_SEARCH_CHUNK = 65536
+
+# --- RESULTS API ---
+
+# Largest page /api/results returns for one keyset-paginated request (?limit=).
+RESULTS_MAX_PAGE_SIZE = 1000
+
+# --- REPORTS ---
+
+# Detection rows fetched per cursor round trip while a report is streamed to disk.
+REPORT_CHUNK_ROWS = 2000
+# PDF previews are downscaled JPEG thumbnails of the match crops, cached next to them.
+REPORT_THUMBNAIL_FOLDER = os.path.join(MATCHES_FOLDER, 'thumbs')
+REPORT_THUMBNAIL_PX = 80
+REPORT_THUMBNAIL_QUALITY = 75
+# Rows past this many are listed without a preview (the CSV always has every row).
+REPORT_PDF_MAX_PREVIEWS = 5000
+# Bump when the report layout changes so cached reports are rebuilt.
+REPORT_FORMAT_VERSION = 2
+# Reports are built on first download. Formats listed here are also pre-built by a
+# background worker as soon as a video/batch finishes (the PDF is the slow one).
+REPORT_PREBUILD_FORMATS = ('csv',)
+REPORT_BUILDER_THREADS = 1
+
+# --- LARGE GALLERIES (ANN) ---
+
+# Enrolled-face IVF index (see modules/ann_index.py). Searched instead of the dense
+# gallery product once it holds at least ANN_MIN_GALLERY_SIZE faces.
+ANN_INDEX_PATH = os.path.join(MODELS_FOLDER, 'gallery_index')
+ANN_MIN_GALLERY_SIZE = 5000
+# Cells scored per query: higher = better recall, lower = faster
+ANN_NPROBE = 8
+# Candidates retrieved per face before per-identity aggregation
+ANN_TOP_K = 5
+# Enrollments kept in the exhaustively-searched delta before the index is rebuilt on disk
+ANN_DELTA_MAX = 10000
+
+# --- EMBEDDING CACHE ---
+
+# Reference embeddings keyed by SHA-256 of the image bytes + model version, so re-submitted
+# photos skip MTCNN/FaceNet. Least-recently-used entries are evicted past the size bound.
+EMBEDDING_CACHE_PATH = os.path.join(DATABASE_DIR, 'embeddings.db')
+EMBEDDING_CACHE_MAX_ENTRIES = 10000
+
+# --- LIVE SESSIONS ---
+
+# Where live-feed reference embeddings live: 'memory' (this process only) or 'sqlite'
+# (EMBEDDING_CACHE_PATH, shared by every worker process on the host).
+LIVE_SESSION_BACKEND = os.environ.get('LIVE_SESSION_BACKEND', 'memory')
+# Idle sessions expire after this many seconds; each stream start refreshes the timer.
+LIVE_SESSION_TTL_SECONDS = 3600
+# Least-recently-used sessions are evicted beyond this count.
+LIVE_SESSION_MAX = 256
+
+# --- LIVE STREAM ---
+
+# Camera index (e.g. '0') or a video file path used as a stand-in camera (headless testing).
+LIVE_SOURCE = os.environ.get('LIVE_SOURCE', '0')
+LIVE_JPEG_QUALITY = 80
+# How often the live pipeline prints its per-stage latency summary.
+LIVE_STATS_LOG_SECONDS = 10
+# A viewer that has not taken a frame for this long while the stream kept publishing is dropped.
+LIVE_SLOW_CLIENT_SECONDS = 5.0
+
+# --- FACE TRACKING ---
+
+# Follow faces across sampled frames (IoU + constant-velocity Kalman) so a track reuses its
+# embedding, and log one `detections` row per continuous appearance instead of one per frame.
+# Off by default; set FACE_TRACKING=1 to enable.
+FACE_TRACKING = os.environ.get('FACE_TRACKING', '0') == '1'
+# Minimum IoU between a track's predicted box and a detection to continue the track.
+TRACK_IOU_THRESHOLD = 0.3
+# Consecutive sampled frames a track may go undetected before it (and its appearance) ends.
+TRACK_MAX_MISSES = 3
+# An established track is re-embedded after this many video frames...
+TRACK_REEMBED_FRAMES = 50
+# ...or as soon as its detection confidence moves by more than this since the last embedding.
+TRACK_CONFIDENCE_DELTA = 0.05
+
+# --- BATCH INGEST ---
+
+# Videos of one batch processed concurrently (threads sharing the loaded models).
+BATCH_VIDEO_WORKERS = 2
+# Server-side directory the batch API may read videos from; unset = uploaded videos only.
+BATCH_INPUT_ROOT = os.environ.get('BATCH_INPUT_ROOT')
+# Files picked up when a batch input is a directory.
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.mpg', '.mpeg', '.ts', '.wmv')
+
+# --- METRICS ---
+
+# Per-stage timing histograms and pipeline counters, served as Prometheus text on /api/metrics.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# Histogram bucket upper bounds, in seconds.
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Add a per-stage timing summary ("timings") to the `completed` event of each video job.
+JOB_TIMING_SUMMARY = True
@@ -9,6 +9,18 @@ except ImportError:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DB_PATH = os.path.join(BASE_DIR, 'database', 'project.db')
 
+def timestamp_to_ms(text):
+    """'H:MM:SS[.ffffff]' (str(timedelta), optionally with a 'N day(s), ' prefix) -> integer milliseconds."""
+    if not text:
+        return None
+    days = 0
+    if ',' in text:
+        day_part, text = text.split(',', 1)
+        days = int(day_part.split()[0])
+    hours, minutes, seconds = text.strip().split(':')
+    return int(round(((days * 24 + int(hours)) * 60 + int(minutes)) * 60000 + float(seconds) * 1000))
+
+
 def init_db():
     # Ensure the database directory exists
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -23,9 +35,115 @@ def init_db():
             timestamp TEXT NOT NULL,
             similarity REAL NOT NULL,
             match_image_path TEXT NOT NULL,
+            identity TEXT,
+            end_frame_number INTEGER,
+            end_timestamp TEXT,
+            timestamp_ms INTEGER,
+            end_timestamp_ms INTEGER,
             processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
         );
     ''')
+    # Migration: databases created before gallery matching lack the identity column
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(detections)")]
+    if 'identity' not in columns:
+        cursor.execute("ALTER TABLE detections ADD COLUMN identity TEXT")
+    # Migration: rows became appearance intervals (frame_number .. end_frame_number) with face tracking
+    if 'end_frame_number' not in columns:
+        cursor.execute("ALTER TABLE detections ADD COLUMN end_frame_number INTEGER")
+        cursor.execute("ALTER TABLE detections ADD COLUMN end_timestamp TEXT")
+        cursor.execute("UPDATE detections SET end_frame_number = frame_number, end_timestamp = timestamp")
+    # Migration: integer-millisecond timestamps (the text columns stay for display)
+    if 'timestamp_ms' not in columns:
+        cursor.execute("ALTER TABLE detections ADD COLUMN timestamp_ms INTEGER")
+        cursor.execute("ALTER TABLE detections ADD COLUMN end_timestamp_ms INTEGER")
+        conn.create_function('timestamp_to_ms', 1, timestamp_to_ms, deterministic=True)
+        cursor.execute("UPDATE detections SET timestamp_ms = timestamp_to_ms(timestamp), "
+                       "end_timestamp_ms = timestamp_to_ms(end_timestamp)")
+    # Every per-video read (results API, reports, resume) filters on the video and walks frame order
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detections_video_frame ON detections (video_filename, frame_number)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            video_filename TEXT,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME,
+            owner TEXT,
+            heartbeat_at DATETIME
+        );
+    ''')
+    # Migration: owning process ("host:pid") and its lease, so a second server process only
+    # fails jobs whose owner stopped heartbeating
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(jobs)")]
+    if 'owner' not in columns:
+        cursor.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        cursor.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at DATETIME")
+    # Frame-level progress per (video, processing fingerprint), written atomically with detections
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            video_filename TEXT NOT NULL,
+            reference_hash TEXT NOT NULL,
+            last_frame INTEGER NOT NULL,
+            matches_found INTEGER NOT NULL,
+            total_frames INTEGER,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (video_filename, reference_hash)
+        );
+    ''')
+
+    # Generated report files and the detections state they were built from (see ReportGenerator)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reports (
+            name TEXT PRIMARY KEY,
+            kind TEXT,
+            source TEXT,
+            source_version TEXT NOT NULL,
+            generated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    # Migration: reports became addressable by name (kind = 'video' | 'batch', source = its filename / id)
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(reports)")]
+    if 'kind' not in columns:
+        cursor.execute("ALTER TABLE reports ADD COLUMN kind TEXT")
+        cursor.execute("ALTER TABLE reports ADD COLUMN source TEXT")
+
+    # Batch ingest: one row per batch, one per video (per-video status makes batches resumable)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS batches (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            reference_images TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME
+        );
+    ''')
+    # Migration: the job currently (or last) processing the batch, so resume can tell if it is still alive
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(batches)")]
+    if 'job_id' not in columns:
+        cursor.execute("ALTER TABLE batches ADD COLUMN job_id TEXT")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS batch_videos (
+            batch_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            video_path TEXT NOT NULL,
+            video_filename TEXT NOT NULL,
+            status TEXT NOT NULL,
+            frames_processed INTEGER,
+            matches_found INTEGER,
+            error TEXT,
+            started_at DATETIME,
+            finished_at DATETIME,
+            PRIMARY KEY (batch_id, video_filename)
+        );
+    ''')
     conn.commit()
     conn.close()
     print(f"✅ Database initialized at: {DB_PATH}")
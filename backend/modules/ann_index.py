@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+from ..config import ANN_NPROBE
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over L2-normalized embeddings.
+
+    A spherical k-means coarse quantizer splits the gallery into `nlist` cells. Vectors are
+    stored contiguously, sorted by cell, so a query only scores the `nprobe` cells whose
+    centroids are closest to it. Everything is plain NumPy:
+
+      * build offline with IVFIndex.build() (or the CLI at the bottom of this file),
+      * save() to a directory of .npy files, load() them memory-mapped at startup,
+      * add() new enrollments incrementally; they live in a small exhaustively-searched
+        delta until compact() folds them into the cells.
+
+    Scores are inner products, i.e. cosine similarities for unit vectors.
+    """
+
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, ids: np.ndarray,
+                 offsets: np.ndarray, labels: list, nprobe: int = ANN_NPROBE):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.vectors = vectors      # (N, d) float16, sorted by cell (may be a memmap)
+        self.ids = ids              # (N,) int64 index into self.labels, same order as vectors
+        self.offsets = offsets      # (nlist + 1,) cell i is vectors[offsets[i]:offsets[i + 1]]
+        self.labels = list(labels)  # identity per enrolled face
+        self.nprobe = nprobe
+
+        # Incremental enrollments not yet assigned to cells
+        self.delta_vectors = np.zeros((0, self.dim), dtype=np.float16)
+        self.delta_ids = np.zeros((0,), dtype=np.int64)
+
+    # --- Construction ---
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    def __len__(self):
+        return len(self.ids) + len(self.delta_ids)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @staticmethod
+    def _assign(vectors, centroids, chunk: int = 65536):
+        """Nearest centroid (max inner product) for each vector, computed in chunks."""
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            assignments[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def train_centroids(cls, vectors, nlist: int, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        """Spherical k-means on a random sample of the gallery."""
+        rng = np.random.default_rng(seed)
+        sample_idx = rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)
+        sample = cls._normalize(vectors[np.sort(sample_idx)])
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = cls._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=nlist)
+
+            # Re-seed empty cells with random samples so no centroid is wasted
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+            centroids = cls._normalize(sums)
+        return centroids
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, labels: list, nlist: int = None, nprobe: int = ANN_NPROBE,
+              iterations: int = 10, seed: int = 0):
+        """Trains the quantizer and lays the gallery out cell by cell."""
+        vectors = cls._normalize(vectors)
+        if len(vectors) != len(labels):
+            raise ValueError("IVFIndex.build needs one label per vector.")
+        if nlist is None:
+            nlist = int(4 * np.sqrt(len(vectors)))
+        nlist = max(1, min(nlist, len(vectors)))
+
+        centroids = cls.train_centroids(vectors, nlist, iterations=iterations, seed=seed)
+        assignments = cls._assign(vectors, centroids)
+
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=nlist)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        return cls(centroids, vectors[order].astype(np.float16), order.astype(np.int64), offsets, labels, nprobe=nprobe)
+
+    # --- Incremental updates ---
+
+    def add(self, vectors: np.ndarray, labels: list):
+        """Enrolls new faces. They are searchable immediately through the delta buffer."""
+        vectors = self._normalize(vectors).reshape(-1, self.dim)
+        if len(vectors) != len(labels):
+            raise ValueError("IVFIndex.add needs one label per vector.")
+        new_ids = np.arange(len(self.labels), len(self.labels) + len(labels), dtype=np.int64)
+        self.labels.extend(labels)
+        self.delta_vectors = np.concatenate([self.delta_vectors, vectors.astype(np.float16)])
+        self.delta_ids = np.concatenate([self.delta_ids, new_ids])
+
+    def copy(self) -> 'IVFIndex':
+        """
+        A copy that can take add() / compact() without changing this index. The main arrays
+        are shared: they are only ever replaced, never written in place.
+        """
+        clone = IVFIndex.__new__(IVFIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.labels = list(self.labels)
+        return clone
+
+    def compact(self):
+        """Folds the delta buffer into the cells (rewrites the main arrays in memory)."""
+        if not len(self.delta_ids):
+            return
+        assignments = np.concatenate([
+            np.repeat(np.arange(self.nlist), np.diff(self.offsets)),
+            self._assign(self.delta_vectors, self.centroids)
+        ])
+        vectors = np.concatenate([np.asarray(self.vectors), self.delta_vectors])
+        ids = np.concatenate([np.asarray(self.ids), self.delta_ids])
+
+        order = np.argsort(assignments, kind='stable')
+        self.vectors = vectors[order]
+        self.ids = ids[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.nlist))]).astype(np.int64)
+        self.delta_vectors = self.delta_vectors[:0]
+        self.delta_ids = self.delta_ids[:0]
+
+    def all_vectors(self):
+        """Every enrolled vector (float32) in id order, e.g. for a dense search or a rebuild."""
+        vectors = np.empty((len(self.labels), self.dim), dtype=np.float32)
+        vectors[np.asarray(self.ids)] = np.asarray(self.vectors, dtype=np.float32)
+        vectors[self.delta_ids] = self.delta_vectors.astype(np.float32)
+        return vectors
+
+    def rebuilt(self, nlist: int = None):
+        """A freshly trained index over the same data (cells adapt to the grown gallery)."""
+        return IVFIndex.build(self.all_vectors(), self.labels, nlist=nlist, nprobe=self.nprobe)
+
+    # --- Search ---
+
+    @staticmethod
+    def _merge_top_k(best_scores, best_ids, rows, block_scores, block_ids, k):
+        """Merges a block of candidate scores into the running top-k of the given query rows."""
+        scores = np.concatenate([best_scores[rows], block_scores], axis=1)
+        ids = np.concatenate([best_ids[rows], np.broadcast_to(block_ids, (len(rows), len(block_ids)))], axis=1)
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, keep, axis=1)
+            ids = np.take_along_axis(ids, keep, axis=1)
+        best_scores[rows] = scores
+        best_ids[rows] = ids
+
+    def search(self, queries: np.ndarray, k: int = 1, nprobe: int = None):
+        """
+        Approximate top-k for each query.
+        Returns: (scores, ids) arrays of shape (Q, k), best first; missing slots have id -1.
+        """
+        queries = self._normalize(queries).reshape(-1, self.dim)
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        # Coarse step: which cells does each query probe?
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < self.nlist \
+            else np.tile(np.arange(self.nlist), (len(queries), 1))
+
+        # Fine step, grouped by cell: every query probing a cell is scored in one matmul
+        flat_cells = probes.ravel()
+        flat_rows = np.repeat(np.arange(len(queries)), probes.shape[1])
+        order = np.argsort(flat_cells, kind='stable')
+        cells, starts = np.unique(flat_cells[order], return_index=True)
+        bounds = np.append(starts, len(order))
+
+        for i, cell in enumerate(cells):
+            start, end = self.offsets[cell], self.offsets[cell + 1]
+            if start == end:
+                continue
+            rows = flat_rows[order[bounds[i]:bounds[i + 1]]]
+            block = np.asarray(self.vectors[start:end], dtype=np.float32)
+            self._merge_top_k(best_scores, best_ids, rows, queries[rows] @ block.T, np.asarray(self.ids[start:end]), k)
+
+        # Not-yet-compacted enrollments are searched exhaustively
+        if len(self.delta_ids):
+            rows = np.arange(len(queries))
+            block = self.delta_vectors.astype(np.float32)
+            self._merge_top_k(best_scores, best_ids, rows, queries @ block.T, self.delta_ids, k)
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+    def search_labels(self, queries: np.ndarray, k: int = 1, nprobe: int = None):
+        """Like search(), but returns [(identity, similarity), ...] per query."""
+        scores, ids = self.search(queries, k=k, nprobe=nprobe)
+        return [
+            [(self.labels[i], float(s)) for s, i in zip(row_scores, row_ids) if i >= 0]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+    # --- Persistence ---
+
+    def save_delta(self, path: str):
+        """
+        Persists only the delta buffer and labels into an index saved earlier at `path`.
+        Cheap enough to call after every enrollment; the big main arrays are untouched.
+        """
+        for name, array in (('delta_vectors.npy', self.delta_vectors), ('delta_ids.npy', self.delta_ids)):
+            tmp_file = os.path.join(path, name + '.tmp')
+            with open(tmp_file, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_file, os.path.join(path, name))
+
+        tmp_file = os.path.join(path, 'labels.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({"labels": self.labels, "nprobe": self.nprobe}, f)
+        os.replace(tmp_file, os.path.join(path, 'labels.json'))
+
+    def save(self, path: str):
+        """
+        Writes the whole index to `path` (a directory). The main arrays are rewritten atomically
+        through a temporary directory; call compact() first to fold in the delta.
+        """
+        tmp_path = path.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        np.save(os.path.join(tmp_path, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(tmp_path, 'vectors.npy'), np.asarray(self.vectors, dtype=np.float16))
+        np.save(os.path.join(tmp_path, 'ids.npy'), np.asarray(self.ids, dtype=np.int64))
+        np.save(os.path.join(tmp_path, 'offsets.npy'), np.asarray(self.offsets, dtype=np.int64))
+        np.save(os.path.join(tmp_path, 'delta_vectors.npy'), self.delta_vectors)
+        np.save(os.path.join(tmp_path, 'delta_ids.npy'), self.delta_ids)
+        with open(os.path.join(tmp_path, 'labels.json'), 'w') as f:
+            json.dump({"labels": self.labels, "nprobe": self.nprobe}, f)
+
+        old_path = path.rstrip(os.sep) + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Loads an index saved with save(). With `mmap`, the vectors stay on disk until touched."""
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(path, 'labels.json')) as f:
+            meta = json.load(f)
+
+        index = cls(
+            np.load(os.path.join(path, 'centroids.npy')),
+            np.load(os.path.join(path, 'vectors.npy'), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, 'ids.npy'), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, 'offsets.npy')),
+            meta["labels"],
+            nprobe=meta.get("nprobe", ANN_NPROBE),
+        )
+        index.delta_vectors = np.load(os.path.join(path, 'delta_vectors.npy'))
+        index.delta_ids = np.load(os.path.join(path, 'delta_ids.npy'))
+        return index
+
+
+def main():
+    """Offline build: python -m backend.modules.ann_index --embeddings emb.npy --labels labels.json --out DIR"""
+    parser = argparse.ArgumentParser(description="Build an IVF index over enrolled face embeddings.")
+    parser.add_argument('--embeddings', required=True, help=".npy file of shape (N, 512)")
+    parser.add_argument('--labels', required=True, help="JSON list with one identity per embedding")
+    parser.add_argument('--out', required=True, help="Output directory")
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--nprobe', type=int, default=ANN_NPROBE)
+    args = parser.parse_args()
+
+    vectors = np.load(args.embeddings, mmap_mode='r')
+    with open(args.labels) as f:
+        labels = json.load(f)
+
+    index = IVFIndex.build(vectors, labels, nlist=args.nlist, nprobe=args.nprobe)
+    index.save(args.out)
+    print(f"✅ IVF index built: {len(index)} vectors, {index.nlist} cells -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
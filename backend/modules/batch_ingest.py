@@ -0,0 +1,252 @@
+"""
+Batch ingest: search one reference set across many videos (a directory or a list).
+
+The reference gallery is built once per run and shared by every video. Videos are processed
+by BATCH_VIDEO_WORKERS threads sharing the loaded models. Each video's state lives in the
+`batch_videos` table, so an interrupted batch resumes with only the videos that did not
+finish, each from its last frame checkpoint. Results of earlier runs and batches are never
+wiped. A consolidated cross-video CSV/PDF report is registered when the batch finishes and
+built on first download (see ReportBuilder).
+
+CLI (from the project root):
+    python -m backend.modules.batch_ingest run --refs a.jpg b.jpg --videos /exports/incident42
+    python -m backend.modules.batch_ingest resume <batch_id>
+"""
+import argparse
+import json
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+from ..config import BATCH_VIDEO_WORKERS, DB_PATH, VIDEO_EXTENSIONS
+from .job_manager import DONE, FAILED, QUEUED, RUNNING
+from .report_builder import get_report_builder
+
+# Batch finished, but some of its videos failed (resume retries them)
+PARTIAL = 'partial'
+
+
+def _execute(query: str, params: tuple = ()):
+    conn = None
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute(query, params)
+        conn.commit()
+    except Exception as db_err:
+        print(f"⚠️ Batch state update failed: {db_err}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def discover_videos(inputs: list):
+    """
+    Expands files and directories (searched recursively) into [(path, name)], where `name`
+    is the path relative to its input directory. Sorted, without duplicates.
+    """
+    found = {}
+    for item in inputs:
+        item = os.path.abspath(item)
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for filename in files:
+                    if filename.lower().endswith(VIDEO_EXTENSIONS):
+                        path = os.path.join(root, filename)
+                        found.setdefault(path, os.path.relpath(path, item))
+        elif os.path.isfile(item):
+            found.setdefault(item, os.path.basename(item))
+        else:
+            print(f"⚠️ Batch input not found: {item}")
+    return sorted(found.items())
+
+
+def batch_video_filename(batch_id: str, name: str) -> str:
+    """Unique `video_filename` for a batch video (camera exports often reuse file names)."""
+    return secure_filename(f"{batch_id[:8]}_{name.replace(os.sep, '_')}")
+
+
+def create_batch(inputs: list, references, name: str = None) -> str:
+    """
+    Registers a batch: `inputs` are video files/directories, `references` a list of reference
+    image paths or {identity: [paths]}. Returns the batch id.
+    """
+    videos = discover_videos(inputs)
+    if not videos:
+        raise ValueError("No videos found in the batch inputs.")
+
+    batch_id = uuid.uuid4().hex
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            conn.execute("INSERT INTO batches (id, name, reference_images, status) VALUES (?, ?, ?, ?)",
+                         (batch_id, name, json.dumps(references), QUEUED))
+            conn.executemany(
+                "INSERT INTO batch_videos (batch_id, position, video_path, video_filename, status) VALUES (?, ?, ?, ?, ?)",
+                [(batch_id, i, path, batch_video_filename(batch_id, rel), QUEUED) for i, (path, rel) in enumerate(videos)]
+            )
+    finally:
+        conn.close()
+    print(f"🗂️ Batch {batch_id}: {len(videos)} videos registered.")
+    return batch_id
+
+
+def get_batch(batch_id: str):
+    """Batch record with its per-video states, or None."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.row_factory = sqlite3.Row
+        batch = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if batch is None:
+            return None
+        videos = conn.execute("SELECT * FROM batch_videos WHERE batch_id = ? ORDER BY position", (batch_id,)).fetchall()
+    finally:
+        conn.close()
+
+    record = dict(batch)
+    record['reference_images'] = json.loads(record['reference_images'])
+    record['result'] = json.loads(record['result']) if record['result'] else None
+    record['videos'] = [dict(video) for video in videos]
+    return record
+
+
+def set_batch_job(batch_id: str, job_id: str):
+    """Records the job that processes the batch (see get_batch()['job_id'])."""
+    _execute("UPDATE batches SET job_id = ? WHERE id = ?", (job_id, batch_id))
+
+
+class BatchRunner:
+    """Processes the unfinished videos of one batch and registers the consolidated report."""
+
+    def __init__(self, batch_id: str, processor, workers: int = BATCH_VIDEO_WORKERS, publish=None):
+        self.batch_id = batch_id
+        self.processor = processor
+        self.workers = max(1, int(workers))
+        # Receives every generator event, tagged with its "video"
+        self.publish = publish or (lambda event: None)
+
+    def run(self) -> dict:
+        batch = get_batch(self.batch_id)
+        if batch is None:
+            raise ValueError(f"Unknown batch {self.batch_id}")
+
+        todo = [video for video in batch['videos'] if video['status'] != DONE]
+        skipped = len(batch['videos']) - len(todo)
+        print(f"🗂️ Batch {self.batch_id}: {len(todo)} videos to process, {skipped} already done.")
+        _execute("UPDATE batches SET status = ?, finished_at = NULL WHERE id = ?", (RUNNING, self.batch_id))
+
+        # One gallery for every video of the batch
+        gallery = self.processor.build_gallery(batch['reference_images'])
+        if gallery is None:
+            _execute("UPDATE batches SET status = ? WHERE id = ?", (FAILED, self.batch_id))
+            raise RuntimeError("Could not generate reference embedding from provided images.")
+
+        self.publish({"status": "batch_start", "batch_id": self.batch_id, "videos": len(batch['videos']),
+                      "pending": len(todo), "identities": gallery.identities})
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch') as executor:
+            list(executor.map(lambda video: self._run_video(video, gallery), todo))
+
+        return self._finish()
+
+    def _run_video(self, video: dict, gallery):
+        # A video interrupted midway resumes from its checkpoint (see VideoProcessor)
+        video_filename = video['video_filename']
+        _execute("UPDATE batch_videos SET status = ?, error = NULL, started_at = CURRENT_TIMESTAMP "
+                 "WHERE batch_id = ? AND video_filename = ?", (RUNNING, self.batch_id, video_filename))
+
+        final = None
+        try:
+            for event in self.processor.process_video_generator(video['video_path'], gallery, video_filename=video_filename):
+                final = event
+                self.publish({**event, "video": video_filename})
+        except Exception as e:
+            final = {"status": "error", "message": str(e)}
+            self.publish({**final, "video": video_filename})
+
+        if final is not None and final['status'] == 'completed':
+            _execute("UPDATE batch_videos SET status = ?, frames_processed = ?, matches_found = ?, "
+                     "finished_at = CURRENT_TIMESTAMP WHERE batch_id = ? AND video_filename = ?",
+                     (DONE, final['frames_processed'], final['matches_found'], self.batch_id, video_filename))
+        else:
+            error = final.get('message', "Processing failed.") if final else "Processing failed to start."
+            _execute("UPDATE batch_videos SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP "
+                     "WHERE batch_id = ? AND video_filename = ?", (FAILED, error, self.batch_id, video_filename))
+            print(f"🔴 Batch video failed: {video_filename}: {error}")
+
+    def _finish(self) -> dict:
+        batch = get_batch(self.batch_id)
+        videos = batch['videos']
+        failed = [video['video_filename'] for video in videos if video['status'] != DONE]
+
+        result = {
+            "batch_id": self.batch_id,
+            "videos": len(videos),
+            "videos_done": len(videos) - len(failed),
+            "videos_failed": failed,
+            "matches_found": sum(video['matches_found'] or 0 for video in videos),
+            # Built on first download (see ReportBuilder)
+            "report_urls": get_report_builder().register_batch(self.batch_id)
+        }
+        _execute("UPDATE batches SET status = ?, result = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                 (PARTIAL if failed else DONE, json.dumps(result), self.batch_id))
+        print(f"✅ Batch {self.batch_id} finished: {result['videos_done']}/{result['videos']} videos, "
+              f"{result['matches_found']} matches.")
+        return result
+
+
+def _print_event(event: dict):
+    """CLI event sink: one line per video start/finish/error."""
+    status = event['status']
+    if status == 'start':
+        print(f"▶️ {event['video']}: {event['total_frames']} frames")
+    elif status == 'completed':
+        print(f"✔️ {event['video']}: {event['matches_found']} matches")
+    elif status == 'error':
+        print(f"🔴 {event['video']}: {event['message']}")
+
+
+def main():
+    from ..database.init_db import init_db
+    from . import model_registry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Register a new batch and process it.")
+    run_parser.add_argument('--videos', nargs='+', required=True, help="Video files and/or directories.")
+    run_parser.add_argument('--refs', nargs='+', required=True, help="Reference images.")
+    run_parser.add_argument('--labels', nargs='+', help="One identity per reference image (multi-person search).")
+    run_parser.add_argument('--name', help="Human-readable batch name.")
+    run_parser.add_argument('--workers', type=int, default=BATCH_VIDEO_WORKERS)
+
+    resume_parser = commands.add_parser('resume', help="Process the unfinished videos of an existing batch.")
+    resume_parser.add_argument('batch_id')
+    resume_parser.add_argument('--workers', type=int, default=BATCH_VIDEO_WORKERS)
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == 'run':
+        refs = [os.path.abspath(ref) for ref in args.refs]
+        if args.labels:
+            if len(args.labels) != len(refs):
+                parser.error("--labels needs one entry per reference image.")
+            references = {}
+            for label, ref in zip(args.labels, refs):
+                references.setdefault(label, []).append(ref)
+        else:
+            references = refs
+        batch_id = create_batch(args.videos, references, name=args.name)
+    else:
+        batch_id = args.batch_id
+        if get_batch(batch_id) is None:
+            parser.error(f"Unknown batch {batch_id}")
+
+    result = BatchRunner(batch_id, model_registry.get_processor(), workers=args.workers, publish=_print_event).run()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
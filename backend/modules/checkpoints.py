@@ -0,0 +1,79 @@
+import os
+import sqlite3
+
+from ..config import DB_PATH, MATCHES_FOLDER
+
+
+class Checkpoint:
+    """Progress of one video under one processing fingerprint (references + settings)."""
+
+    def __init__(self, video_filename, reference_hash, last_frame, matches_found, total_frames, completed):
+        self.video_filename = video_filename
+        self.reference_hash = reference_hash
+        self.last_frame = last_frame
+        self.matches_found = matches_found
+        self.total_frames = total_frames
+        self.completed = bool(completed)
+
+
+# Upserted by DetectionWriter in the same transaction as the rows it covers
+UPSERT_SQL = '''
+    INSERT INTO checkpoints (video_filename, reference_hash, last_frame, matches_found, total_frames, completed, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(video_filename, reference_hash) DO UPDATE SET
+        last_frame = excluded.last_frame,
+        matches_found = excluded.matches_found,
+        total_frames = excluded.total_frames,
+        completed = excluded.completed,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+
+def load_checkpoint(video_filename: str, reference_hash: str, db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT video_filename, reference_hash, last_frame, matches_found, total_frames, completed "
+            "FROM checkpoints WHERE video_filename = ? AND reference_hash = ?", (video_filename, reference_hash)
+        ).fetchone()
+    finally:
+        conn.close()
+    return Checkpoint(*row) if row else None
+
+
+def has_checkpoint(video_filename: str, db_path: str = DB_PATH) -> bool:
+    """True if any run of this video (under any references) has left a checkpoint."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT 1 FROM checkpoints WHERE video_filename = ? LIMIT 1", (video_filename,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def existing_match_keys(video_filename: str, from_frame: int = 0, db_path: str = DB_PATH) -> set:
+    """(frame_number, identity) of rows already logged at or after `from_frame`, for dedupe on resume."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {(frame, identity) for frame, identity in conn.execute(
+            "SELECT frame_number, identity FROM detections WHERE video_filename = ? AND frame_number >= ?",
+            (video_filename, from_frame))}
+    finally:
+        conn.close()
+
+
+def purge_video_results(video_filename: str, db_path: str = DB_PATH):
+    """Removes a video's detections, their crops and its checkpoints (a clean restart)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        images = [row[0] for row in conn.execute(
+            "SELECT match_image_path FROM detections WHERE video_filename = ?", (video_filename,))]
+        with conn:
+            conn.execute("DELETE FROM detections WHERE video_filename = ?", (video_filename,))
+            conn.execute("DELETE FROM checkpoints WHERE video_filename = ?", (video_filename,))
+    finally:
+        conn.close()
+    for image in images:
+        try:
+            os.remove(os.path.join(MATCHES_FOLDER, image))
+        except OSError:
+            pass
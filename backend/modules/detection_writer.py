@@ -0,0 +1,120 @@
+import sqlite3
+import time
+import traceback
+
+from ..config import DB_PATH, DETECTION_BATCH_SIZE, DETECTION_FLUSH_SECONDS
+from ..database.init_db import timestamp_to_ms
+from .checkpoints import UPSERT_SQL as CHECKPOINT_SQL
+from .metrics import timed
+
+
+class DetectionWriter:
+    """
+    Buffered sink for `detections` rows of a single job.
+
+    Keeps one SQLite connection open for the whole video (WAL mode), collects rows in memory
+    and writes them with executemany() in a single transaction once `batch_size` rows are
+    pending or `flush_interval` seconds have passed. Callers must flush() before reporting
+    a row to anyone (e.g. before yielding its `match` event) so reported rows are durable;
+    flush() raises when the write fails, so nothing is reported for rows that were not.
+    A checkpoint set with set_checkpoint() is committed in the same transaction as the rows.
+
+    Integer-millisecond timestamps are derived from the frame numbers when the video's `fps`
+    is known (the display strings are truncated to whole seconds), else parsed from the text.
+    """
+
+    INSERT_SQL = '''
+        INSERT INTO detections (video_filename, frame_number, timestamp, similarity, match_image_path, identity,
+                                end_frame_number, end_timestamp, timestamp_ms, end_timestamp_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    def __init__(self, db_path: str = DB_PATH, batch_size: int = DETECTION_BATCH_SIZE,
+                 flush_interval: float = DETECTION_FLUSH_SECONDS, fps: float = None):
+        self.db_path = db_path
+        self.fps = fps if fps and fps > 0 else None
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+
+        self.rows = []
+        self.checkpoint = None
+        self.rows_written = 0
+        self._last_flush = time.monotonic()
+
+        # The generator that owns this writer may be resumed from different threads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL: readers (results API, reports) never block the writer and commits append to the log.
+        # synchronous=NORMAL keeps committed rows safe across an application crash.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    @property
+    def pending(self) -> int:
+        return len(self.rows)
+
+    def add(self, video_filename, frame_num, timestamp, similarity, match_image_path, identity=None,
+            end_frame_num=None, end_timestamp=None):
+        """Buffers one detection row. A single-frame detection ends where it starts."""
+        if end_frame_num is None:
+            end_frame_num, end_timestamp = frame_num, timestamp
+        self.rows.append((video_filename, frame_num, timestamp, similarity, match_image_path, identity,
+                          end_frame_num, end_timestamp,
+                          self._ms(frame_num, timestamp), self._ms(end_frame_num, end_timestamp)))
+
+    def _ms(self, frame_num, timestamp):
+        if self.fps:
+            return int(round(frame_num * 1000.0 / self.fps))
+        return timestamp_to_ms(timestamp)
+
+    def set_checkpoint(self, video_filename, reference_hash, last_frame, matches_found, total_frames=None, completed=False):
+        """Stages the resume checkpoint to be written with the next flush."""
+        self.checkpoint = (video_filename, reference_hash, last_frame, matches_found, total_frames, int(completed))
+
+    def should_flush(self) -> bool:
+        if not self.rows:
+            return False
+        return len(self.rows) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self):
+        """
+        Writes all buffered rows (and the staged checkpoint) in one transaction. Raises if the
+        write fails; the rows and checkpoint then stay buffered for the next attempt.
+        """
+        self._last_flush = time.monotonic()
+        if not self.rows and self.checkpoint is None:
+            return
+        try:
+            with timed('db_write'), self.conn:
+                if self.rows:
+                    self.conn.executemany(self.INSERT_SQL, self.rows)
+                if self.checkpoint is not None:
+                    self.conn.execute(CHECKPOINT_SQL, self.checkpoint)
+        except Exception as db_err:
+            print(f"⚠️ Database log failed for {len(self.rows)} detections: {db_err}")
+            raise
+        self.rows_written += len(self.rows)
+        self.rows = []
+        self.checkpoint = None
+
+    def close(self):
+        """Flushes what is left and closes the connection. Safe to call twice."""
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # Already unwinding: a failing final flush must not replace the original error
+        try:
+            self.close()
+        except Exception:
+            traceback.print_exc()
@@ -0,0 +1,141 @@
+import copy
+import os
+
+import numpy as np
+import torch
+
+from ..config import EMBEDDER_BACKEND, EMBEDDER_INT8, EMBEDDER_ONNX_DIR, EMBEDDER_THREADS
+
+BACKENDS = ('eager', 'torchscript', 'compile', 'onnx')
+
+# Aligned MTCNN crops: (N, 3, 160, 160) in [0, 255]
+FACE_SHAPE = (3, 160, 160)
+
+
+class EagerEmbedder:
+    """
+    Runs the FaceNet module as is. Every backend takes a (N, 3, 160, 160) tensor of aligned
+    faces and returns the raw (N, 512) float32 embeddings as a NumPy array.
+    """
+    name = 'eager'
+
+    def __init__(self, model: torch.nn.Module, device: torch.device):
+        self.model = model
+        self.device = device
+
+    def __call__(self, face_tensors: torch.Tensor) -> np.ndarray:
+        with torch.no_grad():
+            return self.model(face_tensors.to(self.device)).cpu().numpy()
+
+
+class TorchScriptEmbedder(EagerEmbedder):
+    """FaceNet traced to TorchScript and frozen (weights folded into the graph)."""
+    name = 'torchscript'
+
+    def __init__(self, model: torch.nn.Module, device: torch.device):
+        example = torch.zeros((2,) + FACE_SHAPE, device=device)
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+            scripted = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+        super().__init__(scripted, device)
+
+
+class CompiledEmbedder(EagerEmbedder):
+    """FaceNet through torch.compile; the first batch of each new shape pays for compilation."""
+    name = 'compile'
+
+    def __init__(self, model: torch.nn.Module, device: torch.device):
+        if not hasattr(torch, 'compile'):
+            raise RuntimeError("EMBEDDER_BACKEND='compile' needs PyTorch 2.0 or newer.")
+        super().__init__(torch.compile(model, dynamic=True), device)
+
+
+class OnnxEmbedder:
+    """
+    FaceNet exported to ONNX (once, cached in EMBEDDER_ONNX_DIR) and run by ONNX Runtime on
+    the CPU, optionally with dynamic int8 quantization of the weights.
+    """
+
+    def __init__(self, model: torch.nn.Module, onnx_dir: str = EMBEDDER_ONNX_DIR, int8: bool = EMBEDDER_INT8,
+                 threads: int = EMBEDDER_THREADS):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("EMBEDDER_BACKEND='onnx' needs the onnx and onnxruntime packages.") from e
+
+        self.int8 = int8
+        self.name = 'onnx-int8' if int8 else 'onnx'
+        path = export_onnx(model, os.path.join(onnx_dir, 'facenet-vggface2.onnx'))
+        if int8:
+            path = quantize_onnx(path, os.path.join(onnx_dir, 'facenet-vggface2.int8.onnx'))
+        self.path = path
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, face_tensors: torch.Tensor) -> np.ndarray:
+        faces = face_tensors.detach().cpu().numpy().astype(np.float32, copy=False)
+        return self.session.run(None, {self.input_name: faces})[0]
+
+
+def export_onnx(model: torch.nn.Module, path: str) -> str:
+    """Exports FaceNet (dynamic batch axis) to `path` unless it already exists."""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    print(f"📦 Exporting FaceNet to ONNX: {path}")
+    cpu_model = copy.deepcopy(model).cpu().eval()
+    # Per-process temp name: segment workers may start exporting at the same time
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(cpu_model, torch.zeros((1,) + FACE_SHAPE), tmp_path, input_names=['faces'],
+                          output_names=['embeddings'], dynamic_axes={'faces': {0: 'batch'}, 'embeddings': {0: 'batch'}},
+                          opset_version=17)
+    os.replace(tmp_path, path)
+    return path
+
+
+def quantize_onnx(fp32_path: str, path: str) -> str:
+    """Dynamic int8 quantization (weights int8, activations quantized on the fly) unless `path` exists."""
+    if os.path.exists(path):
+        return path
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"📦 Quantizing FaceNet to int8: {path}")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, path)
+    return path
+
+
+def make_embedder(model: torch.nn.Module, device: torch.device, backend: str = EMBEDDER_BACKEND,
+                  int8: bool = EMBEDDER_INT8):
+    """The embedder for `backend` (one of BACKENDS) wrapping the loaded FaceNet module."""
+    if backend == 'eager':
+        return EagerEmbedder(model, device)
+    if backend == 'torchscript':
+        return TorchScriptEmbedder(model, device)
+    if backend == 'compile':
+        return CompiledEmbedder(model, device)
+    if backend == 'onnx':
+        return OnnxEmbedder(model, int8=int8)
+    raise ValueError(f"Unknown EMBEDDER_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}.")
+
+
+def cosine_deviation(reference: np.ndarray, embeddings: np.ndarray) -> dict:
+    """
+    How far `embeddings` are from the `reference` backend's embeddings of the same faces:
+    1 - cosine similarity per face, summarized as mean / max / p99.
+    """
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    deviation = 1.0 - np.sum(reference * embeddings, axis=1)
+    return {
+        "mean": float(deviation.mean()),
+        "max": float(deviation.max()),
+        "p99": float(np.percentile(deviation, 99)),
+    }
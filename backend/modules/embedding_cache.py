@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from ..config import EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_PATH
+
+
+class EmbeddingStore:
+    """
+    Persistent, size-bounded LRU store of float32 embeddings in SQLite.
+
+    Entries live in one table partitioned by `namespace` (e.g. 'reference' for per-image
+    reference embeddings, 'live' for live-feed sessions), each namespace with its own
+    `max_entries` bound. A key can also cache a negative result (no face found) by storing None.
+    With `ttl_seconds`, entries not used for that long are treated as missing and removed.
+    """
+
+    def __init__(self, namespace: str, db_path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES, ttl_seconds: float = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    embedding BLOB,
+                    dim INTEGER,
+                    last_used REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+            ''')
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embedding_cache_lru ON embedding_cache (namespace, last_used)"
+            )
+
+    @staticmethod
+    def _decode(blob):
+        return None if blob is None else np.frombuffer(blob, dtype=np.float32).copy()
+
+    def lookup(self, key: str):
+        """Returns (hit, embedding). A hit may carry None for a cached 'no face' result."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT embedding, last_used FROM embedding_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                with self.conn:
+                    self.conn.execute(
+                        "DELETE FROM embedding_cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    )
+                self._counters["expired"] += 1
+                row = None
+
+            if row is None:
+                self._counters["misses"] += 1
+                return False, None
+
+            self._counters["hits"] += 1
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE embedding_cache SET last_used = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key)
+                )
+            return True, self._decode(row[0])
+
+    def get(self, key: str):
+        """The cached embedding, or None on a miss (or a cached negative)."""
+        return self.lookup(key)[1]
+
+    def __contains__(self, key: str):
+        min_last_used = time.time() - self.ttl_seconds if self.ttl_seconds is not None else float('-inf')
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM embedding_cache WHERE namespace = ? AND key = ? AND last_used >= ?",
+                (self.namespace, key, min_last_used)
+            ).fetchone() is not None
+
+    def put(self, key: str, embedding):
+        """Stores (or refreshes) an entry, then evicts least-recently-used entries past the bound."""
+        blob = None
+        dim = None
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32).flatten()
+            blob = embedding.tobytes()
+            dim = embedding.size
+
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO embedding_cache (namespace, key, embedding, dim, last_used, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, blob, dim, now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drops the oldest entries beyond max_entries (caller holds the lock and a transaction)."""
+        size = self.conn.execute(
+            "SELECT COUNT(*) FROM embedding_cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        excess = size - self.max_entries
+        if excess > 0:
+            self.conn.execute('''
+                DELETE FROM embedding_cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM embedding_cache WHERE namespace = ? ORDER BY last_used LIMIT ?
+                )
+            ''', (self.namespace, self.namespace, excess))
+            self._counters["evictions"] += excess
+
+    def purge_expired(self) -> int:
+        """Removes every entry past its TTL. Returns the number removed."""
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM embedding_cache WHERE namespace = ? AND last_used < ?",
+                (self.namespace, time.time() - self.ttl_seconds)
+            )
+            self._counters["expired"] += cursor.rowcount
+            return cursor.rowcount
+
+    def delete(self, key: str) -> bool:
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM embedding_cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+            )
+            return cursor.rowcount > 0
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM embedding_cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction/expiry counters (this process) and the current entry count."""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["size"] = len(self)
+        counters["max_entries"] = self.max_entries
+        return counters
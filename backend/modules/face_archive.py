@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+
+import numpy as np
+from werkzeug.utils import secure_filename
+
+from ..config import FACE_ARCHIVE_FOLDER, FACE_ARCHIVE_SEARCH_CHUNK, TRACK_MAX_MISSES
+
+# Column files of an archive: name -> (dtype, per-row shape)
+COLUMNS = {
+    'frames': (np.int32, ()),
+    'timestamps_ms': (np.int64, ()),
+    'boxes': (np.float32, (4,)),
+    'probs': (np.float16, ()),
+    'embeddings': (np.float16, (512,)),
+}
+
+
+def archive_path(video_filename: str, root: str = FACE_ARCHIVE_FOLDER) -> str:
+    return os.path.join(root, secure_filename(video_filename))
+
+
+class FaceArchiveWriter:
+    """
+    Streams every detected face of a video into a new archive directory.
+
+    Rows are appended to one raw file per column, so memory stays flat however long the
+    video is; close() turns each into a .npy file (header + the same bytes) and swaps the
+    finished directory into place, the same way IVFIndex.save() does.
+    """
+
+    def __init__(self, path: str):
+        self.path = path.rstrip(os.sep)
+        self.tmp_path = self.path + '.tmp'
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._files = {name: open(os.path.join(self.tmp_path, name + '.raw'), 'wb') for name in COLUMNS}
+        self._sampled = open(os.path.join(self.tmp_path, 'sampled.raw'), 'wb')
+        self.faces = 0
+        self.frames = 0
+
+    def add_frame(self, frame_number: int, timestamp_ms: float, boxes=None, probs=None, embeddings=None):
+        """Records one sampled frame and the faces detected in it (none if `boxes` is None)."""
+        self.frames += 1
+        self._sampled.write(np.int32(frame_number).tobytes())
+        if boxes is None or len(boxes) == 0:
+            return
+        count = len(boxes)
+        values = {
+            'frames': np.full(count, frame_number),
+            'timestamps_ms': np.full(count, int(round(timestamp_ms))),
+            'boxes': boxes,
+            'probs': probs,
+            'embeddings': embeddings,
+        }
+        for name, (dtype, _) in COLUMNS.items():
+            self._files[name].write(np.ascontiguousarray(values[name], dtype=dtype).tobytes())
+        self.faces += count
+
+    @staticmethod
+    def _to_npy(raw_path: str, dtype, shape: tuple, rows: int):
+        npy_path = raw_path[:-len('.raw')] + '.npy'
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False,
+                  'shape': (rows,) + shape}
+        with open(npy_path, 'wb') as out, open(raw_path, 'rb') as raw:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out, 1 << 20)
+        os.remove(raw_path)
+
+    def close(self, meta: dict):
+        for handle in list(self._files.values()) + [self._sampled]:
+            handle.close()
+        for name, (dtype, shape) in COLUMNS.items():
+            self._to_npy(os.path.join(self.tmp_path, name + '.raw'), dtype, shape, self.faces)
+        self._to_npy(os.path.join(self.tmp_path, 'sampled.raw'), np.int32, (), self.frames)
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, faces=self.faces, frames_sampled=self.frames), f)
+
+        old_path = self.path + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def abort(self):
+        for handle in list(self._files.values()) + [self._sampled]:
+            handle.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class FaceArchive:
+    """
+    Every face detected in one indexed video: frame number, timestamp, box, detection
+    probability and float16 FaceNet embedding, one memory-mapped .npy file per column.
+
+    A search scores the embeddings column against a gallery in chunks (one matrix product
+    each), so searching an indexed video never decodes it; only the crops of the final
+    matches are re-extracted from the stored boxes.
+    """
+
+    def __init__(self, path: str, meta: dict, columns: dict, sampled: np.ndarray):
+        self.path = path
+        self.meta = meta
+        self.frames = columns['frames']
+        self.timestamps_ms = columns['timestamps_ms']
+        self.boxes = columns['boxes']
+        self.probs = columns['probs']
+        self.embeddings = columns['embeddings']
+        self.sampled = sampled  # frame numbers of every sampled frame, faces or not
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode) for name in COLUMNS}
+        return cls(path, meta, columns, np.load(os.path.join(path, 'sampled.npy'), mmap_mode=mmap_mode))
+
+    @classmethod
+    def open(cls, video_filename: str, root: str = FACE_ARCHIVE_FOLDER):
+        """The archive of an indexed video, or None if it has not been indexed."""
+        path = archive_path(video_filename, root)
+        return cls.load(path) if os.path.exists(os.path.join(path, 'meta.json')) else None
+
+    def search(self, gallery, chunk: int = FACE_ARCHIVE_SEARCH_CHUNK):
+        """
+        Faces that clear the gallery threshold, best face per (frame, identity).
+        Returns a list of (face row, identity, similarity) in frame order.
+        """
+        hits = {}
+        for start in range(0, len(self), chunk):
+            block = np.asarray(self.embeddings[start:start + chunk], dtype=np.float32)
+            frames = self.frames[start:start + chunk]
+            if gallery.matrix is not None:
+                scores = gallery.score(block)
+                rows, columns = np.nonzero(scores >= gallery.threshold)
+                found = ((row, gallery.labels[column], float(scores[row, column])) for row, column in zip(rows, columns))
+            else:
+                found = ((row, identity, similarity) for row, faces in enumerate(gallery.top_k(block, k=len(gallery)))
+                         for identity, similarity, is_match in faces if is_match)
+            for row, identity, similarity in found:
+                key = (int(frames[row]), identity)
+                if key not in hits or similarity > hits[key][2]:
+                    hits[key] = (start + int(row), identity, similarity)
+        return [hits[key] for key in sorted(hits)]
+
+    def appearances(self, hits: list, max_misses: int = TRACK_MAX_MISSES):
+        """
+        Merges per-frame hits of the same identity into appearance intervals: consecutive hits
+        at most `max_misses` sampled frames apart belong together (the tracker's rule).
+        Returns dicts with identity, first/last face row and the best face row + similarity.
+        """
+        positions = np.searchsorted(self.sampled, [self.frames[row] for row, _, _ in hits])
+        open_intervals = {}
+        finished = []
+        for (row, identity, similarity), position in zip(hits, positions):
+            current = open_intervals.get(identity)
+            if current is not None and position - current['last_position'] > max_misses + 1:
+                finished.append(open_intervals.pop(identity))
+                current = None
+            if current is None:
+                open_intervals[identity] = current = {'identity': identity, 'start_row': row, 'best_row': row,
+                                                      'best_similarity': similarity}
+            current['end_row'] = row
+            current['last_position'] = position
+            if similarity > current['best_similarity']:
+                current['best_row'], current['best_similarity'] = row, similarity
+        finished.extend(open_intervals.values())
+        for interval in finished:
+            del interval['last_position']
+        return sorted(finished, key=lambda interval: (self.frames[interval['start_row']], interval['identity']))
+
+
+def list_archives(root: str = FACE_ARCHIVE_FOLDER) -> list:
+    """Metadata of every finished archive."""
+    archives = []
+    if not os.path.isdir(root):
+        return archives
+    for name in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, name, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                archives.append(json.load(f))
+    return archives
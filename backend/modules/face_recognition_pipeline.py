@@ -1,3 +1,5 @@
+import hashlib
+
 import cv2
 import numpy as np
 import torch
@@ -7,12 +9,20 @@ import torch
 from facenet_pytorch import MTCNN, InceptionResnetV1
 from werkzeug.datastructures import FileStorage
 
+from ..config import EMBEDDER_BACKEND, EMBEDDER_INT8
+from .embedder_backends import make_embedder
+from .embedding_cache import EmbeddingStore
+from .metrics import FACES_DETECTED, EMBEDDINGS_COMPUTED, timed
+
 class FaceRecognitionPipeline:
     """
     Handles Face Detection (MTCNN), Face Alignment, and Embedding Generation (FaceNet)
     in a single, optimized class.
     """
 
+    # Part of every reference-cache key: bump when detector/aligner/embedder settings change
+    MODEL_VERSION = "mtcnn-160-m0+facenet-vggface2" + ("-int8" if EMBEDDER_BACKEND == 'onnx' and EMBEDDER_INT8 else "")
+
     def __init__(self):
         # 1. Device Setup (Uses your GTX 1650)
         self.device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
@@ -32,6 +42,8 @@ class FaceRecognitionPipeline:
         
         # 3. FaceNet Embedder Setup
         self.embedder = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
+        # Runs the embedder: eager, TorchScript, torch.compile or ONNX Runtime (EMBEDDER_BACKEND)
+        self.embed_backend = make_embedder(self.embedder, self.device)
             
         # 4. --- REMOVED TRANSFORM ---
         # The InceptionResnetV1 model handles its own normalization
@@ -39,7 +51,10 @@ class FaceRecognitionPipeline:
         # self.transform = ... (Removed)
         # ---------------------------
 
-        print("✅ Face Recognition Pipeline (MTCNN + FaceNet) loaded successfully.")
+        # 5. Persistent per-image reference embeddings (content hash + model version)
+        self.reference_cache = EmbeddingStore(namespace='reference')
+
+        print(f"✅ Face Recognition Pipeline (MTCNN + FaceNet, {self.embed_backend.name} embedder) loaded successfully.")
 
     def process_frame(self, frame: np.ndarray):
         """
@@ -51,65 +66,202 @@ class FaceRecognitionPipeline:
         # Convert BGR (OpenCV) to RGB (PyTorch/PIL)
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        # --- UPDATED DETECTION/ALIGNMENT LOGIC ---
-        # 1. Detect faces and get bounding boxes
-        boxes, _ = self.mtcnn.detect(frame_rgb)
-        
-        # 2. Get aligned face tensors ([0, 255] range)
-        face_tensors = self.mtcnn(frame_rgb)
+        # --- SINGLE-PASS DETECTION/ALIGNMENT ---
+        # 1. Run the MTCNN cascade once to get boxes and detection probabilities
+        with timed('detect'):
+            boxes, probs = self.mtcnn.detect(frame_rgb)
+
+        # 2. Build aligned face tensors ([0, 255] range) from those same boxes.
+        #    extract() only crops and resizes, so boxes and crops match by construction.
+        if boxes is None:
+            return []
+        FACES_DETECTED.inc(len(boxes))
+        with timed('align'):
+            face_tensors = self.mtcnn.extract(frame_rgb, boxes, None)
         # ----------------------------------------
-        
+
+        if face_tensors is None:
+            return []
+
+        embeddings = self._embed(face_tensors)
+        return self._build_faces_data(boxes, probs, face_tensors, embeddings)
+
+    def process_frames(self, frames: list):
+        """
+        Batched variant of process_frame: runs MTCNN detection on the whole list in one
+        call and embeds every aligned face from every frame in a single FaceNet forward pass.
+        Returns one list of face dicts per input frame, in input order.
+        """
+        results = [[] for _ in frames]
+        valid = [i for i, f in enumerate(frames) if f is not None and f.size > 0]
+        if not valid:
+            return results
+
+        frames_rgb = [cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB) for i in valid]
+
+        # MTCNN batches natively when all frames share the same size (true for a video).
+        with timed('detect'):
+            batch_boxes, batch_probs = self.mtcnn.detect(frames_rgb)
+        FACES_DETECTED.inc(sum(len(boxes) for boxes in batch_boxes if boxes is not None))
+        with timed('align'):
+            batch_faces = self.mtcnn.extract(frames_rgb, batch_boxes, None)
+
+        # Concatenate every face of every frame into one embedder batch
+        owners = []
+        tensors = []
+        for j, faces in enumerate(batch_faces):
+            if faces is None or batch_boxes[j] is None:
+                continue
+            owners.append(j)
+            tensors.append(faces)
+
+        if not tensors:
+            return results
+
+        embeddings = self._embed(torch.cat(tensors, dim=0))
+
+        # Split the embeddings back into their frames
+        offset = 0
+        for j, faces in zip(owners, tensors):
+            count = faces.shape[0]
+            results[valid[j]] = self._build_faces_data(
+                batch_boxes[j], batch_probs[j], faces, embeddings[offset:offset + count]
+            )
+            offset += count
+
+        return results
+
+    def detect_frames(self, frames: list):
+        """
+        Detection only (no alignment, no embedding), batched like process_frames.
+        Returns one (boxes, probs) pair of arrays per input frame, (None, None) where no face was found.
+        """
+        results = [(None, None) for _ in frames]
+        valid = [i for i, f in enumerate(frames) if f is not None and f.size > 0]
+        if not valid:
+            return results
+
+        frames_rgb = [cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB) for i in valid]
+        with timed('detect'):
+            batch_boxes, batch_probs = self.mtcnn.detect(frames_rgb)
+        for j, i in enumerate(valid):
+            if batch_boxes[j] is not None:
+                results[i] = (batch_boxes[j], batch_probs[j])
+                FACES_DETECTED.inc(len(batch_boxes[j]))
+        return results
+
+    def embed_regions(self, frames: list, regions: list):
+        """
+        Aligns and embeds only the given boxes: `regions[i]` is a (boxes, probs) pair for
+        frames[i], or None to skip that frame. All faces go through one FaceNet forward pass.
+        Returns one list of face dicts (same shape as process_frames) per input frame.
+        """
+        results = [[] for _ in frames]
+        wanted = [i for i, region in enumerate(regions) if region is not None and len(region[0])]
+        if not wanted:
+            return results
+
+        frames_rgb = [cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB) for i in wanted]
+        with timed('align'):
+            batch_faces = self.mtcnn.extract(frames_rgb, [np.asarray(regions[i][0]) for i in wanted], None)
+
+        tensors = [faces for faces in batch_faces if faces is not None]
+        if not tensors:
+            return results
+        embeddings = self._embed(torch.cat(tensors, dim=0))
+
+        offset = 0
+        for i, faces in zip(wanted, batch_faces):
+            if faces is None:
+                continue
+            count = faces.shape[0]
+            boxes, probs = regions[i]
+            results[i] = self._build_faces_data(np.asarray(boxes), probs, faces, embeddings[offset:offset + count])
+            offset += count
+        return results
+
+    def crop_faces(self, frame: np.ndarray, boxes):
+        """Aligned 160x160 BGR crops of the given boxes (same crops process_frame produces), no embedding."""
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with timed('align'):
+            face_tensors = self.mtcnn.extract(frame_rgb, np.asarray(boxes, dtype=np.float32), None)
+        if face_tensors is None:
+            return []
+        return [cv2.cvtColor(face.permute(1, 2, 0).cpu().numpy().astype(np.uint8), cv2.COLOR_RGB2BGR)
+                for face in face_tensors]
+
+    def _embed(self, face_tensors):
+        """Runs the FaceNet embedder backend on a (N, 3, 160, 160) tensor of aligned faces."""
+        EMBEDDINGS_COMPUTED.inc(len(face_tensors))
+        with timed('embed'):
+            # Generate embeddings. The embedder handles normalization.
+            return self.embed_backend(face_tensors)
+
+    def _build_faces_data(self, boxes, probs, face_tensors, embeddings):
+        """Packs boxes, aligned crops and L2-normalized embeddings into per-face dicts."""
         faces_data = []
-        
-        if face_tensors is not None and boxes is not None:
-            # Move tensors to the correct device
-            face_tensors = face_tensors.to(self.device)
-            
-            with torch.no_grad():
-                # Generate embeddings. The embedder handles normalization.
-                embeddings = self.embedder(face_tensors).cpu().numpy()
-            
-            # Ensure we have the same number of boxes and embeddings
-            if len(boxes) != len(embeddings):
-                return [] 
-            
-            for i, box in enumerate(boxes):
-                # --- UPDATED IMAGE CONVERSION ---
-                # Tensors are [0, 255], so we just convert type, not denormalize from [-1, 1]
-                aligned_np_rgb = face_tensors[i].permute(1, 2, 0).cpu().numpy().astype(np.uint8)
-                aligned_bgr = cv2.cvtColor(aligned_np_rgb, cv2.COLOR_RGB2BGR)
-                # --------------------------------
-
-                # L2 Normalize the embedding (standard practice)
-                embedding = embeddings[i]
-                embedding = embedding / np.linalg.norm(embedding) 
-                
-                faces_data.append({
-                    'box': tuple(box.astype(int)), 
-                    'embedding': embedding,
-                    'cropped_image': aligned_bgr
-                })
-                    
+
+        for i, box in enumerate(boxes):
+            # --- UPDATED IMAGE CONVERSION ---
+            # Tensors are [0, 255], so we just convert type, not denormalize from [-1, 1]
+            aligned_np_rgb = face_tensors[i].permute(1, 2, 0).cpu().numpy().astype(np.uint8)
+            aligned_bgr = cv2.cvtColor(aligned_np_rgb, cv2.COLOR_RGB2BGR)
+            # --------------------------------
+
+            # L2 Normalize the embedding (standard practice)
+            embedding = embeddings[i]
+            embedding = embedding / np.linalg.norm(embedding)
+
+            faces_data.append({
+                'box': tuple(box.astype(int)),
+                'prob': float(probs[i]) if probs is not None else 0.0,
+                'embedding': embedding,
+                'cropped_image': aligned_bgr
+            })
+
         return faces_data
 
+    @staticmethod
+    def _read_source_bytes(source):
+        """Raw encoded bytes of a reference source (uploaded FileStorage or file path)."""
+        if isinstance(source, FileStorage):
+            return source.read()
+        if isinstance(source, str):
+            try:
+                with open(source, 'rb') as f:
+                    return f.read()
+            except OSError as e:
+                print(f"⚠️ Could not read reference image {source}: {e}")
+        return None
+
+    def _embed_reference_bytes(self, image_bytes: bytes):
+        """Embedding of the first face in an encoded image, or None if there is no face."""
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if img is None or img.size == 0:
+            return None
+        results = self.process_frame(img)
+        # Use the embedding of the first detected face
+        return results[0]['embedding'] if results else None
+
     def get_reference_embedding(self, ref_sources: list):
         """Calculates a single averaged embedding from multiple reference sources (images)."""
         embeddings = []
         
         for source in ref_sources:
-            img = None
-            if isinstance(source, FileStorage):
-                image_bytes = source.read()
-                nparr = np.frombuffer(image_bytes, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            elif isinstance(source, str):
-                img = cv2.imread(source)
-            
-            if img is not None and img.size > 0:
-                results = self.process_frame(img)
-                if results:
-                    # Append the embedding of the first detected face
-                    embeddings.append(results[0]['embedding'])
+            image_bytes = self._read_source_bytes(source)
+            if not image_bytes:
+                continue
+
+            # Same bytes + same models = same embedding: skip decode and inference on a hit
+            key = f"{self.MODEL_VERSION}:{hashlib.sha256(image_bytes).hexdigest()}"
+            hit, embedding = self.reference_cache.lookup(key)
+            if not hit:
+                embedding = self._embed_reference_bytes(image_bytes)
+                self.reference_cache.put(key, embedding)
+
+            if embedding is not None:
+                embeddings.append(embedding)
         
         if not embeddings:
             return None
@@ -123,4 +275,4 @@ class FaceRecognitionPipeline:
             return None
             
         return mean_embedding / norm
-        # -----------------------------------------------------------
\ No newline at end of file
+        # -----------------------------------------------------------
@@ -0,0 +1,193 @@
+import numpy as np
+
+from ..config import TRACK_CONFIDENCE_DELTA, TRACK_IOU_THRESHOLD, TRACK_MAX_MISSES, TRACK_REEMBED_FRAMES
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N x 4) and (M x 4) [x1, y1, x2, y2] boxes."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)[:, None, :]
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class KalmanBoxFilter:
+    """
+    Constant-velocity Kalman filter over a box's centre and size, one step per sampled frame.
+    State: [cx, cy, w, h, vcx, vcy, vw, vh].
+    """
+
+    def __init__(self, box):
+        self.x = np.zeros(8)
+        self.x[:4] = self._to_state(box)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0, 1000.0, 1000.0])
+
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        self.H = np.eye(4, 8)
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001, 0.0001])
+        self.R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+    @staticmethod
+    def _to_state(box):
+        x1, y1, x2, y2 = [float(v) for v in box]
+        return np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0, x2 - x1, y2 - y1])
+
+    def box(self) -> np.ndarray:
+        cx, cy, w, h = self.x[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return np.array([cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0])
+
+    def predict(self) -> np.ndarray:
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.box()
+
+    def update(self, box):
+        y = self._to_state(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8) - K @ self.H) @ self.P
+
+
+class Track:
+    """One face followed across sampled frames, with the embedding it was last scored on."""
+
+    def __init__(self, track_id: int, box, prob: float, frame_number: int):
+        self.track_id = track_id
+        self.kalman = KalmanBoxFilter(box)
+        self.box = np.asarray(box, dtype=np.float32)
+        self.prob = float(prob)
+        self.last_frame = frame_number
+        self.misses = 0
+
+        # Frame/confidence of the last (scheduled) embedding; the embedding itself and its
+        # match are filled in by the caller once the batched forward pass has run
+        self.embedded_frame = None
+        self.embedded_prob = None
+        self.embedding = None
+        self.identity = None
+        self.similarity = None
+        # Open Appearance while the track matches an identity
+        self.appearance = None
+
+
+class FaceTracker:
+    """
+    Greedy IoU association between Kalman-predicted track boxes and new detections.
+
+    Tracks survive up to `max_misses` sampled frames without a detection. A track needs an
+    embedding when it is new, every `reembed_frames` video frames, or when its detection
+    confidence drifts by more than `confidence_delta` (pose, occlusion or blur changed).
+    """
+
+    def __init__(self, iou_threshold: float = TRACK_IOU_THRESHOLD, max_misses: int = TRACK_MAX_MISSES,
+                 reembed_frames: int = TRACK_REEMBED_FRAMES, confidence_delta: float = TRACK_CONFIDENCE_DELTA):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reembed_frames = reembed_frames
+        self.confidence_delta = confidence_delta
+        self.tracks = []
+        self._next_id = 1
+
+        self.faces_seen = 0
+        self.faces_embedded = 0
+
+    def update(self, frame_number: int, boxes, probs):
+        """
+        Associates one frame's detections with the live tracks.
+        Returns (tracks, ended): the track of every detection in input order, and the tracks
+        that were dropped this frame.
+        """
+        boxes = np.zeros((0, 4), dtype=np.float32) if boxes is None else np.asarray(boxes, dtype=np.float32)
+        probs = np.zeros(len(boxes)) if probs is None else np.asarray(probs, dtype=np.float32)
+        self.faces_seen += len(boxes)
+
+        predicted = np.array([track.kalman.predict() for track in self.tracks]).reshape(-1, 4)
+        assigned = [None] * len(boxes)
+        used = set()
+
+        if len(self.tracks) and len(boxes):
+            ious = iou_matrix(predicted, boxes)
+            # Highest-overlap pairs first
+            for flat in np.argsort(-ious, axis=None):
+                t, d = np.unravel_index(flat, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if t in used or assigned[d] is not None:
+                    continue
+                used.add(t)
+                assigned[d] = self.tracks[t]
+
+        for d, track in enumerate(assigned):
+            if track is None:
+                track = Track(self._next_id, boxes[d], probs[d], frame_number)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[d] = track
+                used.add(len(self.tracks) - 1)
+            else:
+                track.kalman.update(boxes[d])
+                track.box = boxes[d]
+                track.prob = float(probs[d])
+                track.last_frame = frame_number
+                track.misses = 0
+
+        ended = []
+        alive = []
+        for t, track in enumerate(self.tracks):
+            if t not in used:
+                track.misses += 1
+            (ended if track.misses > self.max_misses else alive).append(track)
+        self.tracks = alive
+        return assigned, ended
+
+    def needs_embedding(self, track: Track, frame_number: int) -> bool:
+        if track.embedded_frame is None:
+            return True
+        if frame_number - track.embedded_frame >= self.reembed_frames:
+            return True
+        return abs(track.prob - track.embedded_prob) > self.confidence_delta
+
+    def schedule_embedding(self, track: Track, frame_number: int):
+        """Records that `track` is embedded at this frame, so later frames of the same batch reuse it."""
+        track.embedded_frame = frame_number
+        track.embedded_prob = track.prob
+        self.faces_embedded += 1
+
+    def flush(self):
+        """Ends every live track (end of video)."""
+        ended, self.tracks = self.tracks, []
+        return ended
+
+
+class Appearance:
+    """A continuous stretch of one track matching one identity."""
+
+    def __init__(self, identity, track_id: int, frame_number: int, timestamp: str):
+        self.identity = identity
+        self.track_id = track_id
+        self.start_frame = frame_number
+        self.start_timestamp = timestamp
+        self.end_frame = frame_number
+        self.end_timestamp = timestamp
+        self.best_similarity = -1.0
+        self.best_frame = frame_number
+        self.best_crop = None
+
+    def extend(self, frame_number: int, timestamp: str):
+        self.end_frame = frame_number
+        self.end_timestamp = timestamp
+
+    def offer(self, similarity: float, crop, frame_number: int):
+        """Keeps the crop of the best-scoring embedding seen during the appearance."""
+        if similarity > self.best_similarity:
+            self.best_similarity = similarity
+            self.best_crop = crop
+            self.best_frame = frame_number
@@ -0,0 +1,199 @@
+import math
+
+import cv2
+import numpy as np
+
+from ..config import (
+    FRAME_SKIP, MATCH_HOLD_SECONDS, MOTION_HOLD_SECONDS, MOTION_PIXEL_DELTA, MOTION_PROBE_STRIDE,
+    MOTION_PROBE_WIDTH, MOTION_THRESHOLD, SAMPLE_INTERVAL_MS, SAMPLING_IDLE_SECONDS, SAMPLING_MAX_FPS,
+    SEEK_THRESHOLD
+)
+
+
+class FrameSampler:
+    """
+    Reads only the frames the pipeline will actually process from an open cv2.VideoCapture.
+
+    Skipped frames are advanced with cap.grab(), which skips the retrieve()/BGR conversion
+    and copy; gaps larger than seek_threshold are jumped with CAP_PROP_POS_FRAMES so the
+    frames in between are never decoded. Sampling is either every `frame_skip` frames or,
+    when `interval_ms` is set, one frame per `interval_ms` of video time.
+
+    Iterating yields (frame_number, timestamp_ms, frame). Frame numbers always come from the
+    reader's real position and timestamps from CAP_PROP_POS_MSEC of the retrieved frame,
+    so both stay exact even if a seek lands somewhere other than requested.
+    """
+
+    def __init__(self, cap, frame_skip: int = FRAME_SKIP, interval_ms: float = SAMPLE_INTERVAL_MS,
+                 seek_threshold: int = SEEK_THRESHOLD, start_frame: int = 0, end_frame: int = None):
+        self.cap = cap
+        self.frame_skip = max(1, int(frame_skip))
+        self.interval_ms = interval_ms
+        self.seek_threshold = seek_threshold
+        self.start_frame = max(0, int(start_frame))
+        self.end_frame = end_frame
+
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+        # Counters (useful for benchmarking decode vs. grab vs. seek)
+        self.position = 0        # index of the next frame the reader will return
+        self.frames_grabbed = 0  # frames advanced without retrieve()
+        self.frames_decoded = 0  # frames fully retrieved and returned
+        self.seeks = 0
+
+    def _frame_step(self):
+        """Distance in frames between two samples."""
+        if self.interval_ms and self.fps > 0:
+            return max(1, int(round(self.interval_ms * self.fps / 1000.0)))
+        return self.frame_skip
+
+    def _first_target(self, position):
+        """First sampled frame index at or after `position`."""
+        if self.interval_ms:
+            return position
+        # Keep frame-index sampling aligned to multiples of frame_skip (0, N, 2N, ...)
+        return -(-position // self.frame_skip) * self.frame_skip
+
+    def _next_target(self, frame_number):
+        if self.interval_ms:
+            return frame_number + self._frame_step()
+        return (frame_number // self.frame_skip + 1) * self.frame_skip
+
+    def _seek(self, target):
+        """Jumps the reader to `target` and returns the position it actually landed on."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        self.seeks += 1
+        actual = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        return actual if actual >= 0 else target
+
+    def _past_end(self, position):
+        return self.end_frame is not None and position >= self.end_frame
+
+    @property
+    def frames_retrieved(self) -> int:
+        """Frames fully decoded so far, whether or not they were yielded."""
+        return self.frames_decoded
+
+    def notify_match(self, frame_number: int):
+        """Hint that a match was found at `frame_number` (fixed-rate sampling ignores it)."""
+
+    def __iter__(self):
+        cap = self.cap
+        self.position = self._seek(self.start_frame) if self.start_frame > 0 else 0
+        target = self._first_target(self.position)
+
+        while not self._past_end(target):
+            if target - self.position > self.seek_threshold:
+                self.position = self._seek(target)
+
+            # Advance through the (short) gap without converting the frames
+            while self.position < target:
+                if not cap.grab():
+                    return
+                self.position += 1
+                self.frames_grabbed += 1
+
+            if self._past_end(self.position):
+                return
+            if not cap.grab():
+                return
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+
+            frame_number = self.position
+            self.position += 1
+            self.frames_decoded += 1
+
+            yield frame_number, cap.get(cv2.CAP_PROP_POS_MSEC), frame
+
+            target = self._next_target(frame_number)
+
+
+class AdaptiveFrameSampler(FrameSampler):
+    """
+    Spends the inference budget where something happens.
+
+    Every `probe_stride`-th frame is decoded and reduced to a tiny blurred grayscale image;
+    the fraction of its pixels that changed since the previous probe is the motion score.
+    While the scene is active (motion within the last `motion_hold_s` seconds, or a match
+    within the last `match_hold_s` seconds) frames are sampled every `1 / max_fps` seconds of
+    video; a static scene is only sampled every `idle_s` seconds, so nobody standing still
+    for a long time is missed entirely. The onset of motion is sampled immediately
+    (budget permitting). Never seeks: every frame is at least grabbed.
+    """
+
+    def __init__(self, cap, max_fps: float = SAMPLING_MAX_FPS, idle_s: float = SAMPLING_IDLE_SECONDS,
+                 probe_stride: int = MOTION_PROBE_STRIDE, probe_width: int = MOTION_PROBE_WIDTH,
+                 pixel_delta: int = MOTION_PIXEL_DELTA, motion_threshold: float = MOTION_THRESHOLD,
+                 motion_hold_s: float = MOTION_HOLD_SECONDS, match_hold_s: float = MATCH_HOLD_SECONDS,
+                 start_frame: int = 0, end_frame: int = None):
+        super().__init__(cap, start_frame=start_frame, end_frame=end_frame)
+        fps = self.fps if self.fps > 0 else 25.0
+
+        # Gaps in frames between two samples: dense (budget) and idle
+        self.min_gap = max(1, math.ceil(fps / max_fps)) if max_fps else 1
+        self.idle_gap = max(self.min_gap, int(round(idle_s * fps)))
+        self.probe_stride = max(1, int(probe_stride))
+        self.probe_width = probe_width
+        self.pixel_delta = pixel_delta
+        self.motion_threshold = motion_threshold
+        self.motion_hold = int(round(motion_hold_s * fps))
+        self.match_hold = int(round(match_hold_s * fps))
+
+        self._previous_probe = None
+        self._active_until = -1
+        self.frames_probed = 0
+        self.active_probes = 0
+
+    @property
+    def frames_retrieved(self) -> int:
+        # Every sampled frame is a probe first
+        return self.frames_probed
+
+    def notify_match(self, frame_number: int):
+        self._active_until = max(self._active_until, frame_number + self.match_hold)
+
+    def _motion_score(self, frame) -> float:
+        """Fraction of pixels that changed since the previous probe, on a tiny blurred gray image."""
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.probe_width, max(1, int(h * self.probe_width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+
+        previous, self._previous_probe = self._previous_probe, gray
+        self.frames_probed += 1
+        if previous is None:
+            return 1.0
+        return float(np.count_nonzero(cv2.absdiff(gray, previous) > self.pixel_delta)) / gray.size
+
+    def __iter__(self):
+        cap = self.cap
+        self.position = self._seek(self.start_frame) if self.start_frame > 0 else 0
+        last_sample = None
+
+        while not self._past_end(self.position):
+            if not cap.grab():
+                return
+            frame_number = self.position
+            self.position += 1
+
+            if frame_number % self.probe_stride:
+                self.frames_grabbed += 1
+                continue
+
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+
+            if self._motion_score(frame) > self.motion_threshold:
+                self.active_probes += 1
+                self._active_until = max(self._active_until, frame_number + self.motion_hold)
+            active = frame_number <= self._active_until
+
+            # Onset of activity is sampled as soon as the budget allows, not at the next idle tick
+            if last_sample is not None and frame_number - last_sample < (self.min_gap if active else self.idle_gap):
+                continue
+
+            last_sample = frame_number
+            self.frames_decoded += 1
+            yield frame_number, cap.get(cv2.CAP_PROP_POS_MSEC), frame
@@ -0,0 +1,101 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+
+import cv2
+
+from ..config import IMAGE_WRITER_QUEUE_SIZE, IMAGE_WRITER_THREADS, MATCH_IMAGE_FORMAT, MATCH_IMAGE_QUALITY
+from .metrics import timed
+
+_ENCODE_PARAMS = {
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,
+    'webp': cv2.IMWRITE_WEBP_QUALITY,
+}
+
+
+class ImageWriter:
+    """
+    Bounded background pool that encodes and writes match crops.
+
+    submit() returns a Future that resolves to the number of bytes written once the file
+    is on disk (or raises if encoding/writing failed). When `queue_size` crops are already
+    waiting, submit() blocks, which throttles the producer instead of buffering unboundedly.
+    """
+
+    def __init__(self, workers: int = IMAGE_WRITER_THREADS, queue_size: int = IMAGE_WRITER_QUEUE_SIZE,
+                 image_format: str = MATCH_IMAGE_FORMAT, quality: int = MATCH_IMAGE_QUALITY):
+        image_format = image_format.lower().lstrip('.')
+        if image_format == 'jpeg':
+            image_format = 'jpg'
+        if image_format not in _ENCODE_PARAMS:
+            raise ValueError(f"Unsupported match image format: {image_format}")
+
+        self.image_format = image_format
+        self.encode_params = [_ENCODE_PARAMS[image_format], int(quality)]
+
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._counters = {"queued": 0, "written": 0, "failed": 0, "bytes_written": 0}
+
+        self._threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker, name=f"image-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def extension(self) -> str:
+        return f".{self.image_format}"
+
+    def submit(self, path: str, image) -> Future:
+        """Queues `image` (BGR ndarray) to be written to `path`."""
+        future = Future()
+        with self._lock:
+            self._counters["queued"] += 1
+        self._queue.put((path, image, future))
+        return future
+
+    def _worker(self):
+        while True:
+            path, image, future = self._queue.get()
+            try:
+                with timed('imwrite'):
+                    ok, buffer = cv2.imencode(self.extension, image, self.encode_params)
+                    if not ok:
+                        raise IOError(f"Could not encode {path}")
+                    with open(path, 'wb') as f:
+                        f.write(buffer.tobytes())
+                with self._lock:
+                    self._counters["written"] += 1
+                    self._counters["bytes_written"] += len(buffer)
+                future.set_result(len(buffer))
+            except Exception as e:
+                print(f"⚠️ Image write failed for {path}: {e}")
+                traceback.print_exc()
+                with self._lock:
+                    self._counters["failed"] += 1
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Queued (total submitted), written, failed counters, plus current queue depth."""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["in_queue"] = self._queue.qsize()
+        return counters
+
+
+_shared_writer = None
+_shared_lock = threading.Lock()
+
+
+def get_image_writer() -> ImageWriter:
+    """Process-wide writer shared by all jobs, so the thread and queue bounds are global."""
+    global _shared_writer
+    if _shared_writer is None:
+        with _shared_lock:
+            if _shared_writer is None:
+                _shared_writer = ImageWriter()
+    return _shared_writer
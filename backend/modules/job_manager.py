@@ -0,0 +1,221 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import (
+    DB_PATH, JOB_EVENT_BUFFER, JOB_HEARTBEAT_SECONDS, JOB_LEASE_SECONDS, MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS
+)
+
+# Job states persisted in the `jobs` table
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# Finished jobs kept in memory for late SSE subscribers; older ones are served from SQLite only
+MAX_FINISHED_JOBS_IN_MEMORY = 100
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting for a worker."""
+
+
+class Job:
+    """In-memory side of a job: a bounded, append-only event log that SSE clients follow."""
+
+    def __init__(self, job_id: str, kind: str, video_filename: str = None):
+        self.id = job_id
+        self.kind = kind
+        self.video_filename = video_filename
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+
+        self._events = deque(maxlen=JOB_EVENT_BUFFER)
+        self._next_index = 0
+        self._cond = threading.Condition()
+
+    def publish(self, event: dict):
+        """Appends an event (a dict from the generator protocol) and wakes subscribers."""
+        with self._cond:
+            self._events.append((self._next_index, event))
+            self._next_index += 1
+            self._cond.notify_all()
+
+    def finish(self, status: str, event: dict):
+        """Publishes the terminal event and flips the status atomically for subscribers."""
+        with self._cond:
+            self.status = status
+            self._events.append((self._next_index, event))
+            self._next_index += 1
+            self._cond.notify_all()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def iter_events(self, after: int = -1, heartbeat: float = 15.0):
+        """
+        Yields (index, event) pairs with index > `after` until the job finishes.
+        Yields (None, None) every `heartbeat` seconds of silence so callers can keep
+        the connection alive. Clients that fall behind the buffer skip ahead.
+        """
+        while True:
+            with self._cond:
+                pending = [(i, e) for i, e in self._events if i > after]
+                if not pending:
+                    if self.finished:
+                        return
+                    self._cond.wait(timeout=heartbeat)
+                    pending = [(i, e) for i, e in self._events if i > after]
+
+            if not pending:
+                yield None, None
+                continue
+
+            for index, event in pending:
+                after = index
+                yield index, event
+
+
+class JobManager:
+    """
+    Runs long video jobs on a bounded worker pool and persists their state in SQLite.
+    Progress is streamed to clients through each Job's event log.
+
+    Several server processes may share the database (gunicorn workers, the debug reloader).
+    Each job row records its owner ("host:pid"), which keeps a lease on its unfinished jobs
+    alive with a heartbeat; only jobs whose lease expired are failed as interrupted.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_JOBS, max_queued: int = MAX_QUEUED_JOBS):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        # A reused pid: rows under our own name are left from an earlier process
+        self._fail_stale_jobs(include_own=True)
+        threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True).start()
+
+    # --- Persistence ---
+
+    def _execute(self, query: str, params: tuple = ()):
+        conn = None
+        try:
+            conn = sqlite3.connect(DB_PATH)
+            conn.execute(query, params)
+            conn.commit()
+        except Exception as db_err:
+            print(f"⚠️ Job state update failed: {db_err}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _fail_stale_jobs(self, include_own: bool = False):
+        """Jobs left queued/running by a server process that stopped heartbeating will never finish."""
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP "
+            "WHERE status IN (?, ?) AND (owner IS NULL OR heartbeat_at IS NULL OR heartbeat_at < datetime('now', ?) "
+            "OR (? AND owner = ?))",
+            (FAILED, "Interrupted by server restart.", QUEUED, RUNNING, f"-{JOB_LEASE_SECONDS} seconds",
+             int(include_own), self.owner)
+        )
+
+    def _heartbeat_loop(self):
+        """Renews the lease of this process's unfinished jobs and fails the jobs of dead processes."""
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            self._execute(
+                "UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE owner = ? AND status IN (?, ?)",
+                (self.owner, QUEUED, RUNNING)
+            )
+            self._fail_stale_jobs()
+
+    def _set_status(self, job: Job, status: str):
+        """Persists a state change. Terminal states are mirrored in memory by Job.finish()."""
+        if status == RUNNING:
+            job.status = status
+            self._execute("UPDATE jobs SET status = ?, started_at = CURRENT_TIMESTAMP WHERE id = ?", (status, job.id))
+        else:
+            self._execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (status, json.dumps(job.result) if job.result is not None else None, job.error, job.id)
+            )
+
+    # --- Public API ---
+
+    def active_count(self) -> int:
+        """Number of jobs queued or running in this process."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, kind: str, fn, *args, video_filename: str = None) -> Job:
+        """
+        Queues `fn(job, *args)`. The function publishes generator events via job.publish()
+        and returns a JSON-serializable result dict; raising marks the job as failed.
+        """
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs already waiting.")
+
+            self._prune_finished()
+            job = Job(uuid.uuid4().hex, kind, video_filename)
+            self._jobs[job.id] = job
+
+        self._execute(
+            "INSERT INTO jobs (id, kind, video_filename, status, owner, heartbeat_at) "
+            "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            (job.id, kind, video_filename, QUEUED, self.owner)
+        )
+        self._executor.submit(self._run, job, fn, args)
+        print(f"📥 Job queued: {job.id} ({kind})")
+        return job
+
+    def _prune_finished(self):
+        """Drops the oldest finished jobs from memory (caller holds self._lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS_IN_MEMORY)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job, fn, args):
+        self._set_status(job, RUNNING)
+        try:
+            job.result = fn(job, *args)
+            status = DONE
+            final_event = {"status": "done", "job_id": job.id, "result": job.result}
+            print(f"✅ Job done: {job.id}")
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            status = FAILED
+            final_event = {"status": "failed", "job_id": job.id, "message": job.error}
+            print(f"🔴 Job failed: {job.id}: {e}")
+
+        self._set_status(job, status)
+        job.finish(status, final_event)
+
+    def get_job(self, job_id: str):
+        """The live Job object, if this process is (or was) running it."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_record(self, job_id: str):
+        """Persisted job state as a dict, or None if unknown."""
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        record = dict(row)
+        record['result'] = json.loads(record['result']) if record['result'] else None
+        return record
@@ -0,0 +1,423 @@
+import threading
+import time
+from collections import deque
+from functools import partial
+
+import cv2
+import numpy as np
+
+from ..config import LIVE_JPEG_QUALITY, LIVE_SLOW_CLIENT_SECONDS, LIVE_SOURCE, LIVE_STATS_LOG_SECONDS
+
+
+def parse_source(source):
+    """'0' -> camera index 0; anything else is treated as a file path / URL."""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+class LatestSlot:
+    """
+    Single-item handoff between threads where the newest item always wins.
+    A slow consumer never sees a backlog: it skips straight to the most recent item.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, after_seq: int = 0, timeout: float = 1.0):
+        """Waits for an item newer than `after_seq`. Returns (seq, item), or (after_seq, None) on timeout/close."""
+        with self._cond:
+            if self._seq <= after_seq and not self._closed:
+                self._cond.wait(timeout=timeout)
+            if self._seq <= after_seq:
+                return after_seq, None
+            return self._seq, self._item
+
+    def peek(self):
+        with self._cond:
+            return self._item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StageStats:
+    """Rolling latency (ms) and throughput (per second) of one pipeline stage."""
+
+    def __init__(self, window: int = 120):
+        self._samples = deque(maxlen=window)  # (finished_at, latency_ms)
+        self._lock = threading.Lock()
+
+    def record(self, started_at: float):
+        now = time.perf_counter()
+        with self._lock:
+            self._samples.append((now, (now - started_at) * 1000.0))
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"fps": 0.0, "mean_ms": 0.0, "p95_ms": 0.0}
+        latencies = np.array([lat for _, lat in samples])
+        span = samples[-1][0] - samples[0][0]
+        return {
+            "fps": round((len(samples) - 1) / span, 2) if span > 0 else 0.0,
+            "mean_ms": round(float(latencies.mean()), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        }
+
+
+class LiveSubscriber:
+    """One viewer of a channel. Reads the channel's latest JPEG, skipping frames it was too slow for."""
+
+    def __init__(self, channel, on_close=None):
+        self.channel = channel
+        self.on_close = on_close
+        self.last_read = time.monotonic()
+        self.closed = False
+        self.dropped = False
+
+    def jpeg_frames(self):
+        seq = 0
+        try:
+            while not self.closed:
+                seq, jpeg = self.channel.slot.get(after_seq=seq)
+                if jpeg is None:
+                    if self.channel.slot.closed:
+                        return
+                    continue
+                self.last_read = time.monotonic()
+                yield jpeg
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.on_close is not None:
+            self.on_close(self)
+
+
+class LiveChannel:
+    """
+    Frames annotated for one reference embedding (one live session). Every viewer of the
+    session shares the channel, so drawing and JPEG encoding happen once per session, not per viewer.
+    """
+
+    def __init__(self, key, reference_embedding: np.ndarray):
+        self.key = key
+        self.reference_embedding = reference_embedding
+        self.slot = LatestSlot()
+        self.subscribers = set()
+        self.last_published = time.monotonic()
+
+
+class LiveStreamPipeline:
+    """
+    Three-stage live producer for one source: capture -> inference -> draw+encode, each on its
+    own thread and joined by latest-frame-wins slots.
+
+    Capture runs at camera (or file) FPS and always publishes the newest frame. Inference
+    takes whatever frame is newest when it becomes free, so it runs as fast as the models
+    allow without falling behind. The encode stage draws the most recent inference results
+    on every fresh frame, once per channel, so every viewer's stream keeps camera FPS.
+    Faces are detected and embedded once; only the cheap match against each session's
+    reference is repeated per channel.
+    """
+
+    def __init__(self, processor, source=LIVE_SOURCE, jpeg_quality: int = LIVE_JPEG_QUALITY,
+                 loop_file: bool = False, slow_client_seconds: float = LIVE_SLOW_CLIENT_SECONDS):
+        self.processor = processor
+        self.source = parse_source(source)
+        self.is_file = not isinstance(self.source, int)
+        self.loop_file = loop_file
+        self.slow_client_seconds = slow_client_seconds
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+
+        self.frames_slot = LatestSlot()  # (frame, captured_at)
+        self.faces_slot = LatestSlot()   # [(box, embedding), ...] of the latest inferred frame
+
+        self.channels = {}
+        self._channels_lock = threading.Lock()
+        self.dropped_subscribers = 0
+
+        self.stats = {name: StageStats() for name in ('capture', 'infer', 'encode')}
+        # Age of the frame the current boxes were computed on, when they were published
+        self.overlay_age = StageStats()
+
+        self._stop = threading.Event()
+        self._threads = []
+        self.cap = None
+
+    # --- Lifecycle ---
+
+    def start(self) -> bool:
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            print(f"🔴 ERROR: Could not open live source {self.source!r}.")
+            return False
+        # Keep the driver queue short so captured frames are fresh (ignored by backends without it)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        for name, target in (('capture', self._capture_loop), ('infer', self._infer_loop), ('encode', self._encode_loop)):
+            thread = threading.Thread(target=target, name=f"live-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"▶️ Live pipeline started on {self.source!r}.")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self.frames_slot.close()
+        self.faces_slot.close()
+        with self._channels_lock:
+            channels = list(self.channels.values())
+        for channel in channels:
+            channel.slot.close()
+
+        current = threading.current_thread()
+        for thread in self._threads:
+            if thread is not current:
+                thread.join(timeout=2.0)
+        if self.cap is not None:
+            self.cap.release()
+        print(f"⏸️ Live pipeline stopped on {self.source!r}. Stage stats: {self.summary()}")
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    # --- Subscribers ---
+
+    def subscribe(self, key, reference_embedding: np.ndarray, on_close=None) -> LiveSubscriber:
+        """Adds a viewer to the channel `key`, creating the channel on first use."""
+        with self._channels_lock:
+            channel = self.channels.get(key)
+            if channel is None:
+                channel = self.channels[key] = LiveChannel(key, reference_embedding)
+            subscriber = LiveSubscriber(channel, on_close=on_close)
+            channel.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber) -> int:
+        """Removes a viewer (and its channel once empty). Returns the number of viewers left."""
+        with self._channels_lock:
+            channel = subscriber.channel
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers and self.channels.get(channel.key) is channel:
+                del self.channels[channel.key]
+                channel.slot.close()
+            return self._subscriber_count_locked()
+
+    def _subscriber_count_locked(self) -> int:
+        return sum(len(channel.subscribers) for channel in self.channels.values())
+
+    def subscriber_count(self) -> int:
+        with self._channels_lock:
+            return self._subscriber_count_locked()
+
+    def channel_subscribers(self, key) -> list:
+        with self._channels_lock:
+            channel = self.channels.get(key)
+            return list(channel.subscribers) if channel is not None else []
+
+    def _drop_slow_subscribers(self, channels):
+        """Viewers that took nothing while their channel kept publishing are cut loose."""
+        slow = []
+        for channel in channels:
+            cutoff = channel.last_published - self.slow_client_seconds
+            slow.extend(sub for sub in list(channel.subscribers) if not sub.closed and sub.last_read < cutoff)
+        for subscriber in slow:
+            subscriber.dropped = True
+            self.dropped_subscribers += 1
+            print(f"🐢 Dropping slow live viewer on channel {subscriber.channel.key}.")
+            subscriber.close()
+
+    # --- Stages ---
+
+    def _capture_loop(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_interval = 1.0 / fps if self.is_file and fps > 0 else 0.0
+        next_due = time.perf_counter()
+
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                if self.is_file and self.loop_file:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            self.stats['capture'].record(started)
+            self.frames_slot.put((frame, started))
+
+            # A file has no shutter: pace it at its native FPS to behave like a camera
+            if frame_interval:
+                next_due += frame_interval
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.perf_counter()
+
+        # End of source: let the downstream stages drain and finish
+        self._stop.set()
+        self.frames_slot.close()
+
+    def _infer_loop(self):
+        seq = 0
+        while not self._stop.is_set():
+            seq, item = self.frames_slot.get(after_seq=seq)
+            if item is None:
+                continue
+            frame, captured_at = item
+
+            started = time.perf_counter()
+            faces = [(face_data['box'], face_data['embedding'])
+                     for face_data in self.processor.pipeline.process_frame(frame)]
+            self.stats['infer'].record(started)
+            self.overlay_age.record(captured_at)
+            self.faces_slot.put(faces)
+
+    def _overlays(self, faces, reference_embedding):
+        overlays = []
+        for box, embedding in faces:
+            similarity, is_match = self.processor.matcher.match(embedding, reference_embedding)
+            if is_match:
+                color = (0, 255, 0)  # Green BGR for Match
+                text = f"MATCH: {similarity:.2f}"
+            else:
+                color = (0, 0, 255)  # Red BGR for No Match
+                text = f"SIM: {similarity:.2f}"
+            overlays.append((box, color, text))
+        return overlays
+
+    def _encode_loop(self):
+        seq = 0
+        last_log = time.monotonic()
+        while not self._stop.is_set():
+            seq, item = self.frames_slot.get(after_seq=seq)
+            if item is None:
+                continue
+            frame, _ = item
+            faces = self.faces_slot.peek() or []
+
+            with self._channels_lock:
+                channels = list(self.channels.values())
+
+            for channel in channels:
+                started = time.perf_counter()
+                # Never draw on the captured frame itself: the inference thread may be reading it
+                canvas = frame.copy()
+                for (x1, y1, x2, y2), color, text in self._overlays(faces, channel.reference_embedding):
+                    cv2.rectangle(canvas, (x1, y1), (x2, y2), color, 2)
+                    cv2.putText(canvas, text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+                ret, buffer = cv2.imencode('.jpg', canvas, self.encode_params)
+                if not ret:
+                    continue
+                self.stats['encode'].record(started)
+                channel.slot.put(buffer.tobytes())
+                channel.last_published = time.monotonic()
+
+            self._drop_slow_subscribers(channels)
+
+            if LIVE_STATS_LOG_SECONDS and time.monotonic() - last_log >= LIVE_STATS_LOG_SECONDS:
+                last_log = time.monotonic()
+                print(f"📊 Live pipeline {self.source!r}: {self.summary()}")
+
+        with self._channels_lock:
+            channels = list(self.channels.values())
+        for channel in channels:
+            channel.slot.close()
+
+    def summary(self) -> dict:
+        """Per-stage latency/FPS plus how stale the drawn boxes are relative to capture."""
+        summary = {name: stats.summary() for name, stats in self.stats.items()}
+        summary['overlay_age'] = self.overlay_age.summary()
+        return summary
+
+
+class LiveStreamHub:
+    """
+    One LiveStreamPipeline per source, shared by every viewer of that source.
+    Producers are reference-counted: the first viewer starts one, the last one to leave
+    (disconnect, session close or slow-client drop) stops it and frees the camera.
+    """
+
+    def __init__(self, processor_factory):
+        self.processor_factory = processor_factory
+        self.producers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key, reference_embedding: np.ndarray, source=LIVE_SOURCE):
+        """Returns a LiveSubscriber for channel `key` on `source`, or None if the source cannot be opened."""
+        source = parse_source(source)
+        stale = None
+        with self._lock:
+            producer = self.producers.get(source)
+            if producer is not None and not producer.running:
+                # The source ended (e.g. a file stand-in ran out); start over
+                stale = self.producers.pop(source)
+                producer = None
+            if producer is None:
+                producer = LiveStreamPipeline(self.processor_factory(), source=source)
+                if not producer.start():
+                    return None
+                self.producers[source] = producer
+            subscriber = producer.subscribe(key, reference_embedding, on_close=partial(self._release, source, producer))
+        if stale is not None:
+            stale.stop()
+        print(f"👀 Live viewer joined {source!r} (viewers: {producer.subscriber_count()}).")
+        return subscriber
+
+    def _release(self, source, producer: LiveStreamPipeline, subscriber: LiveSubscriber):
+        to_stop = None
+        with self._lock:
+            remaining = producer.unsubscribe(subscriber)
+            # The producer may already have been replaced after its source ended
+            if remaining == 0 and self.producers.get(source) is producer:
+                to_stop = self.producers.pop(source)
+        print(f"👋 Live viewer left {source!r} (viewers: {remaining}).")
+        # Stopping joins the worker threads; never do that while holding the hub lock
+        if to_stop is not None:
+            to_stop.stop()
+
+    def close_channel(self, key) -> int:
+        """Disconnects every viewer of channel `key` (e.g. when its session is closed). Returns how many."""
+        with self._lock:
+            producers = list(self.producers.values())
+        subscribers = [sub for producer in producers for sub in producer.channel_subscribers(key)]
+        for subscriber in subscribers:
+            subscriber.close()
+        return len(subscribers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            producers = list(self.producers.items())
+        return {
+            str(source): {
+                "viewers": producer.subscriber_count(),
+                "channels": len(producer.channels),
+                "dropped_viewers": producer.dropped_subscribers,
+                "stages": producer.summary(),
+            }
+            for source, producer in producers
+        }
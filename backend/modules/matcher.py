@@ -1,4 +1,8 @@
+import hashlib
+
 import numpy as np
+
+from ..config import ANN_TOP_K
 # Removed: from sklearn.metrics.pairwise import cosine_similarity
 
 class Matcher:
@@ -40,6 +44,139 @@ class Matcher:
         
         return similarity, is_match
 
+
+class GalleryMatcher:
+    """
+    Matches many face embeddings against many reference identities at once.
+
+    Holds an (M x 512) float32 matrix of L2-normalized reference embeddings, one row per
+    enrolled face, so scoring every face of a frame against the gallery is one matrix multiply.
+    Several rows may share an identity; results are aggregated per identity.
+
+    For very large galleries, build it with from_index(): scoring then goes through an
+    approximate IVF index (see ann_index.py) instead of the dense product.
+    """
+
+    def __init__(self, identities: list, embeddings: np.ndarray, threshold: float = Matcher.DEFAULT_THRESHOLD):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(identities), -1)
+        if len(identities) != embeddings.shape[0]:
+            raise ValueError("GalleryMatcher needs exactly one embedding per identity.")
+
+        # Re-normalize defensively; a dot product is only a cosine for unit vectors
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        self.labels = list(identities)
+        self.identities = list(dict.fromkeys(self.labels))
+        self.matrix = np.ascontiguousarray(embeddings / norms)
+        self.threshold = threshold
+        self.index = None
+        self.candidates = ANN_TOP_K
+
+    @classmethod
+    def from_dict(cls, reference_embeddings: dict, threshold: float = Matcher.DEFAULT_THRESHOLD):
+        """Builds a gallery from {identity: embedding}."""
+        identities = list(reference_embeddings.keys())
+        matrix = np.stack([np.asarray(reference_embeddings[i]).flatten() for i in identities]) if identities else np.zeros((0, 512))
+        return cls(identities, matrix, threshold=threshold)
+
+    @classmethod
+    def from_index(cls, index, threshold: float = Matcher.DEFAULT_THRESHOLD, candidates: int = ANN_TOP_K):
+        """Builds a gallery backed by an IVFIndex; each face retrieves `candidates` neighbours."""
+        gallery = cls.__new__(cls)
+        gallery.labels = index.labels
+        gallery.identities = list(dict.fromkeys(index.labels))
+        gallery.matrix = None
+        gallery.threshold = threshold
+        gallery.index = index
+        gallery.candidates = candidates
+        return gallery
+
+    def __len__(self):
+        return len(self.identities)
+
+    def fingerprint(self) -> str:
+        """Content hash of the gallery (labels + vectors, or the index's ids for index-backed galleries)."""
+        digest = hashlib.sha256()
+        digest.update("\x1f".join(map(str, self.labels)).encode('utf-8'))
+        digest.update(str(self.threshold).encode('utf-8'))
+        if self.index is not None:
+            digest.update(np.ascontiguousarray(self.index.ids).tobytes())
+            digest.update(np.ascontiguousarray(self.index.delta_ids).tobytes())
+        else:
+            # Rounded so float noise in re-computed references does not break resumption
+            digest.update(np.round(self.matrix, 4).astype(np.float32).tobytes())
+        return digest.hexdigest()
+
+    def score(self, face_embeddings: np.ndarray) -> np.ndarray:
+        """(N x 512) face embeddings -> (N x M) cosine similarity matrix (dense galleries only)."""
+        if self.matrix is None:
+            raise RuntimeError("score() is not available for an index-backed gallery.")
+        faces = np.asarray(face_embeddings, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        return np.clip(faces @ self.matrix.T, -1.0, 1.0)
+
+    def _face_hits(self, face_embeddings: np.ndarray, k: int):
+        """Per face, {identity: best similarity} over (at least) its k best gallery rows."""
+        if self.index is not None:
+            rows = self.index.search_labels(face_embeddings, k=max(k, self.candidates))
+        else:
+            scores = self.score(face_embeddings)
+            k = min(k, scores.shape[1])
+            if k == 0:
+                return [{} for _ in range(scores.shape[0])]
+            # argpartition finds the k best in O(M); only those k are then sorted
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            rows = [[(self.labels[j], float(scores[i, j])) for j in top[i]] for i in range(len(top))]
+
+        hits = []
+        for row in rows:
+            best = {}
+            for identity, similarity in row:
+                if similarity > best.get(identity, -1.0):
+                    best[identity] = min(similarity, 1.0)
+            hits.append(best)
+        return hits
+
+    def top_k(self, face_embeddings: np.ndarray, k: int = 1):
+        """
+        Per-face top-k identities.
+        Returns: list (one per face) of [(identity, similarity, is_match), ...] sorted best first.
+        """
+        # With several rows per identity, look at every row so the k identities are exact
+        rows_k = k if self.index is not None or len(self.labels) == len(self.identities) else len(self.labels)
+
+        results = []
+        for best in self._face_hits(face_embeddings, rows_k):
+            ordered = sorted(best.items(), key=lambda item: -item[1])[:k]
+            results.append([(identity, similarity, similarity >= self.threshold) for identity, similarity in ordered])
+        return results
+
+    def best_face_per_identity(self, face_embeddings: np.ndarray):
+        """
+        For every identity, the best-scoring face in the batch, if it clears the threshold.
+        Returns: list of (identity, face_index, similarity).
+        """
+        if self.index is None:
+            scores = self.score(face_embeddings)
+            if scores.size == 0:
+                return []
+            # Best face per gallery row, then keep only rows that clear the threshold
+            best_faces = scores.argmax(axis=0)
+            best_scores = scores[best_faces, np.arange(scores.shape[1])]
+            candidates = [(self.labels[j], int(best_faces[j]), float(best_scores[j]))
+                          for j in np.flatnonzero(best_scores >= self.threshold)]
+        else:
+            candidates = [(identity, i, similarity)
+                          for i, best in enumerate(self._face_hits(face_embeddings, self.candidates))
+                          for identity, similarity in best.items() if similarity >= self.threshold]
+
+        # Several gallery rows (or faces) can share an identity: keep the best per identity
+        best = {}
+        for identity, face_index, similarity in candidates:
+            if identity not in best or similarity > best[identity][2]:
+                best[identity] = (identity, face_index, similarity)
+        return list(best.values())
+
 # -------------------------------------------------------------
 # NOTE: Update the initialization of your Matcher in config.py or app.py
 # Example: 
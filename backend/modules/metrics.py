@@ -0,0 +1,272 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from ..config import METRICS_BUCKETS, METRICS_ENABLED
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self._header()
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(list(zip(self.label_names, key)))} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        super().__init__(name, help_text, labels)
+        if not self.label_names:
+            # Unlabelled counters are exported (as 0) before their first increment
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets=METRICS_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self._header()
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total, count) in values:
+            pairs = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics, rendered as Prometheus text by /api/metrics.
+
+    Collectors are callables run at scrape time that return [(gauge, labels, value), ...]
+    for values that are cheaper to read on demand (queue depths, live FPS) than to push.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets=METRICS_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector, gauges: tuple):
+        """Registers `collector` as the only source of `gauges`."""
+        with self._lock:
+            self._collectors.append((collector, tuple(gauges)))
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector, gauges in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+            # Collected gauges are replaced wholesale, so series of stopped sources disappear
+            for gauge in gauges:
+                gauge.clear()
+            for gauge, labels, value in samples:
+                gauge.set(value, **labels)
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'pipeline_stage_seconds', "Time spent per call of each pipeline stage.", ('stage',))
+FRAMES_DECODED = REGISTRY.counter(
+    'pipeline_frames_decoded_total', "Video frames fully decoded (sampled frames plus motion probes).")
+FRAMES_SAMPLED = REGISTRY.counter(
+    'pipeline_frames_sampled_total', "Sampled video frames sent to inference.")
+FACES_DETECTED = REGISTRY.counter(
+    'pipeline_faces_detected_total', "Faces found by the detector.")
+EMBEDDINGS_COMPUTED = REGISTRY.counter(
+    'pipeline_embeddings_computed_total', "Faces run through the embedder.")
+MATCHES = REGISTRY.counter(
+    'pipeline_matches_total', "Matches logged to the detections table.")
+LIVE_FRAMES_SERVED = REGISTRY.counter(
+    'live_frames_served_total', "MJPEG frames sent to live viewers.")
+LIVE_STAGE_FPS = REGISTRY.gauge(
+    'live_stage_fps', "Rolling throughput of each live pipeline stage.", ('source', 'stage'))
+LIVE_STAGE_LATENCY = REGISTRY.gauge(
+    'live_stage_latency_ms', "Rolling mean latency of each live pipeline stage.", ('source', 'stage'))
+LIVE_VIEWERS = REGISTRY.gauge(
+    'live_viewers', "Viewers connected to each live source.", ('source',))
+
+
+class JobTimings:
+    """Per-stage call counts and total seconds of one job, for its `completed` event."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage: str, seconds: float):
+        entry = self.stages.setdefault(stage, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def merge(self, stages: dict):
+        """Adds another job's `stages` ({stage: [calls, seconds]}, e.g. from a worker process)."""
+        for stage, (calls, total) in stages.items():
+            entry = self.stages.setdefault(stage, [0, 0.0])
+            entry[0] += calls
+            entry[1] += total
+
+    def summary(self) -> dict:
+        return {
+            "wall_s": round(time.perf_counter() - self.started, 3),
+            "stages": {
+                stage: {"calls": calls, "total_s": round(total, 3), "mean_ms": round(total / calls * 1000, 2)}
+                for stage, (calls, total) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            },
+        }
+
+
+_local = threading.local()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Records one call of `stage` in the histogram and in the job timings active on this thread."""
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+class timed:
+    """
+    Times the enclosed block as one call of `stage`. A plain class rather than a
+    @contextmanager, which costs a generator per call; this wraps per-frame work.
+    """
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = None
+
+    def __enter__(self):
+        if METRICS_ENABLED:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.started is not None:
+            observe_stage(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+@contextmanager
+def job_timings():
+    """
+    Collects the stages timed on this thread into a JobTimings while the block runs.
+    Work done on other threads (background image writes) only reaches the histograms.
+    """
+    previous = getattr(_local, 'timings', None)
+    _local.timings = timings = JobTimings()
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+def render() -> str:
+    return REGISTRY.render()
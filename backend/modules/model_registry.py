@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from ..config import ANN_DELTA_MAX, ANN_INDEX_PATH
+from .ann_index import IVFIndex
+from .face_recognition_pipeline import FaceRecognitionPipeline
+from .video_processor import VideoProcessor
+
+# --- PROCESS-WIDE MODEL REGISTRY ---
+# One FaceRecognitionPipeline per process, shared by every route. Inference only reads
+# the model weights (eval mode, no_grad), so concurrent requests can use it safely.
+
+_lock = threading.Lock()
+_pipeline = None
+_stats = {"load_seconds": None, "warmup_seconds": None}
+
+# Enrolled-face gallery (IVF index), memory-mapped from ANN_INDEX_PATH on first use
+_gallery_lock = threading.Lock()
+_gallery_index = None
+
+
+def get_pipeline() -> FaceRecognitionPipeline:
+    """Returns the shared pipeline, loading the models on first use."""
+    global _pipeline
+    if _pipeline is None:
+        with _lock:
+            if _pipeline is None:
+                start = time.perf_counter()
+                pipeline = FaceRecognitionPipeline()
+                _stats["load_seconds"] = round(time.perf_counter() - start, 3)
+                _pipeline = pipeline
+                print(f"📦 Model registry: pipeline loaded in {_stats['load_seconds']}s. "
+                      f"Params: {_model_bytes(pipeline) / 1e6:.1f} MB")
+    return _pipeline
+
+
+def get_processor(**kwargs) -> VideoProcessor:
+    """A VideoProcessor bound to the shared pipeline (cheap to create per request)."""
+    return VideoProcessor(pipeline=get_pipeline(), **kwargs)
+
+
+def warm_up(height: int = 480, width: int = 640):
+    """Runs one inference on a dummy frame so lazy allocations happen before the first request."""
+    pipeline = get_pipeline()
+    dummy = np.zeros((height, width, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    pipeline.process_frame(dummy)
+    _stats["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    print(f"🔥 Model registry: warm-up inference took {_stats['warmup_seconds']}s.")
+
+
+def preload_models(warmup: bool = True):
+    """Eagerly loads (and optionally warms up) the shared pipeline, e.g. at server start."""
+    get_pipeline()
+    if warmup:
+        warm_up()
+
+
+def _load_gallery_index():
+    """Loads the saved index on first use. The caller holds _gallery_lock."""
+    global _gallery_index
+    if _gallery_index is None and os.path.isdir(ANN_INDEX_PATH):
+        _gallery_index = IVFIndex.load(ANN_INDEX_PATH, mmap=True)
+        print(f"📦 Model registry: gallery index loaded ({len(_gallery_index)} faces, {_gallery_index.nlist} cells).")
+    return _gallery_index
+
+
+def get_gallery_index():
+    """
+    The enrolled-face IVF index, or None if nothing has been enrolled yet. The returned
+    index is never modified afterwards: enrollments publish a new one.
+    """
+    if _gallery_index is None and os.path.isdir(ANN_INDEX_PATH):
+        with _gallery_lock:
+            _load_gallery_index()
+    return _gallery_index
+
+
+def enroll_identity(identity: str, embedding: np.ndarray) -> int:
+    """
+    Adds one reference embedding to the enrolled gallery and persists it.
+    Small updates only rewrite the delta files; once ANN_DELTA_MAX enrollments have
+    accumulated, the index is retrained and rewritten in full. Returns the gallery size.
+    """
+    global _gallery_index
+    with _gallery_lock:
+        index = _load_gallery_index()
+        if index is None:
+            index = IVFIndex.build(embedding.reshape(1, -1), [identity], nlist=1)
+            index.save(ANN_INDEX_PATH)
+        else:
+            # Copy-on-write: running jobs keep searching the snapshot their gallery was built from
+            index = index.copy()
+            index.add(embedding.reshape(1, -1), [identity])
+            if len(index.delta_ids) >= ANN_DELTA_MAX:
+                index = index.rebuilt()
+                index.save(ANN_INDEX_PATH)
+            else:
+                index.save_delta(ANN_INDEX_PATH)
+        _gallery_index = index
+    return len(index)
+
+
+def _model_bytes(pipeline) -> int:
+    """Bytes held by the parameters and buffers of MTCNN and FaceNet."""
+    total = 0
+    for module in (pipeline.mtcnn, pipeline.embedder):
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _process_rss_bytes():
+    """Current resident set size of this process (Linux), falling back to the peak RSS."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def status() -> dict:
+    """Load state and memory usage of the shared models."""
+    rss = _process_rss_bytes()
+    info = {
+        "loaded": _pipeline is not None,
+        "device": str(_pipeline.device) if _pipeline is not None else None,
+        "embedder_backend": _pipeline.embed_backend.name if _pipeline is not None else None,
+        "load_seconds": _stats["load_seconds"],
+        "warmup_seconds": _stats["warmup_seconds"],
+        "model_memory_mb": round(_model_bytes(_pipeline) / 1e6, 1) if _pipeline is not None else 0.0,
+        "process_rss_mb": round(rss / 1e6, 1) if rss else None,
+        "gallery_faces": len(_gallery_index) if _gallery_index is not None else 0,
+        "reference_cache": _pipeline.reference_cache.stats() if _pipeline is not None else None,
+    }
+    return info
@@ -0,0 +1,86 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import REPORT_BUILDER_THREADS, REPORT_PREBUILD_FORMATS
+from .report_generator import ReportGenerator
+
+
+class ReportBuilder:
+    """
+    Builds reports lazily: on the first download (build()) or on a background worker
+    (prebuild()), never inline in a request that does not need them.
+
+    A report is built by at most one thread at a time; concurrent requests for the same
+    name wait for that build and then get the cached file.
+    """
+
+    def __init__(self, generator: ReportGenerator = None, workers: int = REPORT_BUILDER_THREADS,
+                 prebuild_formats=REPORT_PREBUILD_FORMATS):
+        self.generator = generator or ReportGenerator()
+        self.prebuild_formats = tuple(prebuild_formats)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='report-builder')
+        self._lock = threading.Lock()
+        self._name_locks = {}
+        self._building = set()
+
+    def _name_lock(self, report_name: str) -> threading.Lock:
+        with self._lock:
+            return self._name_locks.setdefault(report_name, threading.Lock())
+
+    def build(self, report_name: str):
+        """Path of the up-to-date report (building it if needed), or None if unknown / no data."""
+        with self._name_lock(report_name):
+            with self._lock:
+                self._building.add(report_name)
+            try:
+                return self.generator.generate(report_name)
+            finally:
+                with self._lock:
+                    self._building.discard(report_name)
+
+    def _build_quietly(self, report_name: str):
+        try:
+            self.build(report_name)
+        except Exception as e:
+            print(f"⚠️ Background report build failed for {report_name}: {e}")
+            traceback.print_exc()
+
+    def prebuild(self, report_urls: dict):
+        """Queues the REPORT_PREBUILD_FORMATS entries of a {format: name} dict on the worker."""
+        for fmt, report_name in report_urls.items():
+            if report_name and fmt in self.prebuild_formats:
+                self._executor.submit(self._build_quietly, report_name)
+
+    def register_video(self, video_filename: str) -> dict:
+        """Makes a video's report names downloadable and queues the pre-built formats."""
+        report_urls = self.generator.register_video(video_filename)
+        self.prebuild(report_urls)
+        return report_urls
+
+    def register_batch(self, batch_id: str) -> dict:
+        report_urls = self.generator.register_batch(batch_id)
+        self.prebuild(report_urls)
+        return report_urls
+
+    def status(self, report_name: str) -> dict:
+        """ReportGenerator.status(), with state 'building' while a build is in progress."""
+        status = self.generator.status(report_name)
+        with self._lock:
+            if report_name in self._building:
+                status["state"] = "building"
+        return status
+
+
+_shared_builder = None
+_shared_lock = threading.Lock()
+
+
+def get_report_builder() -> ReportBuilder:
+    """Process-wide builder, shared by the API and batch runs."""
+    global _shared_builder
+    if _shared_builder is None:
+        with _shared_lock:
+            if _shared_builder is None:
+                _shared_builder = ReportBuilder()
+    return _shared_builder
@@ -1,140 +1,402 @@
-import pandas as pd
+import csv
 import sqlite3
+from collections import OrderedDict
+
+import cv2
 from fpdf import FPDF
-from ..config import DB_PATH, REPORTS_FOLDER, MATCHES_FOLDER
+from ..config import (
+    DB_PATH, MATCHES_FOLDER, REPORT_CHUNK_ROWS, REPORT_FORMAT_VERSION, REPORT_PDF_MAX_PREVIEWS, REPORT_THUMBNAIL_FOLDER,
+    REPORT_THUMBNAIL_PX, REPORT_THUMBNAIL_QUALITY, REPORTS_FOLDER
+)
 import os
 
+# Columns of the per-video CSV, in order (also the SELECT list of every per-video query)
+VIDEO_COLUMNS = ['frame_number', 'end_frame_number', 'identity', 'timestamp', 'end_timestamp', 'similarity',
+                 'match_image_path']
+BATCH_COLUMNS = ['video_path', 'video_filename'] + VIDEO_COLUMNS
+# Restricts `detections d` to the rows a report of each kind is built from
+SOURCE_FILTERS = {
+    'video': "WHERE d.video_filename = ?",
+    'batch': "JOIN batch_videos b ON b.video_filename = d.video_filename WHERE b.batch_id = ?",
+}
+
+
+class _PagedPDF(FPDF):
+    """FPDF with a 'Page n/N' footer."""
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Helvetica", "I", 8)
+        self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", align='C')
+
+
 class ReportGenerator:
-    """Generates CSV and PDF reports from database detection logs."""
+    """
+    Generates CSV and PDF reports from database detection logs.
 
-    def _fetch_data(self, video_filename: str):
-        """Fetches all detections for a specific video."""
-        conn = None
+    Rows are streamed from a SQLite cursor in REPORT_CHUNK_ROWS chunks and written as they
+    arrive, so memory stays flat however many matches a video has. Every report is cached
+    with the detections state it was built from (row count + newest row id) and is only
+    rebuilt once new detections arrive for its video or batch.
+
+    Reports are addressed by file name: register_video()/register_batch() record which
+    video or batch a name is built from, so generate(name) can build it on demand.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, reports_folder: str = REPORTS_FOLDER,
+                 matches_folder: str = MATCHES_FOLDER, thumbnail_folder: str = REPORT_THUMBNAIL_FOLDER):
+        self.db_path = db_path
+        self.reports_folder = reports_folder
+        self.matches_folder = matches_folder
+        self.thumbnail_folder = thumbnail_folder
+
+    # --- Streaming + caching helpers ---
+
+    def _iter_rows(self, query: str, params: tuple):
+        """Yields the rows of `query`, fetched REPORT_CHUNK_ROWS at a time."""
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(DB_PATH)
-            query = "SELECT frame_number, timestamp, similarity, match_image_path FROM detections WHERE video_filename = ? ORDER BY frame_number"
-            df = pd.read_sql_query(query, conn, params=(video_filename,))
-            return df
+            cursor = conn.execute(query, params)
+            while True:
+                chunk = cursor.fetchmany(REPORT_CHUNK_ROWS)
+                if not chunk:
+                    break
+                yield from chunk
+        finally:
+            conn.close()
+
+    def _source_version(self, kind: str, source: str):
+        """(row count, version string) of the detections a report is built from."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            count, newest = conn.execute(
+                f"SELECT COUNT(*), MAX(d.id) FROM detections d {SOURCE_FILTERS[kind]}", (source,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return count, f"{REPORT_FORMAT_VERSION}:{count}:{newest}"
+
+    def _build(self, report_name: str, kind: str, source: str, write):
+        """
+        Returns the path of `report_name`, rebuilding it with `write(tmp_path)` only if the
+        detections of its video/batch changed since the cached copy was generated.
+        """
+        try:
+            count, version = self._source_version(kind, source)
         except Exception as e:
             print(f"Error fetching report data: {e}")
-            return pd.DataFrame() # Return empty DataFrame on error
+            return None
+        if count == 0:
+            print(f"No data found for report {report_name}.")
+            return None
+
+        report_path = os.path.join(self.reports_folder, report_name)
+        if os.path.exists(report_path) and self._registration(report_name)[2] == version:
+            return report_path
+
+        # Ensure the reports directory exists
+        os.makedirs(self.reports_folder, exist_ok=True)
+        # Written aside and renamed, so a concurrent reader never sees a half-written report
+        tmp_path = f"{report_path}.{os.getpid()}.part"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, report_path)
+        except Exception as e:
+            print(f"Error generating report {report_name}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        self._remember(report_name, kind, source, version)
+        return report_path
+
+    def _registration(self, report_name: str):
+        """(kind, source, source_version, generated_at) of a known report; all None if unknown."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT kind, source, source_version, generated_at FROM reports WHERE name = ?",
+                               (report_name,)).fetchone()
+        except sqlite3.OperationalError:
+            return None, None, None, None  # database predates the reports table
         finally:
-            if conn:
-                conn.close() # Ensure connection is always closed
+            conn.close()
+        return row if row else (None, None, None, None)
+
+    def _remember(self, report_name: str, kind: str, source: str, version: str = ''):
+        """Records a report's source and, once its file is written (`version`), what it was built from."""
+        built = ", source_version = excluded.source_version, generated_at = excluded.generated_at" if version else ""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO reports (name, kind, source, source_version, generated_at) "
+                    "VALUES (?, ?, ?, ?, CASE WHEN ? != '' THEN CURRENT_TIMESTAMP END) "
+                    f"ON CONFLICT(name) DO UPDATE SET kind = excluded.kind, source = excluded.source{built}",
+                    (report_name, kind, source, version, version)
+                )
+        except sqlite3.OperationalError as e:
+            print(f"Warning: report cache not updated for {report_name}: {e}")
+        finally:
+            conn.close()
+
+    # --- On-demand access by report name ---
+
+    def _register(self, kind: str, source: str, names: dict) -> dict:
+        """Records the report names of a video/batch; returns {format: name}, None where there is no data."""
+        count, _ = self._source_version(kind, source)
+        for name in names.values():
+            self._remember(name, kind, source)
+        return {fmt: (name if count else None) for fmt, name in names.items()}
+
+    def register_video(self, video_filename: str) -> dict:
+        names = {fmt: self.report_name(video_filename, fmt) for fmt in ('csv', 'pdf')}
+        return self._register('video', video_filename, names)
+
+    def register_batch(self, batch_id: str) -> dict:
+        names = {fmt: self.batch_report_name(batch_id, fmt) for fmt in ('csv', 'pdf')}
+        return self._register('batch', batch_id, names)
+
+    def generate(self, report_name: str):
+        """Builds (or returns the cached) report `report_name`; None if it is unknown or has no data."""
+        kind, source = self._registration(report_name)[:2]
+        builders = {
+            ('video', '.csv'): self.generate_csv, ('video', '.pdf'): self.generate_pdf,
+            ('batch', '.csv'): self.generate_batch_csv, ('batch', '.pdf'): self.generate_batch_pdf,
+        }
+        builder = builders.get((kind, os.path.splitext(report_name)[1]))
+        return builder(source) if builder else None
+
+    def status(self, report_name: str) -> dict:
+        """
+        State of a report without building it: 'unknown' (never registered), 'empty' (no
+        detections), 'pending' (never generated), 'stale' (new detections since) or 'ready'.
+        """
+        kind, source, built_version, generated_at = self._registration(report_name)
+        status = {"name": report_name, "state": "unknown", "generated_at": None, "size": None, "etag": None}
+        if kind not in SOURCE_FILTERS:
+            return status
+
+        count, version = self._source_version(kind, source)
+        report_path = os.path.join(self.reports_folder, report_name)
+        built = bool(built_version) and os.path.exists(report_path)
+        if count == 0:
+            status["state"] = "empty"
+        elif not built:
+            status["state"] = "pending"
+        else:
+            status["state"] = "ready" if built_version == version else "stale"
+        if built:
+            status.update(generated_at=generated_at, size=os.path.getsize(report_path), etag=built_version)
+        status["detections"] = count
+        return status
+
+    def _write_csv(self, path: str, columns: list, rows):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+    def _thumbnail(self, match_image_path: str):
+        """Path of the cached downscaled JPEG of a match crop (created on first use), or None."""
+        name = os.path.splitext(match_image_path)[0] + '.jpg'
+        thumb_path = os.path.join(self.thumbnail_folder, name)
+        if os.path.exists(thumb_path):
+            return thumb_path
+
+        source_path = os.path.join(self.matches_folder, match_image_path)
+        image = cv2.imread(source_path) if os.path.exists(source_path) else None
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        if height > REPORT_THUMBNAIL_PX:
+            scale = REPORT_THUMBNAIL_PX / height
+            image = cv2.resize(image, (max(1, round(width * scale)), REPORT_THUMBNAIL_PX), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, REPORT_THUMBNAIL_QUALITY])
+        if not ok:
+            return None
+
+        os.makedirs(self.thumbnail_folder, exist_ok=True)
+        tmp_path = f"{thumb_path}.{os.getpid()}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded.tobytes())
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+
+    @staticmethod
+    def _span(start, end, separator="-"):
+        """'start-end' for an appearance interval, just 'start' for a single-frame detection."""
+        if end is None or str(end) == str(start):
+            return str(start)
+        return f"{start}{separator}{end}"
+
+    # --- Per-video reports ---
+
+    def _video_query(self):
+        return (f"SELECT {', '.join(VIDEO_COLUMNS)} FROM detections WHERE video_filename = ? "
+                "ORDER BY frame_number, id")
+
+    @staticmethod
+    def report_name(video_filename: str, extension: str) -> str:
+        return f"report_{video_filename.split('.')[0]}.{extension}"
 
     def generate_csv(self, video_filename: str):
         """Generates a CSV report."""
-        df = self._fetch_data(video_filename)
-        if df.empty: 
-            print("No data found for CSV report.")
-            return None
-            
-        report_filename = f"report_{video_filename.split('.')[0]}.csv"
-        report_path = os.path.join(REPORTS_FOLDER, report_filename)
-        
-        # Ensure the reports directory exists
-        os.makedirs(REPORTS_FOLDER, exist_ok=True)
-        
-        df.to_csv(report_path, index=False)
-        return report_path
-        
+        def write(path):
+            self._write_csv(path, VIDEO_COLUMNS, self._iter_rows(self._video_query(), (video_filename,)))
+
+        return self._build(self.report_name(video_filename, 'csv'), 'video', video_filename, write)
+
     def generate_pdf(self, video_filename: str):
         """Generates a professional PDF report with a table and image previews."""
-        df = self._fetch_data(video_filename)
-        if df.empty:
-            print("No data found for PDF report.")
-            return None
+        def write(path):
+            self._write_pdf(path, video_filename, self._iter_rows(self._video_query(), (video_filename,)))
 
-        # Ensure the reports directory exists
-        os.makedirs(REPORTS_FOLDER, exist_ok=True)
-            
-        pdf = FPDF()
+        return self._build(self.report_name(video_filename, 'pdf'), 'video', video_filename, write)
+
+    def _write_pdf(self, path: str, video_filename: str, rows):
+        pdf = _PagedPDF()
         pdf.add_page()
-        
+
         # --- Use 'Helvetica' (built-in) instead of 'Arial' for compatibility ---
+        # (Keyword-style cell() calls: the positional `ln` argument goes through fpdf2's slow deprecation path)
         pdf.set_font("Helvetica", "B", 16)
-        pdf.cell(0, 10, f"Person Search Detection Report", 0, 1, 'C')
+        pdf.cell(0, 10, "Person Search Detection Report", new_x="LMARGIN", new_y="NEXT", align='C')
         pdf.set_font("Helvetica", "I", 12)
-        pdf.cell(0, 8, f"Video File: {video_filename}", 0, 1, 'C')
+        pdf.cell(0, 8, f"Video File: {video_filename}", new_x="LMARGIN", new_y="NEXT", align='C')
         pdf.ln(10)
 
-        # --- Create Table Header ---
-        pdf.set_font("Helvetica", "B", 10)
-        pdf.set_fill_color(230, 230, 230) # Light gray header
-        col_width_frame = 30
-        col_width_time = 45
-        col_width_sim = 35
-        col_width_img = 80
+        # (title, width in mm); the last column holds the preview
+        columns = [("Frames", 22), ("Identity", 38), ("Time", 35), ("Similarity", 25), ("Match Preview", 70)]
         row_height = 25 # Set fixed row height for images
-        
-        pdf.cell(col_width_frame, 10, "Frame", 1, 0, 'C', True)
-        pdf.cell(col_width_time, 10, "Timestamp", 1, 0, 'C', True)
-        pdf.cell(col_width_sim, 10, "Similarity", 1, 0, 'C', True)
-        pdf.cell(col_width_img, 10, "Match Preview", 1, 1, 'C', True)
-        # ---------------------------
-
-        pdf.set_font("Helvetica", "", 9)
-        
-        for _, row in df.iterrows():
+        text_row_height = 8 # Rows past REPORT_PDF_MAX_PREVIEWS
+
+        def header():
+            pdf.set_font("Helvetica", "B", 10)
+            pdf.set_fill_color(230, 230, 230) # Light gray header
+            for title, width in columns:
+                pdf.cell(width, 10, title, border=1, align='C', fill=True)
+            pdf.ln()
+            pdf.set_font("Helvetica", "", 9)
+
+        header()
+        for index, row in enumerate(rows):
+            frame, end_frame, identity, timestamp, end_timestamp, similarity, match_image_path = row
+            with_preview = index < REPORT_PDF_MAX_PREVIEWS
+            height = row_height if with_preview else text_row_height
+
             # Check for page break
-            if pdf.get_y() + row_height > 275: # 275 is a safe margin on A4
+            if pdf.get_y() + height > 275: # 275 is a safe margin on A4
                 pdf.add_page()
-                # Redraw header on new page
-                pdf.set_font("Helvetica", "B", 10)
-                pdf.cell(col_width_frame, 10, "Frame", 1, 0, 'C', True)
-                pdf.cell(col_width_time, 10, "Timestamp", 1, 0, 'C', True)
-                pdf.cell(col_width_sim, 10, "Similarity", 1, 0, 'C', True)
-                pdf.cell(col_width_img, 10, "Match Preview", 1, 1, 'C', True)
-                pdf.set_font("Helvetica", "", 9)
-            
-            start_y = pdf.get_y()
-            
-            # --- Draw Text Cells (using multi_cell for vertical alignment) ---
-            pdf.multi_cell(col_width_frame, row_height, str(row['frame_number']), 1, 'C', 0)
-            pdf.set_y(start_y)
-            pdf.set_x(10 + col_width_frame)
-            
-            pdf.multi_cell(col_width_time, row_height, str(row['timestamp']), 1, 'C', 0)
-            pdf.set_y(start_y)
-            pdf.set_x(10 + col_width_frame + col_width_time)
-            
-            pdf.multi_cell(col_width_sim, row_height, f"{row['similarity']:.4f}", 1, 'C', 0)
-            pdf.set_y(start_y)
-            pdf.set_x(10 + col_width_frame + col_width_time + col_width_sim)
-            # -------------------------------------------------------------------
+                header()
+
+            start_x, start_y = pdf.get_x(), pdf.get_y()
+            values = [self._span(frame, end_frame), self._fit(pdf, identity or '-', columns[1][1]),
+                      self._span(timestamp, end_timestamp, " - "), f"{similarity:.4f}"]
+            for value, (_, width) in zip(values, columns):
+                pdf.cell(width, height, value, border=1, align='C')
 
             # --- Image Cell (with error handling) ---
-            image_path = os.path.join(MATCHES_FOLDER, row['match_image_path'])
             img_x = pdf.get_x() + 2 # Padding
-            img_y = pdf.get_y() + 2 # Padding
-            
-            try:
-                if os.path.exists(image_path):
-                    # Maintain aspect ratio, fit within cell
-                    pdf.image(image_path, x=img_x, y=img_y, h=row_height - 4) 
-                else:
-                    # If image file is missing
-                    pdf.set_y(start_y + row_height/2 - 3)
-                    pdf.set_x(img_x)
-                    pdf.cell(col_width_img, 6, "[Image not found]", 0, 0, 'L')
-            except Exception as e:
-                # If image is corrupt or FPDF fails
-                print(f"Warning: Could not embed image {image_path}. {e}")
-                pdf.set_y(start_y + row_height/2 - 3)
-                pdf.set_x(img_x)
-                pdf.cell(col_width_img, 6, "[Image load error]", 0, 0, 'L')
-
-            # Draw the empty cell border and move to next line
-            pdf.set_y(start_y)
-            pdf.set_x(10 + col_width_frame + col_width_time + col_width_sim)
-            pdf.multi_cell(col_width_img, row_height, "", 1, 'C', 1) # The '1' at the end moves to next line
-
-        report_filename = f"report_{video_filename.split('.')[0]}.pdf"
-        report_path = os.path.join(REPORTS_FOLDER, report_filename)
-        
-        try:
-            pdf.output(report_path, "F")
-            return report_path
-        except Exception as e:
-            print(f"Error saving PDF: {e}")
-            return None
\ No newline at end of file
+            if with_preview:
+                thumb_path = self._thumbnail(match_image_path)
+                try:
+                    if thumb_path:
+                        # Maintain aspect ratio, fit within cell
+                        pdf.image(thumb_path, x=img_x, y=start_y + 2, h=row_height - 4)
+                        note = ""
+                    else:
+                        # If image file is missing
+                        note = "[Image not found]"
+                except Exception as e:
+                    # If image is corrupt or FPDF fails
+                    print(f"Warning: Could not embed image {match_image_path}. {e}")
+                    note = "[Image load error]"
+            else:
+                note = "(see CSV report)"
+            pdf.set_xy(start_x + sum(width for _, width in columns[:-1]), start_y)
+            pdf.cell(columns[-1][1], height, note, border=1, new_x="LMARGIN", new_y="NEXT", align='C')
+
+        pdf.output(path)
+
+    # --- Consolidated (cross-video) batch reports ---
+
+    def _batch_query(self):
+        columns = ', '.join(['b.video_path'] + [f"d.{column}" for column in BATCH_COLUMNS[1:]])
+        return (f"SELECT {columns} FROM detections d JOIN batch_videos b ON b.video_filename = d.video_filename "
+                "WHERE b.batch_id = ? ORDER BY b.position, d.frame_number, d.id")
+
+    @staticmethod
+    def batch_report_name(batch_id: str, extension: str) -> str:
+        return f"report_batch_{batch_id}.{extension}"
+
+    def generate_batch_csv(self, batch_id: str):
+        """Generates one CSV with the detections of all videos of a batch."""
+        def write(path):
+            self._write_csv(path, BATCH_COLUMNS, self._iter_rows(self._batch_query(), (batch_id,)))
+
+        return self._build(self.batch_report_name(batch_id, 'csv'), 'batch', batch_id, write)
+
+    def generate_batch_pdf(self, batch_id: str):
+        """Generates a PDF summary: per video and identity, appearances, first/last seen and best similarity."""
+        def write(path):
+            self._write_batch_pdf(path, batch_id, self._iter_rows(self._batch_query(), (batch_id,)))
+
+        return self._build(self.batch_report_name(batch_id, 'pdf'), 'batch', batch_id, write)
+
+    def _write_batch_pdf(self, path: str, batch_id: str, rows):
+        # Aggregated while streaming: only one entry per (video, identity) is held in memory
+        summary = OrderedDict()
+        detections = 0
+        for row in rows:
+            video_path, _, _, _, identity, timestamp, end_timestamp, similarity, _ = row
+            detections += 1
+            key = (video_path, identity or '-')
+            entry = summary.get(key)
+            if entry is None:
+                summary[key] = entry = {'appearances': 0, 'first_seen': timestamp, 'last_seen': None, 'best': similarity}
+            entry['appearances'] += 1
+            entry['last_seen'] = end_timestamp or timestamp
+            entry['best'] = max(entry['best'], similarity)
+
+        pdf = _PagedPDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 16)
+        pdf.cell(0, 10, "Person Search Batch Report", new_x="LMARGIN", new_y="NEXT", align='C')
+        pdf.set_font("Helvetica", "I", 12)
+        videos = len({video_path for video_path, _ in summary})
+        pdf.cell(0, 8, f"Batch: {batch_id} - {videos} videos with matches, {detections} detections",
+                 new_x="LMARGIN", new_y="NEXT", align='C')
+        pdf.ln(10)
+
+        columns = [("Video", 70), ("Identity", 35), ("Hits", 15), ("First seen", 25), ("Last seen", 25), ("Best", 20)]
+
+        def header():
+            pdf.set_font("Helvetica", "B", 10)
+            pdf.set_fill_color(230, 230, 230)
+            for title, width in columns:
+                pdf.cell(width, 10, title, border=1, align='C', fill=True)
+            pdf.ln()
+            pdf.set_font("Helvetica", "", 9)
+
+        header()
+        for (video_path, identity), entry in summary.items():
+            if pdf.get_y() + 8 > 275:
+                pdf.add_page()
+                header()
+            values = [self._fit(pdf, os.path.basename(video_path), columns[0][1]),
+                      self._fit(pdf, identity, columns[1][1]), str(entry['appearances']),
+                      str(entry['first_seen']), str(entry['last_seen']), f"{entry['best']:.4f}"]
+            for value, (_, width) in zip(values, columns):
+                pdf.cell(width, 8, value, border=1, align='C')
+            pdf.ln()
+
+        pdf.output(path)
+
+    @staticmethod
+    def _fit(pdf, text: str, width: float):
+        """Truncates `text` with an ellipsis so it fits in a cell of `width` mm."""
+        text = str(text)
+        if pdf.get_string_width(text) <= width - 2:
+            return text
+        while text and pdf.get_string_width(text + "...") > width - 2:
+            text = text[:-1]
+        return text + "..."
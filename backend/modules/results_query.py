@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+from ..config import DB_PATH
+
+# Both queries range-scan idx_detections_video_frame (video_filename, frame_number); its
+# implicit rowid makes (frame_number, id) a unique, index-ordered keyset cursor.
+_COLUMNS = ("id, frame_number, timestamp, similarity, match_image_path, identity, end_frame_number, end_timestamp, "
+            "timestamp_ms, end_timestamp_ms")
+
+
+def _result(row) -> dict:
+    return {
+        "id": row[0],
+        "frame": row[1],
+        "timestamp": row[2],
+        "similarity": f"{row[3]:.4f}",
+        "image_url": f"/api/static/matches/{row[4]}",
+        "identity": row[5],
+        "end_frame": row[6],
+        "end_timestamp": row[7],
+        "timestamp_ms": row[8],
+        "end_timestamp_ms": row[9],
+    }
+
+
+def fetch_results(video_filename: str, after_frame: int = None, after_id: int = None, limit: int = None,
+                  db_path: str = DB_PATH):
+    """
+    Detections of a video in frame order, starting strictly after the (after_frame, after_id)
+    cursor (after_id omitted = after every row of after_frame). Returns (results, next cursor),
+    the cursor being None on the last page; without `limit` every remaining row is returned.
+    """
+    query = f"SELECT {_COLUMNS} FROM detections WHERE video_filename = ?"
+    params = [video_filename]
+    if after_frame is not None:
+        if after_id is None:
+            query += " AND frame_number > ?"
+            params.append(after_frame)
+        else:
+            query += " AND (frame_number, id) > (?, ?)"
+            params.extend([after_frame, after_id])
+    query += " ORDER BY frame_number, id"
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        query += " LIMIT ?"
+        params.append(limit + 1)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = {"after_frame": rows[-1][1], "after_id": rows[-1][0]}
+    return [_result(row) for row in rows], next_cursor
+
+
+def per_second_timeline(video_filename: str, db_path: str = DB_PATH) -> list:
+    """
+    One bucket per second of video that has detections starting in it: count, identities,
+    best similarity, first frame and how long the appearances starting there last (until_ms).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT timestamp_ms / 1000 AS second, COUNT(*), json_group_array(DISTINCT identity), MAX(similarity), "
+            "MIN(frame_number), MAX(COALESCE(end_timestamp_ms, timestamp_ms)) "
+            "FROM detections WHERE video_filename = ? GROUP BY second ORDER BY second",
+            (video_filename,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            "second": row[0],
+            "detections": row[1],
+            "identities": sorted(identity for identity in json.loads(row[2]) if identity is not None),
+            "best_similarity": f"{row[3]:.4f}",
+            "first_frame": row[4],
+            "until_ms": row[5],
+        } for row in rows
+    ]
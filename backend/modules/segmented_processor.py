@@ -0,0 +1,302 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from ..config import (
+    FRAME_SKIP, JOB_TIMING_SUMMARY, SEGMENT_MIN_FRAMES, SEGMENT_TORCH_THREADS, SEGMENT_WORKERS,
+    TRACK_MAX_MISSES, VIDEO_SEGMENTS
+)
+from .checkpoints import existing_match_keys, load_checkpoint, purge_video_results
+from .detection_writer import DetectionWriter
+from .face_tracker import FaceTracker
+from .metrics import MATCHES, job_timings, timed
+
+# --- Worker process side ---
+
+# One VideoProcessor per worker process, created by the pool initializer
+_worker_processor = None
+
+
+def _init_worker(torch_threads: int):
+    """Pool initializer: caps torch threads and loads the models once for the life of the process."""
+    global _worker_processor
+    import torch
+    from .video_processor import VideoProcessor
+
+    torch.set_num_threads(torch_threads)
+    _worker_processor = VideoProcessor()
+    print(f"🧵 Segment worker {os.getpid()} ready ({torch_threads} torch threads).")
+
+
+def _process_segment(video_path: str, video_filename: str, gallery, index: int, start: int, end: int, progress):
+    """
+    Runs the regular sampling + inference loop over frames [start, end) of the video.
+    Progress is reported through the `progress` queue as (index, frames covered); match crops
+    are written here, and their detection rows are returned to the parent to be logged,
+    along with the segment's per-stage timings ({stage: [calls, seconds]}).
+    """
+    processor = _worker_processor
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Segment {index}: could not open {video_filename}")
+
+    sampler = processor.make_sampler(cap, start_frame=start, end_frame=end)
+    tracker = FaceTracker() if processor.tracking else None
+    matches = []
+    with job_timings() as timings:
+        try:
+            for entries in processor._scan(sampler, video_filename, gallery, tracker):
+                for entry in entries:
+                    if entry[0] == 'event':
+                        progress.put((index, entry[1]['frame_number'] - start))
+                    else:
+                        matches.append(entry)
+        finally:
+            cap.release()
+
+    rows = []
+    for _, _, row, future in matches:
+        try:
+            future.result()
+        except Exception as e:
+            # No image, no row: drop this match
+            print(f"⚠️ Warning: Failed to save image for frame {row[1]}. Error: {e}")
+            continue
+        # Per-frame detections (no tracking) are single-frame intervals
+        rows.append(row if len(row) == 8 else row + (row[1], row[2]))
+    return index, sorted(rows, key=lambda r: r[1]), sampler.frames_decoded, timings.stages
+
+
+# --- Parent side ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_segment_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Process-wide worker pool (spawned, so workers never inherit the server's threads)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = workers or SEGMENT_WORKERS or max(2, VIDEO_SEGMENTS)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(SEGMENT_TORCH_THREADS,))
+        return _pool
+
+
+def split_segments(total_frames: int, segments: int, align: int = FRAME_SKIP, start_frame: int = 0):
+    """
+    Splits [start_frame, total_frames) into up to `segments` contiguous ranges. Boundaries fall
+    on multiples of `align` from `start_frame`, so fixed-rate sampling picks exactly the frames
+    a single pass would.
+    """
+    frames = total_frames - start_frame
+    segments = max(1, min(segments, frames // max(1, align) or 1))
+    size = -(-frames // segments)
+    size = -(-size // align) * align
+    bounds = list(range(start_frame, total_frames, size)) + [total_frames]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+class SegmentedVideoProcessor:
+    """
+    Processes one long video as several frame ranges in parallel worker processes.
+
+    Exposes the same process_video_generator() protocol as VideoProcessor. The reference
+    gallery is built once here and shipped to the workers. Progress from all segments is
+    combined into one monotonic `frame_number`. Detection rows are committed, and their
+    `match` events yielded, strictly in frame order: segment k+1 waits for segment k. With
+    face tracking, an appearance cut by a segment boundary is stitched back into one row.
+    Every in-order commit also checkpoints the run, so an interrupted video resumes from its
+    last committed segment and a finished one is reused, as on the single-process path.
+    """
+
+    def __init__(self, processor, segments: int = VIDEO_SEGMENTS, min_frames: int = SEGMENT_MIN_FRAMES):
+        self.processor = processor
+        self.segments = segments
+        self.min_frames = min_frames
+        # Appearances this close to a boundary on both sides are the same person crossing it
+        self.stitch_gap = processor.FRAME_SKIP * (TRACK_MAX_MISSES + 1)
+
+    def build_gallery(self, reference_images):
+        return self.processor.build_gallery(reference_images)
+
+    def process_video_generator(self, video_path: str, reference_image_paths, video_filename: str = None):
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0.0
+        cap.release()
+
+        video_filename = video_filename or os.path.basename(video_path)
+        if self.segments <= 1 or total_frames < self.min_frames:
+            yield from self.processor.process_video_generator(video_path, reference_image_paths, video_filename=video_filename)
+            return
+
+        gallery = self.processor.build_gallery(reference_image_paths)
+        if gallery is None:
+            yield {"status": "error", "message": "Could not generate reference embedding from provided images."}
+            return
+
+        # --- RESUME ---
+        # Same references/settings as an earlier run: continue from its checkpoint (a finished
+        # run, or a short remainder, is handed to the single-process path, which reuses or
+        # resumes it). Anything else left for this video is stale and starts over.
+        reference_hash = self.processor.processing_fingerprint(gallery)
+        checkpoint = load_checkpoint(video_filename, reference_hash)
+        start_frame = 0
+        logged = set()
+        if checkpoint is not None:
+            if checkpoint.completed or total_frames - checkpoint.last_frame < self.min_frames:
+                yield from self.processor.process_video_generator(video_path, gallery, video_filename=video_filename)
+                return
+            start_frame = checkpoint.last_frame
+            # Rows committed after the checkpoint count too; re-deriving them is deduped
+            logged = existing_match_keys(video_filename)
+        else:
+            purge_video_results(video_filename)
+
+        segments = split_segments(total_frames, self.segments, align=self.processor.FRAME_SKIP, start_frame=start_frame)
+        yield {"status": "start", "total_frames": total_frames, "filename": video_filename,
+               "identities": gallery.identities, "segments": len(segments), "resumed_from": start_frame}
+        if start_frame:
+            print(f"⏩ Resuming {video_filename} at frame {start_frame} ({len(logged)} matches so far), "
+                  f"Segments: {len(segments)}")
+        else:
+            print(f"🔄 Starting segmented processing: {video_filename}. Total Frames: {total_frames}, Segments: {len(segments)}")
+
+        pool = get_segment_pool()
+        with multiprocessing.get_context('spawn').Manager() as manager:
+            progress = manager.Queue()
+            futures = {pool.submit(_process_segment, video_path, video_filename, gallery, i, start, end, progress): i
+                       for i, (start, end) in enumerate(segments)}
+            yield from self._collect(futures, progress, segments, video_filename, total_frames, reference_hash,
+                                     fps, logged)
+
+    def _collect(self, futures: dict, progress, segments: list, video_filename: str, total_frames: int,
+                 reference_hash: str, fps: float = None, logged: set = None):
+        """
+        Commits segment results in order, checkpointing after each one. Rows whose
+        (frame, identity) is in `logged` were written by an earlier, interrupted run and are dropped.
+        The job timings combine the workers' stages with the parent's (stitch, db_write).
+        """
+        logged = logged or set()
+        first_frame = segments[0][0]
+        covered = [0] * len(segments)
+        results = {}
+        next_index = 0
+        held = []  # rows touching the boundary to the next segment, not yet committed
+        matches_found = len(logged)
+        frames_inferred = 0
+        last_reported = -1
+        pending = set(futures)
+
+        with job_timings() as timings, DetectionWriter(fps=fps) as writer:
+            try:
+                while pending or next_index < len(segments):
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, rows, decoded, stages = future.result()
+                        results[index] = rows
+                        covered[index] = segments[index][1] - segments[index][0]
+                        frames_inferred += decoded
+                        timings.merge(stages)
+
+                    # Combined progress: frames covered across all segments
+                    while True:
+                        try:
+                            index, frames = progress.get_nowait()
+                        except queue.Empty:
+                            break
+                        covered[index] = max(covered[index], frames)
+                    total_covered = sum(covered)
+                    if total_covered // 50 != last_reported // 50:
+                        last_reported = total_covered
+                        yield {"status": "progress", "frame_number": min(first_frame + total_covered, total_frames)}
+
+                    # Commit finished segments strictly in order
+                    while next_index in results:
+                        with timed('stitch'):
+                            rows = self._stitch(held, results.pop(next_index), segments[next_index][0])
+                        # Hold back from the first row that may continue into the next segment,
+                        # so rows are still committed in start-frame order after stitching
+                        cut = len(rows)
+                        if next_index < len(segments) - 1:
+                            limit = segments[next_index][1] - self.stitch_gap
+                            cut = next((i for i, r in enumerate(rows) if r[6] >= limit), len(rows))
+                        ready, held = rows[:cut], rows[cut:]
+
+                        committed = []
+                        for row in ready:
+                            if (row[1], row[5]) in logged:
+                                # Re-derived after a resume: keep the original row, discard the new crop
+                                self.processor._discard_image(row[4])
+                                continue
+                            writer.add(*row)
+                            committed.append(row)
+                        # Held-back rows are redone after a restart, like open appearances
+                        resume_frame = held[0][1] if held else segments[next_index][1]
+                        writer.set_checkpoint(video_filename, reference_hash, resume_frame,
+                                              matches_found + len(committed), total_frames)
+                        writer.flush()
+                        for row in committed:
+                            matches_found += 1
+                            MATCHES.inc()
+                            print(f"🔥 Match Logged! Frame: {row[1]}, Identity: {row[5]}, Sim: {row[3]:.4f}")
+                            yield self._row_event(row)
+                        next_index += 1
+
+                writer.set_checkpoint(video_filename, reference_hash, total_frames, matches_found, total_frames,
+                                      completed=True)
+                writer.flush()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        completed = {
+            "status": "completed",
+            "frames_processed": total_frames,
+            "matches_found": matches_found
+        }
+        if JOB_TIMING_SUMMARY:
+            completed["timings"] = timings.summary()
+        yield completed
+        print(f"✅ Segmented processing complete. Frames: {total_frames}, Inferred: {frames_inferred}, Matches: {matches_found}")
+
+    def _stitch(self, held: list, rows: list, boundary: int):
+        """
+        Joins appearances of the previous segment that ran into `boundary` with appearances of
+        the same identity that start right after it. The better-scoring crop is kept.
+        Rows: (video, start, start_ts, similarity, image, identity, end, end_ts).
+        """
+        if not held:
+            return rows
+        rows = list(rows)
+        merged = []
+        for prev in held:
+            follow = None
+            if self.processor.tracking and prev[6] >= boundary - self.stitch_gap:
+                follow = next((r for r in rows if r[5] == prev[5] and r[1] <= boundary + self.stitch_gap), None)
+            if follow is None:
+                merged.append(prev)
+                continue
+            rows.remove(follow)
+            best, other = (prev, follow) if prev[3] >= follow[3] else (follow, prev)
+            self.processor._discard_image(other[4])
+            merged.append((prev[0], prev[1], prev[2], best[3], best[4], prev[5], follow[6], follow[7]))
+        return sorted(merged + rows, key=lambda r: r[1])
+
+    @staticmethod
+    def _row_event(row) -> dict:
+        return {
+            "status": "match",
+            "frame_number": row[1],
+            "end_frame_number": row[6],
+            "similarity": row[3],
+            "timestamp": row[2],
+            "end_timestamp": row[7],
+            "identity": row[5]
+        }
@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from ..config import LIVE_SESSION_BACKEND, LIVE_SESSION_MAX, LIVE_SESSION_TTL_SECONDS
+from .embedding_cache import EmbeddingStore
+
+
+class InMemorySessionBackend:
+    """Sessions in an OrderedDict (LRU order) guarded by a lock. Visible to this process only."""
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> (embedding, last_used)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _expired(self, last_used, now):
+        return self.ttl_seconds is not None and now - last_used > self.ttl_seconds
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and self._expired(entry[1], now):
+                del self._sessions[session_id]
+                self._counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            self._counters["hits"] += 1
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id: str, embedding: np.ndarray):
+        with self._lock:
+            self._sessions[session_id] = (embedding, time.time())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, last_used) in self._sessions.items() if self._expired(last_used, now)]
+            for sid in expired:
+                del self._sessions[sid]
+            self._counters["expired"] += len(expired)
+            return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["size"] = len(self._sessions)
+        counters["max_entries"] = self.max_sessions
+        return counters
+
+
+class SQLiteSessionBackend:
+    """Sessions in the shared embedding store, so every worker process on the host sees them."""
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        self.store = EmbeddingStore(namespace='live', max_entries=max_sessions, ttl_seconds=ttl_seconds)
+
+    def get(self, session_id: str):
+        return self.store.get(session_id)
+
+    def put(self, session_id: str, embedding: np.ndarray):
+        self.store.put(session_id, embedding)
+
+    def delete(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    def purge_expired(self) -> int:
+        return self.store.purge_expired()
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+SESSION_BACKENDS = {
+    'memory': InMemorySessionBackend,
+    'sqlite': SQLiteSessionBackend,
+}
+
+
+class SessionStore:
+    """
+    Live-feed sessions: one reference embedding per session id, bounded in count (LRU)
+    and in idle time (TTL), with explicit close. The storage backend is pluggable.
+    """
+
+    def __init__(self, backend: str = LIVE_SESSION_BACKEND, ttl_seconds: float = LIVE_SESSION_TTL_SECONDS,
+                 max_sessions: int = LIVE_SESSION_MAX):
+        if backend not in SESSION_BACKENDS:
+            raise ValueError(f"Unknown live session backend '{backend}'. Choose from {sorted(SESSION_BACKENDS)}.")
+        self.backend_name = backend
+        self.backend = SESSION_BACKENDS[backend](ttl_seconds, max_sessions)
+
+    def create(self, embedding: np.ndarray) -> str:
+        """Stores the embedding under a new session id and returns the id."""
+        self.backend.purge_expired()
+        session_id = str(uuid.uuid4())
+        self.backend.put(session_id, embedding)
+        return session_id
+
+    def get(self, session_id: str):
+        """The session's reference embedding (refreshing its TTL), or None if unknown/expired."""
+        return self.backend.get(session_id)
+
+    def close(self, session_id: str) -> bool:
+        """Ends a session. Returns False if it did not exist."""
+        return self.backend.delete(session_id)
+
+    def stats(self) -> dict:
+        stats = self.backend.stats()
+        stats["backend"] = self.backend_name
+        return stats
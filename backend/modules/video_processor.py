@@ -1,154 +1,653 @@
 import cv2
+import hashlib
 import os
-import sqlite3
+import time
 from datetime import timedelta
 import uuid
 import numpy as np
-import traceback
 
 # --- UPDATED IMPORTS ---
 # Relative imports (correct for your project structure)
-from ..config import DB_PATH, FRAME_SKIP, MATCHES_FOLDER, SIMILARITY_THRESHOLD
+from ..config import (
+    ADAPTIVE_SAMPLING, ANN_MIN_GALLERY_SIZE, CHECKPOINT_INTERVAL_SECONDS, FACE_TRACKING, FRAME_SKIP, INFERENCE_BATCH_SIZE,
+    JOB_TIMING_SUMMARY, MATCHES_FOLDER, SIMILARITY_THRESHOLD
+)
 # Import the new unified pipeline
 from .face_recognition_pipeline import FaceRecognitionPipeline 
-from .matcher import Matcher
+from .matcher import GalleryMatcher, Matcher
+from .frame_sampler import AdaptiveFrameSampler, FrameSampler
+from .face_tracker import Appearance, FaceTracker
+from .ann_index import IVFIndex
+from .detection_writer import DetectionWriter
+from .checkpoints import existing_match_keys, has_checkpoint, load_checkpoint, purge_video_results
+from .image_writer import get_image_writer
+from .face_archive import FaceArchive, FaceArchiveWriter, archive_path
+from .metrics import FRAMES_DECODED, FRAMES_SAMPLED, MATCHES, job_timings, timed
 # --- REMOVED IMPORTS ---
 # from .face_detector import FaceDetector  (No longer needed)
 # from .face_embedder import FaceEmbedder (No longer needed)
 # ------------------------
 
+# Identity recorded for a plain list of reference images (single-person search)
+DEFAULT_IDENTITY = 'target'
+
 
 class VideoProcessor:
     """Orchestrates the DL pipeline: Detect+Align+Embed → Match → Log."""
     
-    def __init__(self):
+    def __init__(self, batch_size: int = INFERENCE_BATCH_SIZE, pipeline: FaceRecognitionPipeline = None,
+                 tracking: bool = FACE_TRACKING, adaptive_sampling: bool = ADAPTIVE_SAMPLING):
         # Attach FRAME_SKIP to instance for consistent use
         self.FRAME_SKIP = FRAME_SKIP
+        self.batch_size = max(1, int(batch_size))
+        # Track faces across frames and log appearances instead of per-frame detections
+        self.tracking = tracking
+        # Motion-driven sampling instead of every FRAME_SKIP-th frame
+        self.adaptive_sampling = adaptive_sampling
         
         # --- UPDATED INITIALIZATION ---
-        # Instantiate the single, unified pipeline
-        self.pipeline = FaceRecognitionPipeline() 
+        # Reuse a shared pipeline (see model_registry) or instantiate a private one
+        self.pipeline = pipeline if pipeline is not None else FaceRecognitionPipeline()
         # Matcher is initialized with the threshold from config
         self.matcher = Matcher(threshold=SIMILARITY_THRESHOLD) 
+        # Match crops are written in the background; rows are logged once the file exists
+        self.image_writer = get_image_writer()
         # --- REMOVED ---
         # self.detector = FaceDetector()
         # self.embedder = FaceEmbedder()
         # ------------------------
 
-    def _log_detection(self, video_filename, frame_num, timestamp, similarity, match_image_path):
-        """Insert detection info into SQLite database safely."""
+    def build_gallery(self, reference_images):
+        """
+        Builds a GalleryMatcher from reference image sources.
+        Accepts a list of sources (one identity), {identity: [sources]} for multi-person search,
+        or an enrolled IVFIndex (approximate search once it holds ANN_MIN_GALLERY_SIZE faces).
+        A prebuilt GalleryMatcher is returned as is (e.g. one gallery shared by a whole batch).
+        Identities whose images yield no face are skipped. Returns None if none remain.
+        """
+        if isinstance(reference_images, GalleryMatcher):
+            return reference_images
+        if isinstance(reference_images, IVFIndex):
+            if len(reference_images) == 0:
+                return None
+            if len(reference_images) >= ANN_MIN_GALLERY_SIZE:
+                return GalleryMatcher.from_index(reference_images, threshold=self.matcher.threshold)
+            # Small galleries: the exact dense product is both faster and exact
+            return GalleryMatcher(reference_images.labels, reference_images.all_vectors(), threshold=self.matcher.threshold)
+
+        if not isinstance(reference_images, dict):
+            reference_images = {DEFAULT_IDENTITY: reference_images}
+
+        embeddings = {}
+        for identity, sources in reference_images.items():
+            embedding = self.pipeline.get_reference_embedding(sources)
+            if embedding is None:
+                print(f"⚠️ No face found in the reference images for '{identity}'; skipping.")
+                continue
+            embeddings[identity] = embedding
+
+        if not embeddings:
+            return None
+        return GalleryMatcher.from_dict(embeddings, threshold=self.matcher.threshold)
+
+    def make_sampler(self, cap, start_frame: int = 0, end_frame: int = None):
+        """The frame sampler configured for this processor (fixed-rate or motion-adaptive)."""
+        if self.adaptive_sampling:
+            return AdaptiveFrameSampler(cap, start_frame=start_frame, end_frame=end_frame)
+        return FrameSampler(cap, frame_skip=self.FRAME_SKIP, start_frame=start_frame, end_frame=end_frame)
+
+    @staticmethod
+    def _notify_matches(sampler, entries: list, tracker: FaceTracker = None):
+        """Tells the sampler where the target was seen, so it samples densely around it."""
+        for entry in entries:
+            if entry[0] == 'match':
+                event = entry[1]
+                sampler.notify_match(event.get('end_frame_number', event['frame_number']))
+        if tracker is not None:
+            for track in tracker.tracks:
+                if track.appearance is not None:
+                    sampler.notify_match(track.appearance.end_frame)
+
+    def _run_batch(self, pending: list, video_filename: str, gallery: GalleryMatcher, tracker: FaceTracker = None):
+        if tracker is not None:
+            return self._flush_batch_tracked(pending, video_filename, gallery, tracker)
+        return self._flush_batch(pending, video_filename, gallery)
+
+    def _flush_batch(self, pending: list, video_filename: str, gallery: GalleryMatcher):
+        """Runs one batched inference over the buffered frames and returns their outbox entries in frame order."""
+        frames = [item for kind, item in pending if kind == 'frame']
+        faces_per_frame = self.pipeline.process_frames([frame for _, _, frame in frames]) if frames else []
+        faces_iter = iter(faces_per_frame)
+
+        entries = []
+        for kind, item in pending:
+            if kind == 'event':
+                entries.append(('event', item))
+                continue
+
+            frame_count, timestamp_str, _ = item
+            entries.extend(self._handle_frame_faces(next(faces_iter), video_filename, frame_count, timestamp_str, gallery))
+        return entries
+
+    def _flush_batch_tracked(self, pending: list, video_filename: str, gallery: GalleryMatcher, tracker: FaceTracker):
+        """
+        Tracked variant of _flush_batch: detects faces on the whole batch, associates them with
+        tracks, and aligns + embeds only the faces whose track needs a (fresh) embedding, in
+        one forward pass. Returns outbox entries for the appearances that closed, in frame order.
+        """
+        frames = [item for kind, item in pending if kind == 'frame']
+        images = [frame for _, _, frame in frames]
+        detections = self.pipeline.detect_frames(images) if frames else []
+
+        # Pass 1 (boxes only): association, and which tracks to embed on which frame
+        steps = []
+        regions = []
+        for (frame_count, _, _), (boxes, probs) in zip(frames, detections):
+            with timed('track'):
+                tracks, ended = tracker.update(frame_count, boxes, probs)
+            to_embed = [k for k, track in enumerate(tracks) if tracker.needs_embedding(track, frame_count)]
+            for k in to_embed:
+                tracker.schedule_embedding(tracks[k], frame_count)
+            regions.append((boxes[to_embed], probs[to_embed]) if to_embed else None)
+            steps.append((tracks, to_embed, ended))
+
+        faces_per_frame = self.pipeline.embed_regions(images, regions) if frames else []
+        steps_iter = iter(zip(frames, steps, faces_per_frame))
+
+        # Pass 2, in frame order: score fresh embeddings, grow/close appearances
+        entries = []
+        for kind, item in pending:
+            if kind == 'event':
+                entries.append(('event', item))
+                continue
+
+            (frame_count, timestamp_str, _), (tracks, to_embed, ended), faces = next(steps_iter)
+            if faces:
+                with timed('match'):
+                    hits = gallery.top_k(np.stack([face_data['embedding'] for face_data in faces]), k=1)
+                for k, face_data, face_hits in zip(to_embed, faces, hits):
+                    track = tracks[k]
+                    track.embedding = face_data['embedding']
+                    identity, similarity, is_match = face_hits[0] if face_hits else (None, 0.0, False)
+                    identity = identity if is_match else None
+
+                    if identity != track.identity and track.appearance is not None:
+                        entries.append(self._close_appearance(track.appearance, video_filename))
+                        track.appearance = None
+                    track.identity, track.similarity = identity, similarity
+
+                    if identity is not None:
+                        if track.appearance is None:
+                            track.appearance = Appearance(identity, track.track_id, frame_count, timestamp_str)
+                        track.appearance.offer(similarity, face_data['cropped_image'], frame_count)
+
+            for track in tracks:
+                if track.appearance is not None:
+                    track.appearance.extend(frame_count, timestamp_str)
+
+            for track in ended:
+                if track.appearance is not None:
+                    entries.append(self._close_appearance(track.appearance, video_filename))
+                    track.appearance = None
+        return entries
+
+    def _close_appearance(self, appearance: Appearance, video_filename: str):
+        """Queues the best crop of a finished appearance for writing; returns its outbox entry."""
+        unique_id = uuid.uuid4().hex[:8]
+        match_filename = f"{video_filename.split('.')[0]}_F{appearance.best_frame}_{unique_id}{self.image_writer.extension}"
+        match_path = os.path.join(MATCHES_FOLDER, match_filename)
+        future = self.image_writer.submit(match_path, appearance.best_crop)
+
+        row = (video_filename, appearance.start_frame, appearance.start_timestamp, appearance.best_similarity,
+               match_filename, appearance.identity, appearance.end_frame, appearance.end_timestamp)
+        event = {
+            "status": "match",
+            "frame_number": appearance.start_frame,
+            "end_frame_number": appearance.end_frame,
+            "similarity": appearance.best_similarity,
+            "timestamp": appearance.start_timestamp,
+            "end_timestamp": appearance.end_timestamp,
+            "identity": appearance.identity
+        }
+        return ('match', event, row, future)
+
+    def _handle_frame_faces(self, all_face_data_in_frame, video_filename, frame_count, timestamp_str, gallery: GalleryMatcher):
+        """
+        Scores every face of one frame against every identity (one matrix multiply) and queues the
+        best crop of each matched identity for writing. Returns one outbox entry per matched identity.
+        """
+        if not all_face_data_in_frame:
+            return []
+
+        face_embeddings = np.stack([face_data['embedding'] for face_data in all_face_data_in_frame])
+
+        with timed('match'):
+            best_faces = gallery.best_face_per_identity(face_embeddings)
+
+        entries = []
+        for identity, face_index, similarity in best_faces:
+            unique_id = uuid.uuid4().hex[:8]
+            match_filename = f"{video_filename.split('.')[0]}_F{frame_count}_{unique_id}{self.image_writer.extension}"
+            match_path = os.path.join(MATCHES_FOLDER, match_filename)
+
+            # Encode + write the 160x160 aligned match image off the inference thread
+            future = self.image_writer.submit(match_path, all_face_data_in_frame[face_index]['cropped_image'])
+
+            row = (video_filename, frame_count, timestamp_str, similarity, match_filename, identity)
+            event = {
+                "status": "match",
+                "frame_number": frame_count,
+                "similarity": similarity,
+                "timestamp": timestamp_str,
+                "identity": identity
+            }
+            entries.append(('match', event, row, future))
+        return entries
+
+    def _finalize_ready(self, outbox: list, writer: DetectionWriter, block: bool = False, logged: set = None):
+        """
+        Pops entries off the head of the outbox whose crop is on disk (all of them if `block`),
+        buffers their detection rows and returns their events. Order is preserved: a match
+        still being written holds back everything behind it. Matches whose (frame, identity)
+        is in `logged` were already written by an earlier, interrupted run and are dropped.
+        """
+        events = []
+        while outbox:
+            entry = outbox[0]
+            if entry[0] == 'match':
+                _, event, row, future = entry
+                if not block and not future.done():
+                    break
+                try:
+                    future.result()
+                except Exception as e:
+                    # No image, no row: drop this match
+                    print(f"⚠️ Warning: Failed to save image for frame {row[1]}. Error: {e}")
+                    outbox.pop(0)
+                    continue
+                if logged and (row[1], row[5]) in logged:
+                    # Re-derived after a resume: keep the original row, discard the new crop
+                    self._discard_image(row[4])
+                    outbox.pop(0)
+                    continue
+                writer.add(*row)
+                MATCHES.inc()
+                print(f"🔥 Match Logged! Frame: {row[1]}, Identity: {row[5]}, Sim: {row[3]:.4f}")
+                events.append(event)
+            else:
+                events.append(entry[1])
+            outbox.pop(0)
+        return events
+
+    @staticmethod
+    def _discard_image(match_filename: str):
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO detections (video_filename, frame_number, timestamp, similarity, match_image_path)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (video_filename, frame_num, timestamp, similarity, match_image_path))
-            conn.commit()
-        except Exception as db_err:
-            print(f"⚠️ Database log failed for frame {frame_num}: {db_err}")
-            traceback.print_exc()
-        finally:
-            if conn:
-                conn.close()
+            os.remove(os.path.join(MATCHES_FOLDER, match_filename))
+        except OSError:
+            pass
+
+    def processing_fingerprint(self, gallery: GalleryMatcher) -> str:
+        """Identifies a run's results: same references, models and settings => resumable."""
+        settings = f"{FaceRecognitionPipeline.MODEL_VERSION}|{self.FRAME_SKIP}|{self.adaptive_sampling}|{self.tracking}"
+        return hashlib.sha256(f"{settings}|{gallery.fingerprint()}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _resume_frame(cursor: dict, outbox: list, tracker: FaceTracker = None) -> int:
+        """
+        First frame whose effects are not all durable yet: frames still waiting for a batch,
+        matches whose crop is not written, and appearances that are still open all have to
+        be redone after a restart.
+        """
+        frame = cursor['inferred_until']
+        for entry in outbox:
+            if entry[0] == 'match':
+                frame = min(frame, entry[2][1])
+        if tracker is not None:
+            for track in tracker.tracks:
+                if track.appearance is not None:
+                    frame = min(frame, track.appearance.start_frame)
+        return frame
+
+    @staticmethod
+    def _timed_frames(sampler):
+        """Iterates `sampler`, timing every step (grabs and seeks included) as the decode stage."""
+        frames = iter(sampler)
+        retrieved = 0
+        while True:
+            with timed('decode'):
+                item = next(frames, None)
+            FRAMES_DECODED.inc(sampler.frames_retrieved - retrieved)
+            retrieved = sampler.frames_retrieved
+            if item is None:
+                return
+            FRAMES_SAMPLED.inc()
+            yield item
+
+    def _scan(self, sampler, video_filename: str, gallery: GalleryMatcher, tracker: FaceTracker = None,
+              cursor: dict = None):
+        """
+        Runs inference over everything `sampler` yields. After every sampled frame, yields the
+        (possibly empty) list of outbox entries that became ready, in frame order; the last
+        list drains the partial batch and closes still-open appearances.
+        `cursor['inferred_until']` tracks the first frame not yet run through inference.
+        """
+        cursor = cursor if cursor is not None else {}
+        # Sampled frames wait here until a full batch is ready. Progress events raised
+        # while frames are buffered are queued behind them so the stream stays in frame order.
+        pending = []
+        buffered_frames = 0
+        last_progress_bucket = -1
+
+        for frame_number, current_time_ms, frame in self._timed_frames(sampler):
+            entries = []
+            # Progress roughly every 50 frames of video
+            if frame_number // 50 != last_progress_bucket:
+                last_progress_bucket = frame_number // 50
+                progress_event = {"status": "progress", "frame_number": frame_number}
+                if buffered_frames:
+                    pending.append(('event', progress_event))
+                else:
+                    entries.append(('event', progress_event))
+
+            time_delta = timedelta(milliseconds=current_time_ms)
+            timestamp_str = str(time_delta).split('.')[0]
+
+            pending.append(('frame', (frame_number, timestamp_str, frame)))
+            buffered_frames += 1
 
-    def process_video_generator(self, video_path: str, reference_image_paths: list):
-        """Main processing loop — yields status, progress, and matches."""
-        video_filename = os.path.basename(video_path)
+            if buffered_frames >= self.batch_size:
+                batch_entries = self._run_batch(pending, video_filename, gallery, tracker)
+                self._notify_matches(sampler, batch_entries, tracker)
+                entries.extend(batch_entries)
+                pending = []
+                buffered_frames = 0
+                cursor['inferred_until'] = frame_number + 1
+            yield entries
+
+        # Drain the last, partially filled batch and close still-open appearances
+        entries = self._run_batch(pending, video_filename, gallery, tracker)
+        if tracker is not None:
+            for track in tracker.flush():
+                if track.appearance is not None:
+                    entries.append(self._close_appearance(track.appearance, video_filename))
+        yield entries
+
+    def process_video_generator(self, video_path: str, reference_image_paths, video_filename: str = None):
+        """
+        Main processing loop — yields status, progress, and matches.
+        `reference_image_paths` is a list of images of one person, or {identity: [paths]}
+        to search for several people in a single pass over the video.
+        Results are logged under `video_filename` (default: the file's basename).
+        """
+        video_filename = video_filename or os.path.basename(video_path)
         cap = cv2.VideoCapture(video_path)
         
         if not cap.isOpened():
             yield {"status": "error", "message": "Could not open video file."}
             return
 
-        # --- UPDATED REFERENCE EMBEDDING ---
-        # Use the pipeline to get the reference embedding
-        reference_embedding = self.pipeline.get_reference_embedding(reference_image_paths)
-        if reference_embedding is None:
+        # --- REFERENCE GALLERY ---
+        # One embedding per identity, matched together with a single matrix multiply per frame
+        gallery = self.build_gallery(reference_image_paths)
+        if gallery is None:
             yield {"status": "error", "message": "Could not generate reference embedding from provided images."}
             return
         # ----------------------------------
 
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_count = 0
         matches_found = 0
-        
-        yield {"status": "start", "total_frames": total_frames, "filename": video_filename}
-        print(f"🔄 Starting video processing: {video_filename}. Total Frames: {total_frames}")
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Yield progress (no change here)
-            if frame_count % 50 == 0 or frame_count == total_frames - 1:
-                yield {"status": "progress", "frame_number": frame_count}
-
-            # Process every Nth frame (no change here)
-            if frame_count % self.FRAME_SKIP == 0:
-                current_time_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-                time_delta = timedelta(milliseconds=current_time_ms)
-                timestamp_str = str(time_delta).split('.')[0]
-
-                best_match_in_frame = {'similarity': 0.0, 'image': None}
-
-                # --- UPDATED PIPELINE EXECUTION ---
-                # The pipeline handles detection, alignment, AND embedding in one step
-                all_face_data_in_frame = self.pipeline.process_frame(frame)
-
-                for face_data in all_face_data_in_frame:
-                    target_embedding = face_data['embedding']
-                    
-                    similarity, is_match = self.matcher.match(target_embedding, reference_embedding)
-
-                    if is_match and similarity > best_match_in_frame['similarity']:
-                        best_match_in_frame['similarity'] = similarity
-                        # Save the aligned, cropped image from the pipeline
-                        best_match_in_frame['image'] = face_data['cropped_image'] 
-                # ----------------------------------
-
-                # Log and yield match if threshold met (no change in this logic block)
-                if best_match_in_frame['similarity'] >= self.matcher.threshold:
-                    matches_found += 1
-                    similarity = best_match_in_frame['similarity']
-
-                    unique_id = uuid.uuid4().hex[:8]
-                    match_filename = f"{video_filename.split('.')[0]}_F{frame_count}_{unique_id}.jpg"
-                    match_path = os.path.join(MATCHES_FOLDER, match_filename)
 
-                    try:
-                        # Save the 160x160 aligned match image
-                        cv2.imwrite(match_path, best_match_in_frame['image'])
+        # --- RESUME ---
+        # Same video + same references/settings as an interrupted run: continue from its
+        # checkpoint. Anything else left for this video is stale and starts over.
+        reference_hash = self.processing_fingerprint(gallery)
+        checkpoint = load_checkpoint(video_filename, reference_hash)
+        start_frame = 0
+        logged = set()
+        if checkpoint is not None and checkpoint.completed:
+            cap.release()
+            yield {"status": "start", "total_frames": total_frames, "filename": video_filename,
+                   "identities": gallery.identities, "resumed_from": checkpoint.last_frame}
+            print(f"⏭️ {video_filename} was already processed with these references; reusing its results.")
+            yield {"status": "completed", "frames_processed": checkpoint.last_frame,
+                   "matches_found": checkpoint.matches_found}
+            return
+        if checkpoint is not None:
+            start_frame = checkpoint.last_frame
+            # Rows committed after the checkpoint count too; re-deriving them is deduped
+            logged = existing_match_keys(video_filename)
+            matches_found = len(logged)
+        elif has_checkpoint(video_filename):
+            purge_video_results(video_filename)
 
-                        self._log_detection(
-                            video_filename,
-                            frame_count,
-                            timestamp_str,
-                            float(similarity),
-                            match_filename
-                        )
-                        print(f"🔥 Match Logged! Frame: {frame_count}, Sim: {similarity:.4f}")
+        yield {"status": "start", "total_frames": total_frames, "filename": video_filename,
+               "identities": gallery.identities, "resumed_from": start_frame}
+        if start_frame:
+            print(f"⏩ Resuming {video_filename} at frame {start_frame} ({matches_found} matches so far).")
+        else:
+            print(f"🔄 Starting video processing: {video_filename}. Total Frames: {total_frames}")
 
-                        yield {
-                            "status": "match",
-                            "frame_number": frame_count,
-                            "similarity": float(similarity),
-                            "timestamp": timestamp_str
-                        }
+        # Outbox entries wait until their crop is on disk; finalized events then wait until
+        # their rows are committed, so a `match` the client has seen is always in the
+        # database (with its image), even if we abort later.
+        outbox = []
+        finalized = []
+        writer = DetectionWriter(fps=cap.get(cv2.CAP_PROP_FPS))
 
-                    except Exception as e:
-                        print(f"⚠️ Warning: Failed to save image for frame {frame_count}. Error: {e}")
-                        traceback.print_exc()
+        # Only sampled (and, adaptively, motion-probed) frames are decoded; the rest are grabbed or seeked over.
+        sampler = self.make_sampler(cap, start_frame=start_frame)
+        tracker = FaceTracker() if self.tracking else None
+        cursor = {'inferred_until': start_frame}
+        last_checkpoint = time.monotonic()
 
-            frame_count += 1
+        # A failed flush raises before any event it covers is yielded
+        with job_timings() as timings, writer:
+            try:
+                for entries in self._scan(sampler, video_filename, gallery, tracker, cursor):
+                    outbox.extend(entries)
+                    finalized.extend(self._finalize_ready(outbox, writer, logged=logged))
+                    checkpoint_due = time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS
+                    if checkpoint_due or (finalized and (writer.pending == 0 or writer.should_flush())):
+                        if checkpoint_due:
+                            last_checkpoint = time.monotonic()
+                            committed = matches_found + sum(1 for event in finalized if event['status'] == 'match')
+                            writer.set_checkpoint(video_filename, reference_hash,
+                                                  self._resume_frame(cursor, outbox, tracker), committed, total_frames)
+                        writer.flush()
+                        for event in finalized:
+                            if event['status'] == 'match':
+                                matches_found += 1
+                            yield event
+                        finalized = []
 
-        cap.release()
+                # Wait for outstanding image writes
+                finalized.extend(self._finalize_ready(outbox, writer, block=True, logged=logged))
+                # A trailing seek can overshoot the end of the file; the container count is authoritative then
+                frame_count = min(sampler.position, total_frames) if total_frames > 0 else sampler.position
+                committed = matches_found + sum(1 for event in finalized if event['status'] == 'match')
+                writer.set_checkpoint(video_filename, reference_hash, frame_count, committed, total_frames, completed=True)
+                writer.flush()
+                for event in finalized:
+                    if event['status'] == 'match':
+                        matches_found += 1
+                    yield event
+            finally:
+                # Also runs when the consumer abandons the generator: commit rows whose images are written
+                finalized.extend(self._finalize_ready(outbox, writer, logged=logged))
+                cap.release()
 
         # Final yield (no change here)
-        yield {
+        completed = {
             "status": "completed",
             "frames_processed": frame_count,
             "matches_found": matches_found
         }
-        print(f"✅ Processing complete. Frames: {frame_count}, Matches: {matches_found}")
\ No newline at end of file
+        if JOB_TIMING_SUMMARY:
+            completed["timings"] = timings.summary()
+        yield completed
+        print(f"✅ Processing complete. Frames: {frame_count}, Matches: {matches_found}")
+        print(f"🖼️ Image writer: {self.image_writer.stats()}")
+        print(f"🎞️ Sampler: {sampler.frames_decoded} frames inferred, {sampler.frames_grabbed} grabbed, {sampler.seeks} seeks")
+        if tracker is not None and tracker.faces_seen:
+            saved = 1.0 - tracker.faces_embedded / tracker.faces_seen
+            print(f"🎯 Tracking: embedded {tracker.faces_embedded} of {tracker.faces_seen} detected faces ({saved:.0%} saved)")
+
+    # --- FACE ARCHIVE: index once, search many times ---
+
+    def index_video_generator(self, video_path: str, video_filename: str = None):
+        """
+        Indexing mode: stores every detected face of the sampled frames (frame, box, prob,
+        embedding) in a FaceArchive instead of matching them against references.
+        Yields start / progress / completed events like process_video_generator.
+        """
+        video_filename = video_filename or os.path.basename(video_path)
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            yield {"status": "error", "message": "Could not open video file."}
+            return
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        yield {"status": "start", "total_frames": total_frames, "filename": video_filename, "mode": "index"}
+        print(f"🗄️ Indexing faces of {video_filename}. Total Frames: {total_frames}")
+
+        sampler = self.make_sampler(cap)
+        writer = FaceArchiveWriter(archive_path(video_filename))
+        pending = []
+        last_progress_bucket = -1
+        try:
+            for frame_number, current_time_ms, frame in sampler:
+                pending.append((frame_number, current_time_ms, frame))
+                if len(pending) >= self.batch_size:
+                    self._archive_batch(writer, pending)
+                    pending = []
+                if frame_number // 50 != last_progress_bucket:
+                    last_progress_bucket = frame_number // 50
+                    yield {"status": "progress", "frame_number": frame_number}
+            self._archive_batch(writer, pending)
+
+            frame_count = min(sampler.position, total_frames) if total_frames > 0 else sampler.position
+            writer.close({
+                "video_filename": video_filename,
+                "video_path": os.path.abspath(video_path),
+                "fps": sampler.fps,
+                "total_frames": total_frames,
+                "frames_processed": frame_count,
+                "model_version": FaceRecognitionPipeline.MODEL_VERSION,
+                "sampling": "adaptive" if self.adaptive_sampling else f"every {self.FRAME_SKIP} frames",
+                "indexed_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        except BaseException:
+            # Failed or abandoned: leave any previous archive of this video untouched
+            writer.abort()
+            raise
+        finally:
+            cap.release()
+
+        yield {"status": "completed", "frames_processed": frame_count, "faces_indexed": writer.faces, "matches_found": 0}
+        print(f"✅ Indexed {writer.faces} faces in {writer.frames} sampled frames of {video_filename}.")
+
+    def _archive_batch(self, writer: FaceArchiveWriter, pending: list):
+        """Detects, aligns and embeds every face of a batch of sampled frames and appends them to the archive."""
+        if not pending:
+            return
+        images = [frame for _, _, frame in pending]
+        detections = self.pipeline.detect_frames(images)
+        regions = [(boxes, probs) if boxes is not None else None for boxes, probs in detections]
+        faces_per_frame = self.pipeline.embed_regions(images, regions)
+        for (frame_number, current_time_ms, _), (boxes, probs), faces in zip(pending, detections, faces_per_frame):
+            if boxes is None or not faces:
+                writer.add_frame(frame_number, current_time_ms)
+                continue
+            writer.add_frame(frame_number, current_time_ms, boxes, probs, np.stack([face['embedding'] for face in faces]))
+
+    def search_archive_generator(self, video_filename: str, reference_image_paths):
+        """
+        Searches an indexed video (see index_video_generator) without decoding it: the archived
+        embeddings are scored against the gallery in a few matrix products, hits are merged into
+        appearances (with tracking on) and only the matched crops are re-extracted from the video.
+        Replaces earlier results of the video. Yields the same events as process_video_generator.
+        """
+        archive = FaceArchive.open(video_filename)
+        if archive is None:
+            yield {"status": "error", "message": f"{video_filename} has not been indexed."}
+            return
+        if archive.meta.get("model_version") != FaceRecognitionPipeline.MODEL_VERSION:
+            yield {"status": "error", "message": f"{video_filename} was indexed with another model; re-index it."}
+            return
+        gallery = self.build_gallery(reference_image_paths)
+        if gallery is None:
+            yield {"status": "error", "message": "Could not generate reference embedding from provided images."}
+            return
+
+        meta = archive.meta
+        yield {"status": "start", "total_frames": meta["total_frames"], "filename": video_filename,
+               "identities": gallery.identities, "mode": "archive", "faces": len(archive)}
+        started = time.perf_counter()
+        hits = archive.search(gallery)
+        if self.tracking:
+            intervals = archive.appearances(hits)
+        else:
+            intervals = [{"identity": identity, "start_row": row, "end_row": row, "best_row": row,
+                          "best_similarity": similarity} for row, identity, similarity in hits]
+        print(f"🔎 {len(archive)} archived faces of {video_filename} searched in {time.perf_counter() - started:.2f}s: "
+              f"{len(hits)} hits, {len(intervals)} matches.")
+
+        purge_video_results(video_filename)
+        crops = self._archive_crops(archive, [interval["best_row"] for interval in intervals])
+
+        def timestamp(row):
+            return str(timedelta(milliseconds=int(archive.timestamps_ms[row]))).split('.')[0]
+
+        matches_found = 0
+        with DetectionWriter(fps=meta.get("fps")) as writer:
+            events = []
+            for interval in intervals:
+                start_row, end_row, best_row = interval["start_row"], interval["end_row"], interval["best_row"]
+                match_filename = ''
+                crop = crops.get(best_row)
+                if crop is not None:
+                    unique_id = uuid.uuid4().hex[:8]
+                    match_filename = (f"{video_filename.split('.')[0]}_F{int(archive.frames[best_row])}_{unique_id}"
+                                      f"{self.image_writer.extension}")
+                    self.image_writer.submit(os.path.join(MATCHES_FOLDER, match_filename), crop).result()
+
+                row = (video_filename, int(archive.frames[start_row]), timestamp(start_row), interval["best_similarity"],
+                       match_filename, interval["identity"], int(archive.frames[end_row]), timestamp(end_row))
+                writer.add(*row)
+                events.append({"status": "match", "frame_number": row[1], "end_frame_number": row[6],
+                               "similarity": row[3], "timestamp": row[2], "end_timestamp": row[7],
+                               "identity": row[5]})
+                if writer.should_flush():
+                    writer.flush()
+                    matches_found += len(events)
+                    yield from events
+                    events = []
+            writer.flush()
+            matches_found += len(events)
+            yield from events
+
+        yield {"status": "completed", "frames_processed": meta["frames_processed"], "matches_found": matches_found}
+        print(f"✅ Archive search complete. Matches: {matches_found}")
+
+    def _archive_crops(self, archive: FaceArchive, rows: list) -> dict:
+        """Re-extracts the aligned crops of the given archive rows from the source video: {row: crop}."""
+        crops = {}
+        cap = cv2.VideoCapture(archive.meta["video_path"])
+        if not cap.isOpened():
+            print(f"⚠️ Source video {archive.meta['video_path']} is gone; matches are logged without crops.")
+            return crops
+        try:
+            by_frame = {}
+            for row in rows:
+                by_frame.setdefault(int(archive.frames[row]), []).append(row)
+            for frame_number in sorted(by_frame):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                ok, frame = cap.read()
+                if not ok:
+                    continue
+                frame_rows = by_frame[frame_number]
+                for row, crop in zip(frame_rows, self.pipeline.crop_faces(frame, archive.boxes[frame_rows])):
+                    crops[row] = crop
+        finally:
+            cap.release()
+        return crops
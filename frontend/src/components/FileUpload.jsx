@@ -2,7 +2,7 @@
 import React, { useState } from 'react';
 import { IoSearch, IoImage, IoVideocamOutline, IoTime, IoStatsChart } from 'react-icons/io5';
 import Card from './Card'; 
-import { uploadAndProcess } from '../services/api';
+import { uploadAndProcess, subscribeToJob } from '../services/api';
 import { logSearchJob } from '../services/firebaseService';
 import { useOutletContext } from 'react-router-dom';
 
@@ -44,27 +44,34 @@ const FileUpload = ({ onProcessingComplete }) => {
             
             setStatusMessage("2/3: Analyzing video frames...");
 
-            const generatorResults = response.data.details;
-            const fullReportUrls = response.data.report_urls;
-            const videoFilename = response.data.video_name;
-
+            const jobId = response.data.job_id;
             let totalFrames = 1;
             let finalDetails = {};
 
-            generatorResults.forEach((item) => {
-                if (item.status === 'start') {
-                    totalFrames = item.total_frames;
-                } else if (item.status === 'progress') {
-                    setProcessingPercent(Math.round((item.frame_number / totalFrames) * 100));
-                } else if (item.status === 'match') {
-                    setSequentialResults(prev => [item, ...prev]);
-                } else if (item.status === 'completed') {
-                    finalDetails = item;
-                    setProcessingPercent(100);
-                    setStatusMessage(`3/3: Analysis Complete. Found ${item.matches_found} detections.`);
-                }
+            // Events arrive live from the job queue until 'done' or 'failed'
+            const jobResult = await new Promise((resolve, reject) => {
+                subscribeToJob(jobId, (item) => {
+                    if (item.status === 'start') {
+                        totalFrames = item.total_frames;
+                    } else if (item.status === 'progress') {
+                        setProcessingPercent(Math.round((item.frame_number / totalFrames) * 100));
+                    } else if (item.status === 'match') {
+                        setSequentialResults(prev => [item, ...prev]);
+                    } else if (item.status === 'completed') {
+                        finalDetails = item;
+                        setProcessingPercent(100);
+                        setStatusMessage(`3/3: Analysis Complete. Found ${item.matches_found} detections.`);
+                    } else if (item.status === 'done') {
+                        resolve(item.result);
+                    } else if (item.status === 'failed') {
+                        reject(new Error(item.message));
+                    }
+                }, () => reject(new Error("Lost connection to the job stream")));
             });
 
+            const fullReportUrls = jobResult.report_urls;
+            const videoFilename = jobResult.video_name;
+
             if (user.uid) {
                 const reportFilenamesForLog = {
                     csv_filename: fullReportUrls.csv, 
@@ -251,7 +258,7 @@ const FileUpload = ({ onProcessingComplete }) => {
                                 fontSize: '0.8rem',
                                 border: match.similarity >= 0.75 ? '1px solid #00ffff' : '1px solid #333'
                             }}>
-                                Frame {match.frame_number}<br />
+                                Frame {match.frame_number}{match.end_frame_number > match.frame_number ? `–${match.end_frame_number}` : ''}<br />
                                 Sim: {match.similarity.toFixed(4)}
                             </div>
                         ))}
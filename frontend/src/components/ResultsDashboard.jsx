@@ -79,7 +79,7 @@ const ResultsDashboard = ({ videoName, reportUrls }) => {
                 {results.map((result, index) => (
                     <div key={index} className="result-item" style={{ overflow: 'hidden' }}>
                         <p style={{ fontSize: '1rem', fontWeight: 'bold', color: '#4f46e5', borderBottom: '1px solid #e5e7eb', paddingBottom: '0.5rem' }}>Match #{index + 1}</p>
-                        <p style={{ fontSize: '0.875rem', marginTop: '0.5rem' }}>Time: <span style={{ fontWeight: '600' }}>{result.timestamp}</span> (Frame {result.frame})</p>
+                        <p style={{ fontSize: '0.875rem', marginTop: '0.5rem' }}>Time: <span style={{ fontWeight: '600' }}>{result.timestamp}{result.end_frame > result.frame ? ` – ${result.end_timestamp}` : ''}</span> (Frame {result.frame}{result.end_frame > result.frame ? `–${result.end_frame}` : ''})</p>
                         <p style={{ fontSize: '0.875rem' }}>Similarity: <span style={{ fontWeight: '600', color: '#059669' }}>{result.similarity}</span></p>
                         
                         <div style={{ marginTop: '0.75rem', height: 'auto', overflow: 'hidden' }}>
@@ -5,6 +5,7 @@ import { IoCloudUpload, IoVideocam, IoAlertCircle, IoPulse, IoStatsChart } from
 
 const API_UPLOAD_REF_URL = 'http://localhost:5000/api/live/upload_ref'; // Step 1: POST (Upload)
 const API_STREAM_BASE_URL = 'http://localhost:5000/api/live/stream/'; // Step 2: GET (Video Stream)
+const API_SESSION_BASE_URL = 'http://localhost:5000/api/live/session/'; // Step 3: DELETE (Close Session)
 
 const LiveFeedPage = () => {
     const [status, setStatus] = useState('AWAITING_REF');
@@ -73,6 +74,11 @@ const LiveFeedPage = () => {
     };
 
     const handleStopStream = () => {
+        // Free the server-side session; the stream itself ends when the <img> src is cleared.
+        if (sessionId) {
+            fetch(API_SESSION_BASE_URL + sessionId, { method: 'DELETE' })
+                .catch((error) => console.warn("Could not close live session:", error));
+        }
         // Disconnecting the stream by clearing the <img> src attribute.
         setStreamUrl(null); 
         setSessionId(null);
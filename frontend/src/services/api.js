@@ -15,6 +15,28 @@ export const uploadAndProcess = (formData, onUploadProgress) => {
     });
 };
 
+// Opens the Server-Sent Events stream of a processing job.
+// onEvent receives every generator event ({status: 'start' | 'progress' | 'match' | 'completed' | 'done' | 'failed', ...}).
+export const subscribeToJob = (jobId, onEvent, onError) => {
+    const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+    const statuses = ['start', 'progress', 'match', 'completed', 'error', 'done', 'failed'];
+
+    statuses.forEach((status) => {
+        source.addEventListener(status, (e) => {
+            const event = JSON.parse(e.data);
+            onEvent(event);
+            if (event.status === 'done' || event.status === 'failed') {
+                source.close();
+            }
+        });
+    });
+    source.onerror = (err) => {
+        // EventSource reconnects on its own while the job is alive; report only a closed stream
+        if (source.readyState === EventSource.CLOSED && onError) onError(err);
+    };
+    return source;
+};
+
 export const getDetectionResults = (videoName) => {
     return axios.get(`${API_BASE_URL}/results/${videoName}`);
 };
@@ -9,7 +9,7 @@ if project_root not in sys.path:
 # 2. Import the Flask application instance directly
 try:
     # Flask application instance is named 'app' inside backend/app.py
-    from backend.app import app
+    from backend.app import app, init_app, preload_if_configured
 except ImportError as e:
     print(f"FATAL ERROR: Could not load Flask application from backend.app: {e}")
     print("Please ensure your files are in the correct backend/ directory structure and all imports in backend/app.py are valid.")
@@ -23,4 +23,8 @@ if __name__ == '__main__':
     print("✅ Launching server using run_server.py...")
     # app.run() will now correctly use the configuration loaded from the backend package
     # Note: Setting debug=False is recommended for production
+    # Folders, database, job manager and live hub (never at import: segment workers re-run this file)
+    init_app()
+    # Load and warm up the shared models before serving when PRELOAD_MODELS=1
+    preload_if_configured(debug=True)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file